@@ -0,0 +1,51 @@
+"""Headless level export for render farms.
+
+Usage:
+    blender -b --python <addon dir>/batch_export.py -- <level.blend> <output dir> [--full] [--resume]
+        [--shard N --threads T | --merge]
+
+Opens the .blend, renders every view back to back, converts and packs the
+.mflevel into the output directory and exits with status 0 on success or 1 on
+failure. --shard renders only the views a sharded export assigned to shard N
+and --merge converts and packs the views rendered by all shards. The My Fantasy
+Tools add-on must be enabled in the Blender preferences used by the render node.
+"""
+import argparse
+import sys
+
+import bpy
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="batch_export.py", description="Export a My Fantasy Tools level headlessly")
+    parser.add_argument("blend_file", help="Level .blend file to export")
+    parser.add_argument("output_dir", help="Directory to write the .mflevel to")
+    parser.add_argument("--full", action="store_true", help="Re-render every view, ignoring the fingerprint cache")
+    parser.add_argument("--resume", action="store_true", help="Reuse the views an interrupted export already finished")
+    parser.add_argument("--shard", type=int, default=-1, help="Only render the views of this shard from the shard manifest")
+    parser.add_argument("--threads", type=int, default=0, help="Render on the CPU with this many threads")
+    parser.add_argument("--merge", action="store_true", help="Convert and pack the views rendered by a sharded export")
+    args = parser.parse_args(argv)
+
+    bpy.ops.wm.open_mainfile(filepath=args.blend_file)
+
+    if "export_batch" not in dir(bpy.ops.mft):
+        print("My Fantasy Tools add-on is not enabled", file=sys.stderr)
+        return 1
+
+    try:
+        if args.merge:
+            result = bpy.ops.mft.merge_shards(export_directory=args.output_dir)
+        else:
+            result = bpy.ops.mft.export_batch(export_directory=args.output_dir, full_rebuild=args.full,
+                                              resume=args.resume, shard=args.shard, cpu_threads=args.threads)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 0 if 'FINISHED' in result else 1
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
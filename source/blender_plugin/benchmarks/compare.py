@@ -0,0 +1,105 @@
+"""Compare two exporter benchmark results written by exporter.py.
+
+Usage:
+    python <install dir>/mft_benchmarks/compare.py <baseline.json> <current.json> [--threshold 1.2] [--slope-threshold 0.2]
+
+Prints the time of every benchmark per case side by side, and how each one
+scales with the navmesh triangle count: the slope of log(time) over
+log(triangles), 1.0 being linear. Exits with status 1 if a benchmark got
+slower than threshold times its baseline in any case, or if its slope grew by
+more than slope-threshold, which catches an accidental quadratic loop before
+the timings of small test scenes would.
+"""
+import argparse
+import json
+import math
+import sys
+
+# Timings shorter than this are noise, they are listed but never flagged.
+MIN_SECONDS = 0.01
+
+
+def load(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def case_key(case) -> tuple:
+    return case["triangles"], case["cameras"], case["regions"]
+
+
+def timings_by_case(results) -> dict:
+    """{(triangles, cameras, regions): {benchmark: seconds}}, the image benchmarks under (0, 0, 0)."""
+    timings = {case_key(case): {name: timing["seconds"] for name, timing in case["timings"].items()}
+               for case in results.get("cases", [])}
+    if "images" in results:
+        timings[(0, 0, 0)] = {name: timing["seconds"] for name, timing in results["images"]["timings"].items()}
+    return timings
+
+
+def scaling_slope(results, name):
+    """Least squares slope of log(seconds) over log(triangles) for one benchmark, None with fewer than two cases."""
+    points = [(math.log(case["triangles"]), math.log(case["timings"][name]["seconds"]))
+              for case in results.get("cases", [])
+              if name in case["timings"] and case["triangles"] > 0 and case["timings"][name]["seconds"] >= MIN_SECONDS]
+    if len(points) < 2:
+        return None
+
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="compare.py", description="Compare two exporter benchmark results")
+    parser.add_argument("baseline", help="Result JSON of the reference build")
+    parser.add_argument("current", help="Result JSON to check")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Flag benchmarks slower than this ratio")
+    parser.add_argument("--slope-threshold", type=float, default=0.2,
+                        help="Flag benchmarks whose scaling slope grew by more than this")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    baseline_timings = timings_by_case(baseline)
+    current_timings = timings_by_case(current)
+
+    regressions = []
+    print(f"{'benchmark':<24} {'case':<24} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for key in sorted(set(baseline_timings) & set(current_timings)):
+        label = "images" if key == (0, 0, 0) else "{} tris {} cams {} rgn".format(*key)
+        for name in sorted(set(baseline_timings[key]) & set(current_timings[key])):
+            before, after = baseline_timings[key][name], current_timings[key][name]
+            ratio = after / before if before > 0 else float('inf')
+            flagged = ratio > args.threshold and max(before, after) >= MIN_SECONDS
+            if flagged:
+                regressions.append(f"{name} ({label}) is {ratio:.2f}x slower")
+            print(f"{name:<24} {label:<24} {before:>9.3f}s {after:>9.3f}s {ratio:>6.2f}x{'  !' if flagged else ''}")
+
+    print()
+    print(f"{'benchmark':<24} {'baseline slope':>15} {'current slope':>15}")
+    names = {name for case in current.get("cases", []) for name in case["timings"]}
+    for name in sorted(names):
+        before, after = scaling_slope(baseline, name), scaling_slope(current, name)
+        if before is None or after is None:
+            continue
+        flagged = after - before > args.slope_threshold
+        if flagged:
+            regressions.append(f"{name} now scales as triangles^{after:.2f}, was triangles^{before:.2f}")
+        print(f"{name:<24} {before:>15.2f} {after:>15.2f}{'  !' if flagged else ''}")
+
+    if regressions:
+        print()
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,277 @@
+"""Time the exporter's hot paths on procedurally generated scenes.
+
+Usage:
+    blender -b --factory-startup --python <install dir>/mft_benchmarks/exporter.py -- [--triangles N]... [--cameras N]
+        [--regions M] [--image-size S] [--threads T] [--mip-levels L] [--json out.json]
+
+Loads the add-on from the mft_blender_addon directory installed next to this
+one, so it does not need to be enabled. Every case builds a grid navmesh of about N triangles painted with M
+camera color regions, puts --cameras cameras over them, then times:
+
+    get_view_color_tris  Navmesh.get_view_color_tris() for every view
+    place_env_probe      render_view.place_env_probe() for every view
+    place_env_probes     render_view.place_env_probes(), all views in one batch
+    view_adjacency       Navmesh.view_adjacency(), the adjacent views of every view
+    serialize_level      serialize.serialize_level(), adjacency included
+    pack_blob            streaming seven encoded images per view into a LevelWriter
+
+and once per run, on synthetic EXR passes of --image-size pixels:
+
+    encode_exr_batch     save.encode_exr_batch() with the default encode profiles, --threads native
+                         workers (default: the exporter's automatic count) and --mip-levels mips, the
+                         in-memory conversion ConversionQueue runs for every view
+
+Compare two result files with compare.py.
+"""
+import argparse
+import colorsys
+import gc
+import importlib
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+ADDON_DIR = Path(__file__).resolve().parent.parent / "mft_blender_addon"
+
+# flatbuffers ships as a wheel next to the add-on, which Blender only puts on
+# sys.path for installed extensions.
+sys.path.extend(str(wheel) for wheel in sorted((ADDON_DIR / "wheels").glob("*.whl")))
+sys.path.insert(0, str(ADDON_DIR.parent))
+
+addon = importlib.import_module(ADDON_DIR.name)
+color = importlib.import_module(f"{ADDON_DIR.name}.core.color")
+data_models = importlib.import_module(f"{ADDON_DIR.name}.core.data_models")
+navmesh_module = importlib.import_module(f"{ADDON_DIR.name}.core.navmesh")
+render_view = importlib.import_module(f"{ADDON_DIR.name}.core.render_view")
+image_types = importlib.import_module(f"{ADDON_DIR.name}.export.image_types")
+conversion = importlib.import_module(f"{ADDON_DIR.name}.export.conversion")
+level_writer = importlib.import_module(f"{ADDON_DIR.name}.export.level_writer")
+save = importlib.import_module(f"{ADDON_DIR.name}.export.save")
+serialize = importlib.import_module(f"{ADDON_DIR.name}.export.serialize")
+
+DEFAULT_TRIANGLES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def region_color(region) -> tuple:
+    # Golden ratio hues keep neighbouring regions apart, see color.generate_distinct_color().
+    return colorsys.hsv_to_rgb((region * 0.618033988749895) % 1.0, 0.8, 0.9)
+
+
+def build_navmesh(triangles, regions):
+    """A square grid of about triangles triangles, painted with regions camera colors in blocks."""
+    cells = max(1, math.ceil(math.sqrt(triangles / 2)))
+    xs, ys = np.meshgrid(np.arange(cells + 1, dtype=np.float32), np.arange(cells + 1, dtype=np.float32))
+    coords = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=np.float32)], axis=1)
+
+    # Quad (i, j) has its lower left corner at vertex j * (cells + 1) + i.
+    corner = (np.arange(cells)[None, :] + np.arange(cells)[:, None] * (cells + 1)).ravel()
+    loops = np.stack([corner, corner + 1, corner + cells + 2, corner + cells + 1], axis=1)
+
+    mesh = bpy.data.meshes.new("bench_navmesh")
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set("co", coords.ravel())
+    mesh.loops.add(loops.size)
+    mesh.loops.foreach_set("vertex_index", loops.ravel().astype(np.int32))
+    mesh.polygons.add(len(loops))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, loops.size, 4, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+    blocks = max(1, math.ceil(math.sqrt(regions)))
+    block_x = np.arange(cells)[None, :] * blocks // cells
+    block_y = np.arange(cells)[:, None] * blocks // cells
+    face_regions = ((block_y * blocks + block_x) % regions).ravel()
+
+    palette = np.array([(*region_color(region), 1.0) for region in range(regions)], dtype=np.float32)
+    attribute = mesh.color_attributes.new(color.CAMERA_COLOR_ATTR, 'FLOAT_COLOR', 'CORNER')
+    attribute.data.foreach_set("color", np.repeat(palette[face_regions], 4, axis=0).ravel())
+
+    obj = bpy.data.objects.new("bench_navmesh", mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj, cells, blocks
+
+
+def add_cameras(scene, count, regions, cells, blocks):
+    """Add count cameras to the scene's camera list, looking down at the regions they are colored with."""
+    block_size = cells / blocks
+    for index in range(count):
+        region = index % regions
+        camera = bpy.data.objects.new(f"bench_camera_{index:04d}", bpy.data.cameras.new(f"bench_camera_{index:04d}"))
+        camera.location = ((region % blocks + 0.5) * block_size, (region // blocks + 0.5) * block_size, block_size)
+        camera.rotation_euler = (math.radians(45), 0.0, 0.0)
+        scene.collection.objects.link(camera)
+
+        item = scene.mft_cameras.add()
+        item.camera = camera
+        item.color = region_color(region)
+
+
+def clear_scene(scene):
+    scene.mft_cameras.clear()
+    gc.collect()
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    for collection in (bpy.data.meshes, bpy.data.cameras, bpy.data.lights):
+        for block in list(collection):
+            collection.remove(block)
+
+
+def write_exr_passes(directory, size):
+    """Write one smooth, noisy RGBA EXR per image type, named like the compositor outputs."""
+    rng = np.random.default_rng(0)
+    xs, ys = np.meshgrid(np.linspace(0.0, 1.0, size, dtype=np.float32), np.linspace(0.0, 1.0, size, dtype=np.float32))
+    for index, type_name in enumerate(image_types.IMAGE_TYPES):
+        pixels = np.empty((size, size, 4), dtype=np.float32)
+        pixels[..., 0] = xs
+        pixels[..., 1] = ys
+        pixels[..., 2] = (xs * ys + index * 0.1) % 1.0
+        pixels[..., :3] += rng.normal(0.0, 0.02, (size, size, 3)).astype(np.float32)
+        pixels[..., 3] = 1.0
+
+        image = bpy.data.images.new(f"bench_{type_name}", size, size, alpha=True, float_buffer=True)
+        image.pixels.foreach_set(pixels.ravel())
+        image.filepath_raw = str(Path(directory) / f"{type_name}1.exr")
+        image.file_format = 'OPEN_EXR'
+        image.save()
+        bpy.data.images.remove(image)
+
+
+def encode_profiles() -> dict:
+    return {type_name: addon.mftools.EncodeProfile(lossless=lossless, distance=distance, effort=effort)
+            for type_name, (lossless, distance, effort) in data_models.ENCODE_PROFILE_DEFAULTS.items()}
+
+
+def bench_images(work_dir, size, threads, mip_levels) -> tuple:
+    """Time the EXR to JXL conversion of one view. Returns the timing and the encoded payloads, mips included."""
+    exr_dir = Path(work_dir) / "exr"
+    exr_dir.mkdir()
+    write_exr_passes(exr_dir, size)
+    passes = sorted(save.list_exr_passes(exr_dir))
+
+    start_time = time.perf_counter()
+    results = save.encode_exr_batch(passes, threads, encode_profiles(), mip_levels)
+    seconds = time.perf_counter() - start_time
+
+    failed = [f"{type_name}: {result['error']}" for (type_name, _), result in zip(passes, results) if not result["ok"]]
+    if failed:
+        raise RuntimeError("Conversion failed: " + ", ".join(failed))
+
+    payloads = [bytes(data) for result in results for data in [result["data"], *result["mips"]]]
+    return {"seconds": seconds, "calls": 1, "bytes": sum(map(len, payloads))}, payloads
+
+
+def bench_case(scene, work_dir, triangles, cameras, regions, payloads) -> dict:
+    settings = scene.mft_global_settings
+    navmesh_obj, cells, blocks = build_navmesh(triangles, regions)
+    add_cameras(scene, cameras, regions, cells, blocks)
+    settings.navmesh_object = navmesh_obj
+
+    timings = {}
+
+    def timed(name, fn, *args):
+        start_time = time.perf_counter()
+        result = fn(*args)
+        timing = timings.setdefault(name, {"seconds": 0.0, "calls": 0})
+        timing["seconds"] += time.perf_counter() - start_time
+        timing["calls"] += 1
+        return result
+
+    try:
+        navmesh = navmesh_module.Navmesh(navmesh_obj)
+        views = render_view.create_view_list([item for item in scene.mft_cameras], str(work_dir), scene)
+
+        probes = []
+        for view in views:
+            navmesh_data = timed("get_view_color_tris", navmesh.get_view_color_tris, view._camera_color)
+            timed("place_env_probe", render_view.place_env_probe, view._env_camera_obj, view._main_camera, navmesh_data)
+            probes.append((view._env_camera_obj, view._main_camera, navmesh_data))
+        timed("place_env_probes", render_view.place_env_probes, probes)
+
+        color_to_index = {color.color_to_comparable(view._camera_color): view._camera_index for view in views}
+        timed("view_adjacency", navmesh.view_adjacency, color_to_index)
+
+        image_entries = {}
+        offset = 0
+        for view in views:
+            image_entries[view._name] = {}
+            for type_name in image_types.IMAGE_TYPES:
+                image_entries[view._name][type_name] = (offset, 1 << 16, 512, 512, image_types.IMAGE_CHANNELS[type_name], 32)
+                offset += 1 << 16
+        flatbuffer_bytes = timed("serialize_level", serialize.serialize_level, navmesh, views, image_entries)
+
+        def pack_blob():
+            writer = level_writer.LevelWriter(Path(work_dir) / "bench.mflevel",
+                                              serialize.estimate_level_size(navmesh, views))
+            try:
+                for _ in views:
+                    for payload in payloads:
+                        writer.add_bytes(payload)
+                writer.finish(flatbuffer_bytes)
+            except Exception:
+                writer.abort()
+                raise
+
+        timed("pack_blob", pack_blob)
+        timings["pack_blob"]["bytes"] = len(views) * sum(map(len, payloads))
+
+        return {"triangles": len(navmesh_obj.data.loop_triangles), "cameras": cameras, "regions": regions,
+                "timings": timings}
+    finally:
+        views = None
+        clear_scene(scene)
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="exporter.py", description="Benchmark the exporter on synthetic scenes")
+    parser.add_argument("--triangles", type=int, action="append",
+                        help=f"Navmesh triangle count, repeat for several cases (default {DEFAULT_TRIANGLES})")
+    parser.add_argument("--cameras", type=int, default=16, help="Cameras per scene")
+    parser.add_argument("--regions", type=int, default=16, help="Camera color regions painted on the navmesh")
+    parser.add_argument("--image-size", type=int, default=512, help="Width and height of the synthetic EXR passes")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Native conversion workers, 0 for the exporter's automatic count")
+    parser.add_argument("--mip-levels", type=int, default=0, help="Mips encoded after every pass")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    addon.register()
+    scene = bpy.context.scene
+    clear_scene(scene)
+
+    results = {
+        "blender": bpy.app.version_string,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="mft_bench_") as work_dir:
+        threads = args.threads if args.threads > 0 else conversion.default_worker_count()
+        images, payloads = bench_images(work_dir, args.image_size, threads, args.mip_levels)
+        results["images"] = {"size": args.image_size, "threads": threads, "mip_levels": args.mip_levels,
+                             "timings": {"encode_exr_batch": images}}
+        print(f"encode_exr_batch  {args.image_size}px  {threads} threads  {images['seconds']:.3f}s")
+
+        for triangles in args.triangles or DEFAULT_TRIANGLES:
+            case = bench_case(scene, work_dir, triangles, args.cameras, args.regions, payloads)
+            results["cases"].append(case)
+            for name, timing in case["timings"].items():
+                print(f"{name:<22} {case['triangles']:>9} tris  {timing['seconds']:>9.3f}s")
+
+    addon.unregister()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
@@ -0,0 +1,93 @@
+"""Compare JXL encode profiles on rendered EXR passes.
+
+Usage:
+    python <install dir>/mft_benchmarks/jxl_profiles.py <pass.exr | render dir>... [--profile P]... [--repeats N] [--json out.json]
+
+Runs outside of Blender with the Python the add-on was built for (3.11), using
+the mftools module of the mft_blender_addon directory installed next to this
+one. A render dir is the export's renders/<camera> directory, so every pass of
+a view is measured. Profiles are written as "lossless:<effort>" or
+"<distance>:<effort>"; without --profile a sweep around the add-on defaults is
+measured.
+
+Prints encode time, decode time, size and max error per pass and profile, and
+the totals per profile, which is what the export and the game pay per view.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mft_blender_addon"))
+
+import mftools
+
+DEFAULT_PROFILES = [
+    "lossless:3", "lossless:7",
+    "0.5:7", "1.0:3", "1.0:7", "2.0:3", "2.0:7", "4.0:3",
+]
+
+
+def parse_profile(text) -> mftools.EncodeProfile:
+    quality, _, effort = text.partition(":")
+    effort = int(effort) if effort else 7
+    if quality == "lossless":
+        return mftools.EncodeProfile(lossless=True, effort=effort)
+    return mftools.EncodeProfile(distance=float(quality), effort=effort)
+
+
+def exr_files(paths) -> list:
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob("*.exr")) if path.is_dir() else [path])
+    return files
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="jxl_profiles.py", description="Compare JXL encode profiles on EXR passes")
+    parser.add_argument("inputs", nargs="+", help="EXR files or directories of EXR passes")
+    parser.add_argument("--profile", action="append", dest="profiles", help="lossless:<effort> or <distance>:<effort>")
+    parser.add_argument("--repeats", type=int, default=3, help="Encode and decode each pass this many times, the fastest run counts")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    files = exr_files(args.inputs)
+    if not files:
+        print("No EXR files found", file=sys.stderr)
+        return 1
+
+    profiles = args.profiles or DEFAULT_PROFILES
+    results = []
+    print(f"{'pass':<32} {'profile':<12} {'size':>10} {'ratio':>7} {'encode':>9} {'decode':>9} {'max error':>10}")
+    for exr in files:
+        for profile_name in profiles:
+            # Normals are stored as 2-channel images, see image_types.IMAGE_CHANNELS.
+            channels = 2 if exr.name.startswith("Normal") else 0
+            result = mftools.benchmark_jxl(str(exr), parse_profile(profile_name), args.repeats, channels)
+            if not result["ok"]:
+                print(f"{exr.name:<32} {profile_name:<12} failed")
+                continue
+
+            result.update(file=str(exr), profile=profile_name)
+            results.append(result)
+            print(f"{exr.name:<32} {profile_name:<12} {result['size']:>10} "
+                  f"{result['raw_size'] / max(1, result['size']):>6.1f}x "
+                  f"{result['encode_seconds'] * 1e3:>7.1f}ms {result['decode_seconds'] * 1e3:>7.1f}ms "
+                  f"{result['max_error']:>10.4g}")
+
+    print()
+    print(f"{'profile':<12} {'size':>12} {'encode':>10} {'decode':>10}")
+    for profile_name in profiles:
+        rows = [result for result in results if result["profile"] == profile_name]
+        print(f"{profile_name:<12} {sum(r['size'] for r in rows):>12} "
+              f"{sum(r['encode_seconds'] for r in rows):>9.2f}s {sum(r['decode_seconds'] for r in rows):>9.2f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
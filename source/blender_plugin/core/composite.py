@@ -1,12 +1,18 @@
 import bpy
 
 
+# Outputs written as half-float EXRs when half_float_lighting is enabled.
+HALF_FLOAT_OUTPUTS = ("DirectDiffuse#", "DirectSpecular#", "IndirectDiffuse#", "IndirectSpecular#")
+
+
 class CompositeManager:
     _tree = None
     _layer_node = None
     _output_node = None
+    _half_float_lighting = False
 
-    def __init__(self, scene):
+    def __init__(self, scene, half_float_lighting=False):
+        self._half_float_lighting = half_float_lighting
 
         # Blender 5.0+: Create compositor node tree as a separate data block
         scene.view_layers["ViewLayer"].use_pass_combined = True
@@ -57,6 +63,17 @@ class CompositeManager:
         self._output_node.file_output_items.new("RGBA", "IndirectSpecular#")
         self._output_node.file_output_items.new("RGBA", "Normal#")
 
+        # lighting slots in half precision
+        if self._half_float_lighting:
+            for name in HALF_FLOAT_OUTPUTS:
+                slot = self._output_node.file_output_items.get(name)
+                slot.override_node_format = True
+                slot.format.media_type = "IMAGE"
+                slot.format.file_format = "OPEN_EXR"
+                slot.format.color_mode = "RGB"
+                slot.format.exr_codec = "ZIP"
+                slot.format.color_depth = "16"
+
         # add depth slot with BW color mode
         self._output_node.file_output_items.new("FLOAT", "Depth#")
         depth_slot = self._output_node.file_output_items.get("Depth#")
@@ -221,7 +238,8 @@ class CompositeManager:
         links.new(oct_px.outputs[0], oct_remap_x.inputs[0])
         links.new(oct_py.outputs[0], oct_remap_y.inputs[0])
 
-        # Combine into output: R=oct_x, G=oct_y, B=0
+        # Combine into output: R=oct_x, G=oct_y, B=0. B is dropped when the pass
+        # is encoded, the level stores normals as a 2-channel image.
         oct_comb = self._tree.nodes.new(type="ShaderNodeCombineXYZ")
         links.new(oct_remap_x.outputs[0], oct_comb.inputs[0])
         links.new(oct_remap_y.outputs[0], oct_comb.inputs[1])
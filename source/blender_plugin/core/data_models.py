@@ -223,6 +223,67 @@ class MFT_ShadowLight(PropertyGroup):
     )
 
 
+# JXL encoder defaults per image type as (lossless, distance, effort). Depth and
+# normals feed reprojection and lighting, so they are stored exactly; indirect
+# lighting is low frequency and tolerates a faster, lossier encode.
+ENCODE_PROFILE_DEFAULTS = {
+    'DirectDiffuse':    (False, 1.0, 7),
+    'DirectSpecular':   (False, 1.0, 7),
+    'IndirectDiffuse':  (False, 2.0, 3),
+    'IndirectSpecular': (False, 2.0, 3),
+    'Normal':           (True,  1.0, 7),
+    'Depth':            (True,  1.0, 7),
+    'Environment':      (False, 1.0, 7),
+}
+
+# MFT_GlobalSettings property holding the encode profile of each image type.
+ENCODE_PROFILE_PROPERTIES = {
+    'DirectDiffuse':    "encode_direct_diffuse",
+    'DirectSpecular':   "encode_direct_specular",
+    'IndirectDiffuse':  "encode_indirect_diffuse",
+    'IndirectSpecular': "encode_indirect_specular",
+    'Normal':           "encode_normal",
+    'Depth':            "encode_depth",
+    'Environment':      "encode_environment",
+}
+
+
+def _encode_profile_group(type_name, lossless, distance, effort):
+    """PropertyGroup with the JXL encode settings of one image type.
+
+    One class per type, since a PointerProperty can't override the defaults of
+    the group it points to.
+    """
+    return type(f"MFT_EncodeProfile{type_name}", (PropertyGroup,), {
+        "__doc__": f"JXL encode settings of the {type_name} pass",
+        "__annotations__": {
+            "lossless": BoolProperty(
+                name="Lossless",
+                description="Store the exact float values of the pass",
+                default=lossless
+            ),
+            "distance": FloatProperty(
+                name="Distance",
+                description="Allowed error of lossy encoding, 1.0 is visually lossless and higher is smaller",
+                default=distance,
+                min=0.01,
+                max=25.0
+            ),
+            "effort": IntProperty(
+                name="Effort",
+                description="Encoder effort, higher is slower but smaller",
+                default=effort,
+                min=1,
+                max=9
+            ),
+        },
+    })
+
+
+_encode_profile_groups = {type_name: _encode_profile_group(type_name, *defaults)
+                          for type_name, defaults in ENCODE_PROFILE_DEFAULTS.items()}
+
+
 class MFT_GlobalSettings(PropertyGroup):
     """Group of global properties for the addon"""
     export_directory: StringProperty(
@@ -260,8 +321,52 @@ class MFT_GlobalSettings(PropertyGroup):
         max=1024
     )
 
+    half_float_lighting: BoolProperty(
+        name="Half-Float Lighting",
+        description="Render and store the direct and indirect lighting passes as half floats, halving their disk and texture memory",
+        default=True
+    )
+
+    preview_mip_levels: IntProperty(
+        name="Preview Mip Levels",
+        description="Downscaled copies stored with every image, each half the size of the last, so the game can show a view before its full-resolution images are loaded",
+        default=0,
+        min=0,
+        max=4
+    )
+
+    incremental_export: BoolProperty(
+        name="Skip Unchanged Views",
+        description="Reuse the images of views whose camera, settings and scene content are unchanged since the last export",
+        default=True
+    )
+    conversion_workers: IntProperty(
+        name="Conversion Threads",
+        description="Number of native threads converting EXR passes to JXL alongside the renderer (0 = auto)",
+        default=0,
+        min=0,
+        soft_max=64
+    )
+
+    shard_count: IntProperty(
+        name="Worker Processes",
+        description="Number of background Blender processes used by parallel export",
+        default=2,
+        min=1,
+        soft_max=16
+    )
+
+    encode_direct_diffuse: PointerProperty(type=_encode_profile_groups['DirectDiffuse'])
+    encode_direct_specular: PointerProperty(type=_encode_profile_groups['DirectSpecular'])
+    encode_indirect_diffuse: PointerProperty(type=_encode_profile_groups['IndirectDiffuse'])
+    encode_indirect_specular: PointerProperty(type=_encode_profile_groups['IndirectSpecular'])
+    encode_normal: PointerProperty(type=_encode_profile_groups['Normal'])
+    encode_depth: PointerProperty(type=_encode_profile_groups['Depth'])
+    encode_environment: PointerProperty(type=_encode_profile_groups['Environment'])
+
     current_view: IntProperty(default=0)
     total_views: IntProperty(default=0)
+    conversion_queue_depth: IntProperty(default=0)
     is_rendering: BoolProperty(default=False)
     cancel_rendering: BoolProperty(default=False)
 
@@ -501,6 +606,7 @@ def unregister_properties():
     del bpy.types.Scene.mft_shadow_light_index
 
 classes = (
+    *_encode_profile_groups.values(),
     MFT_GlobalSettings,
     MFT_Camera,
     MFT_ShadowLight,
@@ -1,15 +1,108 @@
 import bpy
-import bmesh
 import mathutils
+import numpy as np
+
+from . import trace
+from . color import CAMERA_COLOR_ATTR, color_to_comparable
+
+
+class NavmeshIndex:
+    """
+    Triangles of a navmesh grouped by camera color, built once per export.
+
+    The loop triangles are stored as one (triangles, 3, 3) float32 array of
+    object space vertex positions, sorted by the color of the face they come
+    from, so the triangles of a view are a slice of it. Faces are colored
+    with their camera's color, so the index serves every view of the export.
+    tri_vertices and tri_faces hold the vertex indices and face of every row,
+    for writing the navmesh without reading the mesh again.
+    """
+
+    def __init__(self, mesh):
+        num_faces = len(mesh.polygons)
+        self.face_color_ids = np.full(num_faces, -1, dtype=np.int32)
+        self._colors = np.empty((0, 3), dtype=np.float64)
+
+        attribute = mesh.color_attributes.get(CAMERA_COLOR_ATTR)
+        if attribute is not None and attribute.domain == 'CORNER' and attribute.data_type == 'FLOAT_COLOR':
+            loop_colors = np.empty(len(mesh.loops) * 4, dtype=np.float32)
+            attribute.data.foreach_get("color", loop_colors)
+            loop_starts = np.empty(num_faces, dtype=np.int32)
+            mesh.polygons.foreach_get("loop_start", loop_starts)
+
+            # All loops of a face share its color, see color.face_color(). Colors
+            # are grouped exactly and rounded only where they are matched, so
+            # they round the same way as the camera colors they are looked up by.
+            face_colors = loop_colors.reshape(-1, 4)[loop_starts, :3]
+            colors, face_color_ids = np.unique(face_colors, axis=0, return_inverse=True)
+            self.face_color_ids = face_color_ids.reshape(-1).astype(np.int32)
+            self._colors = colors.astype(np.float64)
+
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        tri_verts = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_verts)
+        tri_faces = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", tri_faces)
+
+        tri_color_ids = self.face_color_ids[tri_faces]
+        order = np.argsort(tri_color_ids, kind='stable')
+        self.vertices = coords.reshape(-1, 3)
+        self.tri_vertices = tri_verts.reshape(-1, 3)[order]
+        self.tri_faces = tri_faces[order]
+        self.tri_color_ids = tri_color_ids[order]
+        self.triangles = self.vertices[self.tri_vertices]
+
+        # Triangles of color id i are triangles[starts[i]:starts[i + 1]].
+        self._starts = np.searchsorted(self.tri_color_ids, np.arange(len(self._colors) + 1))
+        self._hulls = {}
+
+    def color_ids(self, camera_color, tolerance=0.01):
+        """Ids of the face colors within tolerance of a camera color on every channel, like color.colors_match()."""
+        camera_color = np.asarray(camera_color[:3], dtype=np.float64)
+        return np.flatnonzero((np.abs(self._colors - camera_color) < tolerance).all(axis=1))
+
+    def view_triangles(self, camera_color):
+        """(triangles, 3, 3) array of the triangles painted with a camera color."""
+        color_ids = self.color_ids(camera_color)
+        if len(color_ids) == 1:
+            return self.triangles[self._starts[color_ids[0]]:self._starts[color_ids[0] + 1]]
+        return np.concatenate([self.triangles[:0]] +
+                              [self.triangles[self._starts[i]:self._starts[i + 1]] for i in color_ids])
+
+    def convex_hull_2d(self, camera_color) -> list:
+        """XY convex hull of the triangles painted with a camera color, as a list of [x, y]."""
+        key = tuple(self.color_ids(camera_color).tolist())
+        if key not in self._hulls:
+            points = np.unique(self.view_triangles(camera_color)[:, :, :2].reshape(-1, 2), axis=0).tolist()
+            self._hulls[key] = [points[i] for i in mathutils.geometry.convex_hull_2d(points)] if points else []
+        return self._hulls[key]
+
+    def face_view_ids(self, view_index_map):
+        """
+        View index of every face.
+
+        Args:
+            view_index_map: Dictionary mapping comparable camera colors to view indices
 
-from . color import CAMERA_COLOR_ATTR, color_to_comparable, colors_match, face_color
+        Returns:
+            int32 array with one view index per face, -1 for faces whose color
+            is not a camera's
+        """
+        color_views = np.full(len(self._colors) + 1, -1, dtype=np.int32)
+        for color_id, color in enumerate(self._colors.tolist()):
+            color_views[color_id] = view_index_map.get(color_to_comparable(color), -1)
+        # Uncolored faces have id -1, which picks the trailing -1.
+        return color_views[self.face_color_ids]
 
 
 class Navmesh:
     def __init__(self, object):
         self.object = object
+        self._index = None
 
-        self.object.data.calc_loop_triangles()
+        with trace.span("calc_loop_triangles", "navmesh", object=object.name):
+            self.object.data.calc_loop_triangles()
 
     def select_edit_navmesh(self):
         bpy.ops.object.select_all(action="DESELECT")
@@ -20,10 +113,73 @@ class Navmesh:
         bpy.ops.object.mode_set(mode="OBJECT")
         bpy.ops.object.select_all(action="DESELECT")
 
+    @property
+    def index(self) -> NavmeshIndex:
+        """The triangle index of the mesh, built on first use. Create a new Navmesh after editing the mesh."""
+        if self._index is None:
+            with trace.span("build navmesh index", "navmesh", object=self.object.name):
+                self._index = NavmeshIndex(self.object.data)
+        return self._index
+
+    def view_adjacency(self, view_index_map) -> dict:
+        """
+        Adjacent views of every view in one pass over the mesh.
+
+        Two views are adjacent when their faces share a vertex or are one edge
+        apart, so views separated by a thin strip of unassigned faces still
+        connect. The graph is symmetric.
+
+        Args:
+            view_index_map: Dictionary mapping comparable camera colors to view indices
+
+        Returns:
+            Dictionary mapping every view index to a sorted list of adjacent view indices
+        """
+        adjacency = {view_index: [] for view_index in view_index_map.values()}
+        face_views = self.index.face_view_ids(view_index_map)
+
+        mesh = self.object.data
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edge_verts)
+        edge_verts = edge_verts.reshape(-1, 2)
+
+        # The views touching each vertex, as rows of a (vertices, max views per vertex) table padded with -1.
+        vert_view_pairs = np.stack([loop_verts, np.repeat(face_views, loop_totals)], axis=1)
+        vert_view_pairs = np.unique(vert_view_pairs[vert_view_pairs[:, 1] >= 0], axis=0)
+        if len(vert_view_pairs) == 0:
+            return adjacency
+
+        verts, first_pair, views_per_vert = np.unique(vert_view_pairs[:, 0], return_index=True, return_counts=True)
+        slot = np.arange(len(vert_view_pairs)) - np.repeat(first_pair, views_per_vert)
+        vert_views = np.full((len(mesh.vertices), views_per_vert.max()), -1, dtype=np.int32)
+        vert_views[vert_view_pairs[:, 0], slot] = vert_view_pairs[:, 1]
+
+        # Only edges touching more than one view can connect two of them.
+        views_a = vert_views[edge_verts[:, 0]]
+        views_b = vert_views[edge_verts[:, 1]]
+        single_view = ((views_a[:, 1:] < 0).all(axis=1) & (views_b[:, 1:] < 0).all(axis=1) &
+                       (views_a[:, 0] == views_b[:, 0]))
+        views_a = views_a[~single_view]
+        views_b = views_b[~single_view]
+
+        pairs = np.stack(np.broadcast_arrays(views_a[:, :, None], views_b[:, None, :]), axis=-1).reshape(-1, 2)
+        pairs = pairs[(pairs[:, 0] >= 0) & (pairs[:, 1] >= 0) & (pairs[:, 0] != pairs[:, 1])]
+        pairs = np.unique(np.concatenate([pairs, pairs[:, ::-1]]), axis=0)
+
+        for view_index, adjacent_index in pairs.tolist():
+            adjacency.setdefault(view_index, []).append(adjacent_index)
+        return adjacency
+
     def find_adjacent_views(self, camera_color, view_index_map) -> list:
         """
         Find adjacent views by camera color.
 
+        Walks the whole mesh, prefer view_adjacency() when all views are needed.
+
         Args:
             camera_color: RGB tuple of the camera color to find adjacencies for
             view_index_map: Dictionary mapping camera colors to view indices
@@ -31,45 +187,8 @@ class Navmesh:
         Returns:
             List of adjacent view indices
         """
-        bm = bmesh.new()
-        bm.from_mesh(self.object.data)
-
-        color_layer = bm.loops.layers.float_color.get(CAMERA_COLOR_ATTR)
-        if not color_layer:
-            bm.free()
-            return []
-
-        adj_views = list()
-
-        # Find all faces matching the current camera color
-        current_view_faces = [
-            f for f in bm.faces
-            if colors_match(face_color(f, color_layer), camera_color)
-        ]
-
-        # Find adjacent faces with different colors
-        for f in current_view_faces:
-            for edge in f.edges:
-                for adj_face in edge.link_faces:
-                    adj_color = color_to_comparable(face_color(adj_face, color_layer))
-                    if not colors_match(face_color(adj_face, color_layer), camera_color):
-                        if adj_color in view_index_map:
-                            adj_views.append(view_index_map[adj_color])
-
-            # Check vertex-edge-vertex adjacency
-            for vert in f.verts:
-                for edge in vert.link_edges:
-                    other_vert = edge.other_vert(vert)
-                    if other_vert not in f.verts:
-                        for other_face in other_vert.link_faces:
-                            adj_color = color_to_comparable(face_color(other_face, color_layer))
-                            if not colors_match(face_color(other_face, color_layer), camera_color):
-                                if adj_color in view_index_map:
-                                    adj_views.append(view_index_map[adj_color])
-
-        bm.free()
-
-        return list(set(adj_views))
+        view_index = view_index_map.get(color_to_comparable(camera_color))
+        return self.view_adjacency(view_index_map).get(view_index, [])
 
     def get_view_color_tris(self, camera_color) -> tuple:
         """
@@ -79,41 +198,6 @@ class Navmesh:
             camera_color: RGB tuple of the camera color
 
         Returns:
-            Tuple of (triangles list, convex_hull_2d list)
+            Tuple of ((n, 3, 3) triangle vertex array, convex_hull_2d list)
         """
-        bm = bmesh.new()
-        bm.from_mesh(self.object.data)
-        bm.faces.ensure_lookup_table()
-
-        color_layer = bm.loops.layers.float_color.get(CAMERA_COLOR_ATTR)
-        if not color_layer:
-            bm.free()
-            return [], []
-
-        verts = list()
-        triangles = list()
-
-        # Triangulate the bmesh
-        bmesh.ops.triangulate(bm, faces=bm.faces)
-        bm.faces.ensure_lookup_table()
-
-        for f in bm.faces:
-            if colors_match(face_color(f, color_layer), camera_color):
-                # Create a simple object to hold triangle vertex coordinates
-                tri_verts = [vert.co.copy() for vert in f.verts]
-                tri_obj = type('Triangle', (), {'verts': tri_verts})()
-                triangles.append(tri_obj)
-                for vert in f.verts:
-                    verts.append([vert.co.x, vert.co.y])
-
-        if len(verts) == 0:
-            bm.free()
-            return triangles, []
-
-        vert_indicies = mathutils.geometry.convex_hull_2d(verts)
-
-        bm.free()
-
-        convex_hull_2d = [verts[i] for i in vert_indicies if i < len(verts)]
-
-        return triangles, convex_hull_2d
+        return self.index.view_triangles(camera_color), self.index.convex_hull_2d(camera_color)
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Batched ray casts against navmesh triangles and the vertical walls of a
+# view's convex hull. Every function takes arrays of rays and targets whose
+# leading dimensions broadcast against each other, so one call tests a ray
+# against every triangle of a view, or every ray of a level against the
+# triangles of its own view, without a Python loop.
+
+# Rays closer than this to parallel with a triangle or wall miss it.
+PARALLEL_EPSILON = 1e-12
+
+
+def intersect_rays_tris(origins, directions, tris):
+    """
+    Intersect rays with triangles, on both faces, like mathutils.geometry.intersect_ray_tri().
+
+    Args:
+        origins: (..., 3) ray origins
+        directions: (..., 3) ray directions
+        tris: (..., 3, 3) triangle vertex positions
+
+    Returns:
+        Array of the broadcast leading shape with the distance of each hit
+        along its ray in multiples of the direction, nan where the ray misses
+        the triangle or the triangle lies behind the origin
+    """
+    origins = np.asarray(origins, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    tris = np.asarray(tris, dtype=np.float64)
+
+    # Möller-Trumbore, see isect_ray_tri_v3() in Blender.
+    edge_1 = tris[..., 1, :] - tris[..., 0, :]
+    edge_2 = tris[..., 2, :] - tris[..., 0, :]
+    p = np.cross(directions, edge_2)
+    det = np.einsum('...i,...i->...', edge_1, p)
+    parallel = np.abs(det) < PARALLEL_EPSILON
+    inv_det = 1.0 / np.where(parallel, 1.0, det)
+
+    s = origins - tris[..., 0, :]
+    u = np.einsum('...i,...i->...', s, p) * inv_det
+    q = np.cross(s, edge_1)
+    v = np.einsum('...i,...i->...', directions, q) * inv_det
+    t = np.einsum('...i,...i->...', edge_2, q) * inv_det
+
+    hit = ~parallel & (u >= 0.0) & (u <= 1.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0)
+    return np.where(hit, t, np.nan)
+
+
+def intersect_lines_walls(starts, ends, wall_starts, wall_ends):
+    """
+    Intersect lines with infinite vertical walls standing on 2D segments.
+
+    A hit counts when it lies within the segment's length of both its end
+    points in XY, as place_env_probe() has always tested hull edges.
+
+    Args:
+        starts: (..., 3) first points of the lines
+        ends: (..., 3) second points of the lines
+        wall_starts: (..., 2) first XY end points of the wall segments
+        wall_ends: (..., 2) second XY end points of the wall segments
+
+    Returns:
+        Array of the broadcast leading shape with each hit as a factor t of
+        start + t * (end - start), which may be negative as the lines are
+        infinite, nan where a line misses its wall
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    directions = np.asarray(ends, dtype=np.float64) - starts
+    wall_starts = np.asarray(wall_starts, dtype=np.float64)
+    wall_ends = np.asarray(wall_ends, dtype=np.float64)
+
+    # The wall's normal is Z cross (end - start) and has no Z component.
+    edges = wall_starts - wall_ends
+    normals = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+    denom = np.einsum('...i,...i->...', directions[..., :2], normals)
+    parallel = np.abs(denom) < PARALLEL_EPSILON
+    t = np.einsum('...i,...i->...', wall_starts - starts[..., :2], normals) / np.where(parallel, 1.0, denom)
+
+    points = starts[..., :2] + t[..., None] * directions[..., :2]
+    edge_length = np.linalg.norm(edges, axis=-1)
+    within = ((np.linalg.norm(points - wall_starts, axis=-1) <= edge_length) &
+              (np.linalg.norm(points - wall_ends, axis=-1) <= edge_length))
+    return np.where(~parallel & within, t, np.nan)
+
+
+def first_per_group(groups, keys) -> tuple:
+    """
+    Index of the smallest key of every group, the earliest one on ties.
+
+    Args:
+        groups: (n,) group of every element
+        keys: (n,) sort key of every element
+
+    Returns:
+        Tuple of (groups present, index of their smallest key)
+    """
+    order = np.lexsort((keys, groups))
+    present, first = np.unique(groups[order], return_index=True)
+    return present, order[first]
@@ -1,8 +1,10 @@
 import bpy
 import mathutils
 import math
+import numpy as np
 from enum import Enum
 
+from . import raycast
 from .composite import *
 
 
@@ -65,64 +67,70 @@ def place_env_probe(env_camera_obj, main_camera, navmesh_data):
 
     Raycasts from main_camera toward the navmesh perimeter and floor tris to
     find the closest and farthest intersection points, then positions the env
-    probe camera at their midpoint.
+    probe camera at their midpoint. navmesh_data is the (triangles, convex
+    hull) pair returned by Navmesh.get_view_color_tris().
     """
-    tris, convex_hull, = navmesh_data
+    place_env_probes([(env_camera_obj, main_camera, navmesh_data)])
 
-    trace_dir = main_camera.matrix_world.to_quaternion() @ mathutils.Vector((0.0, 0.0, -10000.0))
-    trace_start = main_camera.location
-    trace_end = trace_start + trace_dir
 
-    point_close = trace_end
-    point_far = trace_start
+def place_env_probes(probes):
+    """Place the env probes of many views with one batched ray cast.
 
-    # Ray trace vertical walls of the prism
-    for i in range(len(convex_hull)):
-        point_a = mathutils.Vector((convex_hull[i][0], convex_hull[i][1], 0))
-        point_b = mathutils.Vector(
-            (convex_hull[i - 1][0], convex_hull[i - 1][1], 0)
-        )
-        plane_normal = mathutils.Vector((0.0, 0.0, 1.0)).cross(point_a - point_b)
-
-        intersection = mathutils.geometry.intersect_line_plane(
-            trace_start, trace_end, point_a, plane_normal
-        )
-
-        if intersection:
-            ab_length = point_a - point_b
-            ab_length.z = 0
-            ab_length = ab_length.length
-            ia_length = intersection - point_a
-            ia_length.z = 0
-            ia_length = ia_length.length
-            ib_length = intersection - point_b
-            ib_length.z = 0
-            ib_length = ib_length.length
-
-            if ia_length <= ab_length and ib_length <= ab_length:
-                if (point_close - trace_start).length > (
-                    intersection - trace_start
-                ).length:
-                    point_close = intersection
-                if (point_far - trace_start).length < (
-                    intersection - trace_start
-                ).length:
-                    point_far = intersection
-
-    # Ray trace navmesh tris
-    for tri in tris:
-        intersection = mathutils.geometry.intersect_ray_tri(tri.verts[0], tri.verts[1], tri.verts[2], trace_dir, trace_start)
-
-        if intersection:
-            point_far = intersection
-
-    if point_close is trace_end:
-        point_close = trace_start
-
-    if point_far is trace_start:
-        point_far = trace_start
-
-    env_camera_obj.location = (point_close + point_far) * 0.5
+    probes is a list of (env_camera_obj, main_camera, navmesh_data) tuples,
+    see place_env_probe(). Every camera's ray is only tested against the
+    hull walls and triangles of its own view, all views in the same NumPy
+    pass.
+    """
+    if not probes:
+        return
+
+    trace_starts = np.array([tuple(main_camera.location) for _, main_camera, _ in probes], dtype=np.float64)
+    trace_dirs = np.array([tuple(main_camera.matrix_world.to_quaternion() @ mathutils.Vector((0.0, 0.0, -10000.0)))
+                           for _, main_camera, _ in probes], dtype=np.float64)
+
+    # Hull walls run from each hull point to the one before it.
+    hulls = [np.asarray(hull, dtype=np.float64).reshape(-1, 2) for _, _, (_, hull) in probes]
+    wall_rays = np.repeat(np.arange(len(probes)), [len(hull) for hull in hulls])
+    wall_starts = np.concatenate(hulls)
+    wall_ends = np.concatenate([np.roll(hull, 1, axis=0) for hull in hulls])
+
+    tris = [np.asarray(tris, dtype=np.float64).reshape(-1, 3, 3) for _, _, (tris, _) in probes]
+    tri_rays = np.repeat(np.arange(len(probes)), [len(view_tris) for view_tris in tris])
+    tris = np.concatenate(tris)
+
+    wall_hits = raycast.intersect_lines_walls(trace_starts[wall_rays], trace_starts[wall_rays] + trace_dirs[wall_rays],
+                                              wall_starts, wall_ends)
+    tri_hits = raycast.intersect_rays_tris(trace_starts[tri_rays], trace_dirs[tri_rays], tris)
+
+    # Distances along the rays as multiples of trace_dir. The close point
+    # defaults to the trace end and the far point to the trace start.
+    close = np.ones(len(probes))
+    far = np.zeros(len(probes))
+    close_hit = np.zeros(len(probes), dtype=bool)
+
+    wall_hit = ~np.isnan(wall_hits)
+    rays, hits = wall_rays[wall_hit], wall_hits[wall_hit]
+    near_rays, nearest = raycast.first_per_group(rays, np.abs(hits))
+    nearer = np.abs(hits[nearest]) < 1.0
+    close[near_rays[nearer]] = hits[nearest][nearer]
+    close_hit[near_rays[nearer]] = True
+
+    far_rays, farthest = raycast.first_per_group(rays, -np.abs(hits))
+    farther = np.abs(hits[farthest]) > 0.0
+    far[far_rays[farther]] = hits[farthest][farther]
+
+    # Any floor hit moves the far point, the last triangle hit of a view wins.
+    tri_hit = np.flatnonzero(~np.isnan(tri_hits))
+    last_tri = np.full(len(probes), -1)
+    np.maximum.at(last_tri, tri_rays[tri_hit], tri_hit)
+    floor_hit = last_tri >= 0
+    far[floor_hit] = tri_hits[last_tri[floor_hit]]
+
+    # Without a wall within reach the close point falls back to the trace start.
+    close[~close_hit] = 0.0
+    locations = trace_starts + (close + far)[:, None] * 0.5 * trace_dirs
+    for (env_camera_obj, _, _), location in zip(probes, locations.tolist()):
+        env_camera_obj.location = location
 
 
 class RenderView:
@@ -149,6 +157,9 @@ class RenderView:
 
     _current_render = RenderType.Main
 
+    # Set when the fingerprint cache says this view's images are up to date.
+    _cached = False
+
     def __init__(self, object, camera_index, output_path, scene):
 
         self._res_x = scene.mft_global_settings.render_width
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Export instrumentation in the Chrome trace event format, loadable in
+# chrome://tracing or ui.perfetto.dev. Spans are only recorded between start()
+# and stop(), so the helpers below are cheap no-ops outside of an export.
+
+_lock = threading.Lock()
+_events = None
+_named_threads = set()
+_native_threads = {}
+_origin = 0.0
+
+
+def start():
+    global _events, _origin
+
+    with _lock:
+        _events = []
+        _named_threads.clear()
+        _native_threads.clear()
+        _origin = time.perf_counter()
+
+
+def stop() -> list:
+    """Stop recording and return the recorded events."""
+    global _events
+
+    with _lock:
+        events = _events or []
+        _events = None
+        return events
+
+
+def is_active() -> bool:
+    return _events is not None
+
+
+def _to_us(timestamp) -> float:
+    return (timestamp - _origin) * 1e6
+
+
+def add_span(name, start_time, end_time, category="export", *, thread_name=None, **args):
+    """Record a span from two time.perf_counter() values taken on the current thread.
+
+    Spans timed by native code on its own threads pass a thread_name instead,
+    each name gets its own track.
+    """
+    if _events is None:
+        return
+
+    if thread_name is None:
+        thread_name = threading.current_thread().name
+        tid = threading.get_native_id()
+    else:
+        with _lock:
+            tid = _native_threads.setdefault(thread_name, -(len(_native_threads) + 1))
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": _to_us(start_time),
+        "dur": (end_time - start_time) * 1e6,
+        "pid": os.getpid(),
+        "tid": tid,
+        "args": args,
+    }
+
+    with _lock:
+        if _events is None:
+            return
+        if tid not in _named_threads:
+            _named_threads.add(tid)
+            _events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                            "args": {"name": thread_name}})
+        _events.append(event)
+
+
+@contextmanager
+def span(name, category="export", **args):
+    if _events is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, start_time, time.perf_counter(), category, **args)
+
+
+def write_trace(path, events):
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def view_totals(events) -> list:
+    """Seconds spent per view and category, slowest views first.
+
+    Returns a list of (view_name, {category: seconds}) tuples.
+    """
+    totals = {}
+    for event in events:
+        view = event.get("args", {}).get("view")
+        if event["ph"] != "X" or view is None:
+            continue
+        categories = totals.setdefault(view, {})
+        categories[event["cat"]] = categories.get(event["cat"], 0.0) + event["dur"] / 1e6
+
+    return sorted(totals.items(), key=lambda item: sum(item[1].values()), reverse=True)
+
+
+def slowest_views_table(events, count=10) -> str:
+    rows = view_totals(events)[:count]
+    if not rows:
+        return ""
+
+    categories = sorted({category for _, totals in rows for category in totals})
+    width = max(len("View"), *(len(view) for view, _ in rows))
+
+    lines = ["View".ljust(width) + "".join(f"  {category:>10}" for category in categories) + f"  {'total':>10}"]
+    for view, totals in rows:
+        lines.append(view.ljust(width) +
+                     "".join(f"  {totals.get(category, 0.0):>9.2f}s" for category in categories) +
+                     f"  {sum(totals.values()):>9.2f}s")
+
+    return "\n".join(lines)
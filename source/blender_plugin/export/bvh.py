@@ -0,0 +1,99 @@
+import numpy as np
+
+# Bounding volume hierarchy over the navmesh triangles, baked into the level
+# as Level.navmesh_bvh so loaders answer position -> view and ground height
+# queries in logarithmic time instead of scanning navmesh_tris.
+#
+# Triangles are sorted along a Morton curve through their centroids and the
+# sorted range is split in halves, level by level, until each node holds at
+# most LEAF_SIZE triangles. Nodes are stored breadth first, the children of
+# an inner node next to each other, which makes the whole build a handful of
+# NumPy passes per tree level. navmesh_tris must be written in the returned
+# order so leaves refer to contiguous triangle ranges.
+
+LEAF_SIZE = 8
+
+# Layout of the BvhNode struct in level.fbs: for leaves, first is the index
+# of the first triangle and count the number of triangles; inner nodes have
+# a count of 0 and their children at first and first + 1.
+NODE_DTYPE = np.dtype([('box_min', '<f4', 3), ('box_max', '<f4', 3), ('first', '<u4'), ('count', '<u4')])
+
+
+def _spread_bits(values):
+    """Move the low 10 bits of every value to every third bit."""
+    values = values.astype(np.uint32) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points):
+    """30-bit Morton codes of (n, 3) points, quantized to 1024 steps over their bounds on every axis."""
+    low = points.min(axis=0)
+    extent = points.max(axis=0) - low
+    cells = ((points - low) / np.where(extent > 0.0, extent, 1.0) * 1023.0).astype(np.uint32)
+    return (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1) | _spread_bits(cells[:, 2])
+
+
+def build_bvh(tris, leaf_size=LEAF_SIZE) -> tuple:
+    """
+    Build a BVH over triangles.
+
+    Args:
+        tris: (n, 3, 3) triangle vertex positions
+        leaf_size: Maximum number of triangles per leaf
+
+    Returns:
+        Tuple of (order, nodes): the triangle indices in the order the leaves
+        refer to them, and a NODE_DTYPE array with the root first. Both are
+        empty when there are no triangles.
+    """
+    tris = np.asarray(tris, dtype=np.float32).reshape(-1, 3, 3)
+    num_tris = len(tris)
+    if num_tris == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=NODE_DTYPE)
+
+    order = np.argsort(morton_codes(tris.mean(axis=1)), kind='stable')
+    tri_min = tris.min(axis=1)[order]
+    tri_max = tris.max(axis=1)[order]
+
+    # Split the sorted range top down, one tree level per iteration.
+    levels = []
+    starts = np.zeros(1, dtype=np.int64)
+    ends = np.full(1, num_tris, dtype=np.int64)
+    num_nodes = 1
+    while len(starts):
+        sizes = ends - starts
+        inner = sizes > leaf_size
+        first = np.where(inner, 0, starts)
+        first[inner] = num_nodes + 2 * np.arange(np.count_nonzero(inner))
+        levels.append((num_nodes - len(starts), starts, np.where(inner, 0, sizes), first))
+        num_nodes += 2 * np.count_nonzero(inner)
+
+        # Split at a multiple of leaf_size so that only the last leaf of a range is partly filled.
+        chunks = -(-sizes[inner] // leaf_size)
+        mids = starts[inner] + (chunks + 1) // 2 * leaf_size
+        starts, ends = np.stack([starts[inner], mids], axis=1).ravel(), np.stack([mids, ends[inner]], axis=1).ravel()
+
+    nodes = np.zeros(num_nodes, dtype=NODE_DTYPE)
+    for level_start, starts, counts, first in levels:
+        level = slice(level_start, level_start + len(starts))
+        nodes['first'][level] = first
+        nodes['count'][level] = counts
+
+    # Leaves tile the sorted triangles, so their bounds are one reduction over sorted leaf starts.
+    leaves = np.flatnonzero(nodes['count'])
+    leaves = leaves[np.argsort(nodes['first'][leaves])]
+    nodes['box_min'][leaves] = np.minimum.reduceat(tri_min, nodes['first'][leaves], axis=0)
+    nodes['box_max'][leaves] = np.maximum.reduceat(tri_max, nodes['first'][leaves], axis=0)
+
+    # Inner nodes bottom up, the deeper level is complete by the time its parents are reached.
+    for level_start, starts, counts, first in reversed(levels):
+        inner = level_start + np.flatnonzero(counts == 0)
+        children = nodes['first'][inner]
+        nodes['box_min'][inner] = np.minimum(nodes['box_min'][children], nodes['box_min'][children + 1])
+        nodes['box_max'][inner] = np.maximum(nodes['box_max'][children], nodes['box_max'][children + 1])
+
+    return order, nodes
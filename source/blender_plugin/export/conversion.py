@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import save
+from .image_types import mip_key
+
+from ..core import trace
+
+
+def default_worker_count() -> int:
+    """Conversion workers to use when the user leaves the setting on auto.
+
+    Cycles keeps rendering the next view while passes are converted, so only a
+    quarter of the machine is handed to EXR->JXL conversion.
+    """
+    return max(1, (os.cpu_count() or 4) // 4)
+
+
+class ConversionQueue:
+    """Bounded queue encoding rendered EXR passes to JXL while rendering continues.
+
+    Finished views wait until the feeding thread takes them. It hands the
+    passes of every waiting view, up to twice max_workers passes, to
+    mftools.convert_batch() as one batch, which reads and encodes them on a
+    native thread pool of max_workers threads without holding the GIL. When
+    conversion falls behind, passes of several views are thus in flight at
+    once, not just the few of a single view. The feeding thread is the only
+    Python thread, so callbacks never run concurrently. The queue reports
+    itself as saturated once more than max_pending passes are waiting; the
+    exporter holds back the next render until it drains, which keeps the
+    backlog (and the EXRs on disk) bounded on machines where conversion is
+    slower than rendering.
+
+    Encoded passes are handed to on_image_encoded(view_name, type_name,
+    data, bits_per_sample) instead of being written to disk, bits_per_sample
+    being 16 or 32 as the pass was encoded, and on_view_converted(view_name,
+    ok) is called once the last pass queued by submit_view() for a view is
+    done. Both run on the queue's thread. profiles maps image types to the
+    mftools.EncodeProfile to encode them with. With mip_levels, each pass is
+    followed by that many downscaled copies, handed to on_image_encoded
+    under image_types.mip_key(type_name, level).
+    """
+
+    def __init__(self, max_workers=0, max_pending=0, on_image_encoded=None, on_view_converted=None, profiles=None,
+                 mip_levels=0):
+        self._max_workers = max_workers if max_workers > 0 else default_worker_count()
+        self._max_pending = max_pending if max_pending > 0 else self._max_workers * 4
+        self._max_batch_passes = self._max_workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mft_jxl")
+        self._waiting = deque()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._pending = 0
+        self._errors = []
+        self._failed_images = set()
+        self._on_image_encoded = on_image_encoded
+        self._on_view_converted = on_view_converted
+        self._profiles = profiles or {}
+        self._mip_levels = mip_levels
+        self._view_pending = {}
+        self._failed_views = set()
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def depth(self):
+        """Number of passes queued or being converted."""
+        with self._lock:
+            return self._pending
+
+    @property
+    def errors(self):
+        with self._lock:
+            return list(self._errors)
+
+    @property
+    def failed_images(self):
+        """(view_name, type_name) of passes that failed to convert."""
+        with self._lock:
+            return set(self._failed_images)
+
+    def is_saturated(self) -> bool:
+        return self.depth >= self._max_pending
+
+    def wait_for_capacity(self):
+        """Block until the queue is no longer saturated. Used by the headless exporter."""
+        with self._drained:
+            self._drained.wait_for(lambda: self._pending < self._max_pending)
+
+    def submit_view(self, view_name, input_dir) -> int:
+        """Queue the EXR passes of a finished view. Returns the number of passes queued."""
+        passes = save.list_exr_passes(input_dir)
+        if passes:
+            with self._lock:
+                self._view_pending[view_name] = self._view_pending.get(view_name, 0) + len(passes)
+                self._pending += len(passes)
+                self._waiting.append((view_name, passes))
+            # One feeder call per view, a call finding no waiting views returns at once.
+            self._executor.submit(self._convert_waiting)
+
+        return len(passes)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs. With wait=False, batches that have not started are dropped."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _take_batch(self) -> list:
+        """(view_name, type_name, exr_path) of the waiting views' passes, at least one view and about max_batch_passes."""
+        jobs = []
+        with self._lock:
+            while self._waiting and (not jobs or len(jobs) + len(self._waiting[0][1]) <= self._max_batch_passes):
+                view_name, passes = self._waiting.popleft()
+                jobs.extend((view_name, type_name, path) for type_name, path in passes)
+        return jobs
+
+    def _convert_waiting(self):
+        jobs = self._take_batch()
+        if not jobs:
+            return
+
+        batch_start = time.perf_counter()
+        try:
+            results = save.encode_exr_batch([(type_name, path) for _, type_name, path in jobs], self._max_workers,
+                                            self._profiles, self._mip_levels)
+        except Exception as e:
+            results = [{"ok": False, "error": str(e), "data": None} for _ in jobs]
+
+        for (view_name, type_name, input_path), result in zip(jobs, results):
+            converted = False
+            try:
+                self._trace_job(view_name, type_name, batch_start, result)
+                if not result["ok"]:
+                    self._record_error(view_name, type_name, f"Failed to convert {input_path}: {result['error']}")
+                else:
+                    if self._on_image_encoded:
+                        bits_per_sample = result["bits_per_sample"]
+                        self._on_image_encoded(view_name, type_name, result["data"], bits_per_sample)
+                        for level, mip in enumerate(result["mips"], 1):
+                            self._on_image_encoded(view_name, mip_key(type_name, level), mip, bits_per_sample)
+                    converted = True
+            except Exception as e:
+                self._record_error(view_name, type_name, f"Failed to convert {input_path}: {e}")
+            finally:
+                self._view_pass_done(view_name, converted)
+                with self._drained:
+                    self._pending -= 1
+                    self._drained.notify_all()
+
+    @staticmethod
+    def _trace_job(view_name, type_name, batch_start, result):
+        """Record the native read and encode timings of one batch job."""
+        if not trace.is_active() or result.get("worker", -1) < 0:
+            return
+
+        thread_name = f"mft_jxl native {result['worker']}"
+        read_start, encode_start, encode_end = (batch_start + result[key]
+                                                for key in ("read_start", "encode_start", "encode_end"))
+        trace.add_span(f"read {view_name}_{type_name}", read_start, encode_start, "convert",
+                       thread_name=thread_name, view=view_name, image=type_name)
+        trace.add_span(f"encode {view_name}_{type_name}", encode_start, encode_end, "convert",
+                       thread_name=thread_name, view=view_name, image=type_name, size=result["size"])
+
+    def _view_pass_done(self, view_name, converted):
+        with self._lock:
+            if view_name not in self._view_pending:
+                return
+            if not converted:
+                self._failed_views.add(view_name)
+            self._view_pending[view_name] -= 1
+            if self._view_pending[view_name] > 0:
+                return
+            del self._view_pending[view_name]
+            ok = view_name not in self._failed_views
+            self._failed_views.discard(view_name)
+
+        if self._on_view_converted:
+            try:
+                self._on_view_converted(view_name, ok)
+            except Exception as e:
+                print(f"Failed to record converted view {view_name}: {e}")
+
+    def _record_error(self, view_name, type_name, message):
+        print(message)
+        with self._lock:
+            self._errors.append(message)
+            self._failed_images.add((view_name, type_name))
@@ -1,18 +1,82 @@
 import bpy
 from bpy.types import Operator
+from bpy.props import StringProperty, BoolProperty, IntProperty
 
 import os
-import struct
-from pathlib import Path
-import threading
+import time
 
-from . import render
-from . import save
-from . import serialize
+from . import level_patch
+from . import sharding
+from .pipeline import ExportSession, level_name_from_blend
 
 from ..core.render_view import *
-from ..core.composite import *
-from ..core.navmesh import *
+from ..core import trace
+
+# ---------------------------------------------------------------------------
+# Render sequencing
+#
+# The next render is started from render_complete rather than on the next
+# modal TIMER tick, so the GPU is not left idle for up to a tick between the
+# two renders of every view. The modal timer remains as a fallback and drives
+# the UI, cancellation and the final packing.
+# ---------------------------------------------------------------------------
+
+_active_export = None
+
+
+def _on_render_complete(scene, *args):
+    if _active_export is None:
+        return
+
+    _active_export._last_render_complete = time.perf_counter()
+    _active_export.trace_render_complete()
+    if not bpy.app.timers.is_registered(_advance_timer):
+        bpy.app.timers.register(_advance_timer, first_interval=0.0)
+
+
+def _on_render_cancel(scene, *args):
+    if _active_export is None:
+        return
+
+    _active_export._render_scene.mft_global_settings.cancel_rendering = True
+
+
+def _advance_timer():
+    """Start the next render as soon as the render job has been torn down."""
+    if _active_export is None:
+        return None
+
+    if bpy.app.is_job_running('RENDER'):
+        return 0.01  # render_complete fires before the job is released
+
+    window = _active_export._window
+    with bpy.context.temp_override(window=window, screen=window.screen):
+        _active_export.advance(bpy.context)
+
+    return None
+
+
+def _register_render_handlers(operator):
+    global _active_export
+
+    _active_export = operator
+    if _on_render_complete not in bpy.app.handlers.render_complete:
+        bpy.app.handlers.render_complete.append(_on_render_complete)
+    if _on_render_cancel not in bpy.app.handlers.render_cancel:
+        bpy.app.handlers.render_cancel.append(_on_render_cancel)
+
+
+def _unregister_render_handlers():
+    global _active_export
+
+    _active_export = None
+    if _on_render_complete in bpy.app.handlers.render_complete:
+        bpy.app.handlers.render_complete.remove(_on_render_complete)
+    if _on_render_cancel in bpy.app.handlers.render_cancel:
+        bpy.app.handlers.render_cancel.remove(_on_render_cancel)
+    if bpy.app.timers.is_registered(_advance_timer):
+        bpy.app.timers.unregister(_advance_timer)
+
 
 class MFT_OT_Export(Operator):
     """export all mft data"""
@@ -20,137 +84,145 @@ class MFT_OT_Export(Operator):
     bl_label = "Export"
     bl_description = "Export mft level and render all backgrounds"
 
+    resume: BoolProperty(
+        name="Resume",
+        description="Reuse the views an interrupted export already finished",
+        default=False
+    )
+    view_name: StringProperty(
+        name="View",
+        description="Only re-render this camera and patch its images into the existing level",
+        default=""
+    )
+
     _timer = None
+    _window = None
     _og_scene = None
     _render_scene = None
-    _views = []
-    _navmesh = None
-    _shadow_lights = []
-    _jxl_threads = []
-    _comp_manager = None
+    _session = None
     _next_index = False
 
+    # Time between a render finishing and the next one starting
+    _last_render_complete = None
+    _dead_time = 0.0
+    _num_renders = 0
+
+    # (view name, render type name, start time) of the render in flight
+    _render_started = None
+
     def modal(self, context, event):
         if event.type == 'TIMER':
 
+            if self._session.conversion_queue:
+                context.scene.mft_global_settings.conversion_queue_depth = self._session.conversion_queue.depth
+
             if context.scene.mft_global_settings.cancel_rendering:
                 self.cancel(context)
 
             if not context.scene.mft_global_settings.is_rendering:
+                return self.finish(context)
 
-                wm = context.window_manager
-                if self._timer:
-                    wm.event_timer_remove(self._timer)
-
-                if self._comp_manager:
-                    self._comp_manager = None
-
-                if context.scene is self._render_scene:
-                    bpy.ops.scene.delete()
-                    self._render_scene = None
-
-                if self._og_scene:
-                    self._og_scene = None
-
-                for area in bpy.context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.type = 'VIEW_3D'
-
-                output_path_root = Path(bpy.path.abspath(context.scene.mft_global_settings.export_directory))
-                output_path_final = output_path_root / "data"
-
-                for t in self._jxl_threads:
-                    t.join()
-
-                level_name = bpy.path.display_name_from_filepath(bpy.data.filepath)
-                if not level_name:
-                    level_name = "new_level"
-
-                # Collect JXL files in view order and build the image blob.
-                output_path_views = output_path_final / "views"
-                image_blob = bytearray()
-                image_entries = {}  # {view_name: {type_name: (offset, size, res_x, res_y, channels)}}
-
-                IMAGE_TYPES = ['DirectDiffuse', 'DirectSpecular', 'IndirectDiffuse', 'IndirectSpecular',
-                               'Normal', 'Depth', 'Environment']
-                IMAGE_CHANNELS = {
-                    'DirectDiffuse': 3, 'DirectSpecular': 3,
-                    'IndirectDiffuse': 3, 'IndirectSpecular': 3,
-                    'Normal': 3, 'Depth': 1, 'Environment': 3
-                }
-                for view in self._views:
-                    entries = {}
-                    main_res_x = int(view._uncropped_res_x)
-                    main_res_y = int(view._uncropped_res_y)
-                    for type_name in IMAGE_TYPES:
-                        jxl_path = output_path_views / f"{view._name}_{type_name}.jxl"
-                        if jxl_path.exists():
-                            data = jxl_path.read_bytes()
-                            res_x = view._env_res_x if type_name == 'Environment' else main_res_x
-                            res_y = view._env_res_y if type_name == 'Environment' else main_res_y
-                            entries[type_name] = (len(image_blob), len(data), res_x, res_y, IMAGE_CHANNELS[type_name])
-                            image_blob.extend(data)
-                    image_entries[view._name] = entries
-
-                # Serialize the FlatBuffer with image offsets embedded.
-                flatbuffer_bytes = serialize.serialize_level(self._navmesh, self._views, image_entries, self._shadow_lights)
-
-                # Write the .mflevel binary file:
-                #   4-byte LE size prefix | FlatBuffer ("MFLV" identifier at bytes [8..11]) | image blob
-                size_prefix = struct.pack('<I', len(flatbuffer_bytes))
-
-                output_file = output_path_root / (level_name + ".mflevel")
-                with open(output_file, 'wb') as f:
-                    f.write(size_prefix)
-                    f.write(bytes(flatbuffer_bytes))
-                    f.write(image_blob)
+            self.advance(context)
 
-                return {'FINISHED'}
+        return {'PASS_THROUGH'}
 
-            if not bpy.app.is_job_running('RENDER'):
+    def advance(self, context):
+        """Start the next render if the previous one is done."""
+        if bpy.app.is_job_running('RENDER') or not context.scene.mft_global_settings.is_rendering:
+            return
 
-                if self._next_index:
-                    prev_view = self._views[context.scene.mft_global_settings.current_view]
+        if self._next_index:
+            prev_view = self._session.views[context.scene.mft_global_settings.current_view]
+            self._session.view_rendered(prev_view)
 
-                    output_path_root = Path(bpy.path.abspath(context.scene.mft_global_settings.export_directory))
-                    output_path_final = output_path_root / "data" / "views"
+            context.scene.mft_global_settings.current_view += 1
+            self._next_index = False
 
-                    os.makedirs(output_path_final, exist_ok=True)
+        # Views whose fingerprint matched the last export keep their JXLs.
+        index = self._session.next_view_index(context.scene.mft_global_settings.current_view)
+        context.scene.mft_global_settings.current_view = index
 
-                    t = threading.Thread(target=save.convert_all_exr_to_jxl, args=(prev_view._name, prev_view._render_output_path, str(output_path_final.resolve())))
-                    t.start()
+        if index >= len(self._session.views):
+            # Keep the UI responsive until the last conversions drain.
+            if self._session.conversion_queue.depth == 0:
+                context.scene.mft_global_settings.cancel_rendering = True
+            return
 
-                    self._jxl_threads.append(t)
+        # Backpressure: let conversion catch up before rendering more views.
+        if self._session.conversion_queue.is_saturated():
+            return
 
-                    context.scene.mft_global_settings.current_view += 1
-                    self._next_index = False
+        view = self._session.views[index]
 
-                index = context.scene.mft_global_settings.current_view
+        if view is None:
+            context.scene.mft_global_settings.cancel_rendering = True
+            return
 
-                if index >= len(self._views):
-                    context.scene.mft_global_settings.cancel_rendering = True
-                    return {'PASS_THROUGH'}
+        render_type = view._current_render.name
+        view.set_next_camera_active(self._render_scene, self._session.comp_manager)
 
-                view = self._views[index]
+        now = time.perf_counter()
+        if self._last_render_complete is not None:
+            self._dead_time += now - self._last_render_complete
+            trace.add_span("idle", self._last_render_complete, now, "idle")
+            self._last_render_complete = None
+        self._num_renders += 1
+        self._render_started = (view._name, render_type, now)
 
-                if view is None:
-                    context.scene.mft_global_settings.cancel_rendering = True
-                    return {'PASS_THROUGH'}
+        bpy.ops.render.render('INVOKE_DEFAULT', write_still=False, scene=self._render_scene.name)
 
-                view.set_next_camera_active(self._render_scene, self._comp_manager)
-                bpy.ops.render.render('INVOKE_DEFAULT', write_still=False, scene=self._render_scene.name)
+        if view._current_render is RenderType.Complete:
+            self._next_index = True
 
-                if view._current_render is RenderType.Complete:
-                    self._next_index = True
+    def trace_render_complete(self):
+        if self._render_started is None:
+            return
 
-        return {'PASS_THROUGH'}
+        view_name, render_type, start_time = self._render_started
+        trace.add_span(f"render {render_type}", start_time, self._last_render_complete, "render", view=view_name)
+        self._render_started = None
+
+    def finish(self, context):
+        _unregister_render_handlers()
+
+        wm = context.window_manager
+        if self._timer:
+            wm.event_timer_remove(self._timer)
+
+        if context.scene is self._render_scene:
+            bpy.ops.scene.delete()
+            self._render_scene = None
+
+        if self._og_scene:
+            self._og_scene = None
+
+        for area in bpy.context.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.type = 'VIEW_3D'
+
+        session = self._session
+        self._session = None
+
+        session.finish()
+        context.scene.mft_global_settings.conversion_queue_depth = 0
+
+        for warning in session.warnings:
+            self.report({'WARNING'}, warning)
+
+        self.report({'INFO'}, f"Rendered {self._num_renders} images, "
+                              f"{self._dead_time:.2f} s idle between renders")
+        if session.slowest_views:
+            self.report({'INFO'}, f"Slowest views:\n{session.slowest_views}")
+        if session.deduplicated_bytes > 0:
+            self.report({'INFO'}, f"Stored identical images once, saving {session.deduplicated_bytes / (1 << 20):.1f} MB")
+        if session.dead_bytes > 0:
+            self.report({'INFO'}, f"{session.dead_bytes / (1 << 20):.1f} MB of replaced images left in the level, "
+                                  f"use Compact Level to reclaim them")
+
+        return {'FINISHED'}
 
     def execute(self, context):
         scene = context.scene
-        export_path_root = Path(bpy.path.abspath(scene.mft_global_settings.export_directory))
-        export_path_final = export_path_root / "data"
-
-        cameras = scene.mft_cameras
 
         if scene.mft_global_settings.is_rendering:
             # Cancel current render
@@ -158,32 +230,15 @@ class MFT_OT_Export(Operator):
             self.report({'INFO'}, "Cancelling render...")
             return {'FINISHED'}
 
-        if not export_path_root:
-            self.report({'ERROR'}, "Please specify an export path")
-            return {'CANCELLED'}
-
-        if not os.path.exists(export_path_root):
-            self.report({'ERROR'}, f"Could not create directory: {export_path_root}")
-            return {'CANCELLED'}
-
-        if not scene.mft_global_settings.navmesh_object:
-            self.report({'ERROR'}, "Please specify a target mesh object")
-            return {'CANCELLED'}
-
-        if len(cameras) == 0:
-            self.report({'ERROR'}, "No cameras in the list")
-            return {'CANCELLED'}
+        session = ExportSession(scene)
 
-        valid_cameras = [item for item in cameras if item.camera]
-        if len(valid_cameras) == 0:
-            self.report({'ERROR'}, "No valid cameras in the list")
+        error = session.validate()
+        if error:
+            self.report({'ERROR'}, error)
             return {'CANCELLED'}
 
-        self._views = create_view_list(valid_cameras, str(export_path_root.resolve()), scene)
-        self._navmesh = Navmesh(scene.mft_global_settings.navmesh_object)
-        self._shadow_lights = list(scene.mft_shadow_lights)
-
-        os.makedirs(export_path_final, exist_ok=True)
+        num_to_render = session.prepare(resume=self.resume, only_view=self.view_name or None)
+        self._session = session
 
         # Create dummy scene for rendering
         self._og_scene = scene
@@ -192,22 +247,28 @@ class MFT_OT_Export(Operator):
         self._render_scene.name = "RenderTempScene"
         context.window.scene = self._render_scene
 
-        self._comp_manager = CompositeManager(self._render_scene)
-
-        # Override render settings
-        render.set_renderer_params(context, self._render_scene)
+        session.setup_render_scene(context, self._render_scene)
 
         # Render
         self._render_scene.mft_global_settings.current_view = 0
-        self._render_scene.mft_global_settings.total_views = len(self._views)
+        self._render_scene.mft_global_settings.total_views = len(session.views)
         self._render_scene.mft_global_settings.is_rendering = True
         self._render_scene.mft_global_settings.should_cancel = False
 
+        self._window = context.window
+        self._last_render_complete = None
+        self._render_started = None
+        self._dead_time = 0.0
+        self._num_renders = 0
+        _register_render_handlers(self)
+
         wm = context.window_manager
         self._timer = wm.event_timer_add(0.2, window=context.window)
         wm.modal_handler_add(self)
 
-        self.report({'INFO'}, f"Starting render of {len(cameras)} views")
+        num_cached = len(session.views) - num_to_render - session.num_resumed
+        self.report({'INFO'}, f"Starting render of {num_to_render} views "
+                              f"({num_cached} unchanged, {session.num_resumed} resumed)")
 
         return {'RUNNING_MODAL'}
 
@@ -215,6 +276,288 @@ class MFT_OT_Export(Operator):
         context.scene.mft_global_settings.is_rendering = False
         context.scene.mft_global_settings.cancel_rendering = False
 
+class MFT_OT_ExportBatch(Operator):
+    """Export all mft data without a modal timer, for background mode"""
+    bl_idname = "mft.export_batch"
+    bl_label = "Export (Batch)"
+    bl_description = "Render all views back to back and pack the mft level, blocking until done"
+
+    export_directory: StringProperty(
+        name="Export Directory",
+        description="Directory to export to, overrides the scene setting when set",
+        default=""
+    )
+    full_rebuild: BoolProperty(
+        name="Full Rebuild",
+        description="Re-render every view, ignoring the fingerprint cache",
+        default=False
+    )
+    resume: BoolProperty(
+        name="Resume",
+        description="Reuse the views an interrupted export already finished",
+        default=False
+    )
+    shard: IntProperty(
+        name="Shard",
+        description="Only render the views the shard manifest assigns to this shard, without converting or packing (-1 = export everything)",
+        default=-1,
+        min=-1
+    )
+    cpu_threads: IntProperty(
+        name="CPU Threads",
+        description="Render on the CPU with this many threads instead of the GPU (0 = GPU)",
+        default=0,
+        min=0
+    )
+
+    def execute(self, context):
+        scene = context.scene
+
+        if self.export_directory:
+            os.makedirs(bpy.path.abspath(self.export_directory), exist_ok=True)
+
+        session = ExportSession(scene, self.export_directory or None)
+
+        error = session.validate()
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        num_to_render = session.prepare(incremental=not self.full_rebuild, resume=self.resume)
+
+        if self.shard >= 0:
+            indices = sharding.read_manifest(session)["shards"][self.shard]
+        else:
+            indices = [index for index, view in enumerate(session.views) if not view._cached]
+        print(f"Rendering {len(indices)} of {len(session.views)} views")
+
+        # Background exports never save the .blend, so render straight from the
+        # open scene instead of a temporary copy.
+        session.setup_render_scene(context, scene, self.cpu_threads)
+
+        try:
+            for count, index in enumerate(indices):
+                view = session.views[index]
+
+                if self.shard < 0:
+                    session.conversion_queue.wait_for_capacity()
+
+                # Main render, then env probe render
+                while view._current_render is not RenderType.Complete:
+                    render_type = view._current_render.name
+                    view.set_next_camera_active(scene, session.comp_manager)
+                    with trace.span(f"render {render_type}", "render", view=view._name):
+                        bpy.ops.render.render(write_still=False, scene=scene.name)
+
+                if self.shard < 0:
+                    session.view_rendered(view)
+                print(f"Rendered view {count + 1}/{len(indices)}: {view._name}")
+
+            if self.shard >= 0:
+                # Conversion and packing happen in the merge step.
+                session.abort()
+                sharding.mark_shard_done(session, self.shard)
+                self.report({'INFO'}, f"Rendered shard {self.shard}")
+                return {'FINISHED'}
+
+            output_file = session.finish()
+        except Exception as e:
+            session.abort()
+            self.report({'ERROR'}, f"Export failed: {e}")
+            return {'CANCELLED'}
+
+        for warning in session.warnings:
+            self.report({'WARNING'}, warning)
+
+        if session.warnings:
+            self.report({'ERROR'}, f"Exported {output_file} with {len(session.warnings)} conversion errors")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Exported {output_file}")
+        if session.slowest_views:
+            self.report({'INFO'}, f"Slowest views:\n{session.slowest_views}")
+        if session.deduplicated_bytes > 0:
+            self.report({'INFO'}, f"Stored identical images once, saving {session.deduplicated_bytes / (1 << 20):.1f} MB")
+        return {'FINISHED'}
+
+class MFT_OT_MergeShards(Operator):
+    """Convert the renders of a sharded export and pack the mft level"""
+    bl_idname = "mft.merge_shards"
+    bl_label = "Merge Shards"
+    bl_description = "Convert the views rendered by sharded export workers and write the mft level"
+
+    export_directory: StringProperty(
+        name="Export Directory",
+        description="Directory the shards were exported to, overrides the scene setting when set",
+        default=""
+    )
+
+    def execute(self, context):
+        session = ExportSession(context.scene, self.export_directory or None)
+
+        error = session.validate()
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        session.prepare()
+
+        try:
+            error = sharding.queue_shard_conversions(session, sharding.read_manifest(session))
+            if error:
+                session.abort()
+                self.report({'ERROR'}, error)
+                return {'CANCELLED'}
+
+            output_file = session.finish()
+        except Exception as e:
+            session.abort()
+            self.report({'ERROR'}, f"Merge failed: {e}")
+            return {'CANCELLED'}
+
+        for warning in session.warnings:
+            self.report({'WARNING'}, warning)
+
+        if session.warnings:
+            self.report({'ERROR'}, f"Exported {output_file} with {len(session.warnings)} conversion errors")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Exported {output_file}")
+        return {'FINISHED'}
+
+class MFT_OT_ExportSharded(Operator):
+    """Export all mft data using several background Blender processes"""
+    bl_idname = "mft.export_sharded"
+    bl_label = "Export (Parallel)"
+    bl_description = "Render the views in parallel background Blender processes, then merge them into the mft level"
+
+    _timer = None
+    _session = None
+    _manifest = None
+    _workers = []
+    _merging = False
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        settings = context.scene.mft_global_settings
+
+        if settings.cancel_rendering:
+            for worker in self._workers:
+                if worker.poll() is None:
+                    worker.terminate()
+            self._session.abort()
+            self.report({'INFO'}, "Sharded export cancelled")
+            return self.finish(context)
+
+        if not self._merging:
+            settings.current_view = sum(1 for worker in self._workers if worker.poll() is not None)
+            if settings.current_view < len(self._workers):
+                return {'PASS_THROUGH'}
+
+            failed = [shard for shard, worker in enumerate(self._workers) if worker.returncode != 0]
+            if failed:
+                self._session.abort()
+                logs = sharding.shard_dir(self._session)
+                self.report({'ERROR'}, f"Shards {failed} failed, see the logs in {logs}")
+                return self.finish(context)
+
+            error = sharding.queue_shard_conversions(self._session, self._manifest)
+            if error:
+                self._session.abort()
+                self.report({'ERROR'}, error)
+                return self.finish(context)
+
+            self._merging = True
+
+        # Keep the UI responsive until the conversions drain.
+        settings.conversion_queue_depth = self._session.conversion_queue.depth
+        if settings.conversion_queue_depth > 0:
+            return {'PASS_THROUGH'}
+
+        output_file = self._session.finish()
+        for warning in self._session.warnings:
+            self.report({'WARNING'}, warning)
+        self.report({'INFO'}, f"Exported {output_file}")
+
+        return self.finish(context)
+
+    def execute(self, context):
+        scene = context.scene
+        settings = scene.mft_global_settings
+
+        if settings.is_rendering:
+            self.report({'ERROR'}, "An export is already running")
+            return {'CANCELLED'}
+
+        if not bpy.data.is_saved or bpy.data.is_dirty:
+            self.report({'ERROR'}, "Save the .blend file first, the workers render it from disk")
+            return {'CANCELLED'}
+
+        session = ExportSession(scene)
+
+        error = session.validate()
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        session.prepare()
+        self._session = session
+        self._manifest = sharding.write_manifest(session, settings.shard_count)
+        self._workers = sharding.launch_workers(session, self._manifest)
+        self._merging = False
+
+        settings.current_view = 0
+        settings.total_views = max(1, len(self._workers))
+        settings.is_rendering = True
+        settings.cancel_rendering = False
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+
+        self.report({'INFO'}, f"Rendering {sum(len(shard) for shard in self._manifest['shards'])} views "
+                              f"in {len(self._workers)} worker processes")
+
+        return {'RUNNING_MODAL'}
+
+    def finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+
+        settings = context.scene.mft_global_settings
+        settings.is_rendering = False
+        settings.cancel_rendering = False
+        settings.conversion_queue_depth = 0
+
+        self._session = None
+        self._workers = []
+
+        return {'FINISHED'}
+
+class MFT_OT_CompactLevel(Operator):
+    """Rewrite the mft level without the images replaced by patching"""
+    bl_idname = "mft.compact_level"
+    bl_label = "Compact Level"
+    bl_description = "Rewrite the exported level to drop images that were replaced by later exports"
+
+    def execute(self, context):
+        settings = context.scene.mft_global_settings
+        level_file = os.path.join(bpy.path.abspath(settings.export_directory), level_name_from_blend() + ".mflevel")
+
+        if not os.path.exists(level_file):
+            self.report({'ERROR'}, f"No exported level at {level_file}")
+            return {'CANCELLED'}
+
+        try:
+            old_size, new_size = level_patch.compact_level(level_file)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Failed to compact {level_file}: {e}")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Compacted {level_file}: {(old_size - new_size) / (1 << 20):.1f} MB reclaimed")
+        return {'FINISHED'}
+
 class RENDER_OT_Cancel(Operator):
     """cancel export all mft data"""
     bl_idname = "mft.cancel"
@@ -234,6 +577,10 @@ def unregister_properties():
 
 classes = (
     MFT_OT_Export,
+    MFT_OT_ExportBatch,
+    MFT_OT_MergeShards,
+    MFT_OT_ExportSharded,
+    MFT_OT_CompactLevel,
     RENDER_OT_Cancel,
 )
 
@@ -243,6 +590,7 @@ def register():
     register_properties()
 
 def unregister():
+    _unregister_render_handlers()
     unregister_properties()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
@@ -0,0 +1,179 @@
+import bpy
+import hashlib
+import json
+import struct
+from array import array
+from pathlib import Path
+
+from ..core.data_models import ENCODE_PROFILE_PROPERTIES
+
+
+# Stored next to the exported .mflevel, whose images the cached views keep.
+# Bump FINGERPRINT_VERSION whenever the render or conversion pipeline changes
+# what ends up in a view's images, so caches written by older exports are
+# ignored.
+CACHE_FILE_NAME = "mft_cache.json"
+FINGERPRINT_VERSION = 2
+
+_SIMPLE_PROPERTY_TYPES = {'BOOLEAN', 'INT', 'FLOAT', 'STRING', 'ENUM'}
+
+
+def _hash_values(h, values):
+    h.update(struct.pack(f'<{len(values)}d', *values))
+
+
+def _hash_matrix(h, matrix):
+    _hash_values(h, [value for row in matrix for value in row])
+
+
+def _hash_rna(h, struct_rna):
+    """Hash the simple-typed RNA properties of a Blender struct (modifiers, lights, node sockets...)."""
+    for prop in struct_rna.bl_rna.properties:
+        if prop.identifier == 'rna_type':
+            continue
+
+        if prop.type in _SIMPLE_PROPERTY_TYPES:
+            value = getattr(struct_rna, prop.identifier, None)
+            if isinstance(value, set):
+                value = tuple(sorted(value))
+            elif hasattr(value, '__len__') and not isinstance(value, str):
+                value = tuple(value)
+            h.update(f"{prop.identifier}={value!r};".encode('utf-8'))
+        elif prop.type == 'POINTER':
+            value = getattr(struct_rna, prop.identifier, None)
+            name = getattr(value, 'name', None)
+            if isinstance(name, str):
+                h.update(f"{prop.identifier}->{name};".encode('utf-8'))
+
+
+def _hash_node_tree(h, node_tree):
+    if node_tree is None:
+        return
+
+    for node in sorted(node_tree.nodes, key=lambda n: n.name):
+        h.update(f"{node.name}:{node.bl_idname};".encode('utf-8'))
+        _hash_rna(h, node)
+        for socket in node.inputs:
+            if socket.is_linked:
+                continue
+            value = getattr(socket, 'default_value', None)
+            if hasattr(value, '__len__') and not isinstance(value, str):
+                value = tuple(value)
+            h.update(f"{socket.identifier}={value!r};".encode('utf-8'))
+
+    for link in node_tree.links:
+        h.update(f"{link.from_node.name}.{link.from_socket.identifier}->"
+                 f"{link.to_node.name}.{link.to_socket.identifier};".encode('utf-8'))
+
+
+def _hash_mesh(h, mesh):
+    coords = array('f', [0.0]) * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get("co", coords)
+    h.update(coords.tobytes())
+
+    loop_verts = array('i', [0]) * len(mesh.loops)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    h.update(loop_verts.tobytes())
+
+    for material in mesh.materials:
+        h.update(f"mat:{material.name if material else ''};".encode('utf-8'))
+
+
+def scene_digest(scene) -> str:
+    """Digest of everything in the scene that can change how a view renders.
+
+    Cameras are skipped on purpose: each view fingerprints its own camera, and
+    the exporter moves env-probe cameras around while placing them.
+    """
+    h = hashlib.sha256()
+
+    for obj in sorted(scene.objects, key=lambda o: o.name):
+        if obj.type == 'CAMERA' or obj.hide_render:
+            continue
+
+        h.update(f"obj:{obj.name}:{obj.type};".encode('utf-8'))
+        _hash_matrix(h, obj.matrix_world)
+
+        for modifier in obj.modifiers:
+            h.update(f"mod:{modifier.name}:{modifier.type};".encode('utf-8'))
+            _hash_rna(h, modifier)
+
+        if obj.type == 'MESH':
+            _hash_mesh(h, obj.data)
+        elif obj.data is not None:
+            _hash_rna(h, obj.data)
+
+    for material in sorted(bpy.data.materials, key=lambda m: m.name):
+        if material.users == 0:
+            continue
+        h.update(f"material:{material.name};".encode('utf-8'))
+        _hash_node_tree(h, material.node_tree)
+
+    for image in sorted(bpy.data.images, key=lambda i: i.name):
+        if image.users == 0:
+            continue
+        h.update(f"image:{image.name}:{image.filepath}:{tuple(image.size)};".encode('utf-8'))
+
+    if scene.world:
+        h.update(f"world:{scene.world.name};".encode('utf-8'))
+        _hash_node_tree(h, scene.world.node_tree)
+
+    _hash_rna(h, scene.view_settings)
+    h.update(f"engine:{scene.render.engine};".encode('utf-8'))
+
+    return h.hexdigest()
+
+
+def view_fingerprint(view, scene, content_digest) -> str:
+    """Fingerprint of everything that feeds into one view's rendered images.
+
+    The env probe must already be placed, its location is part of the fingerprint.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{FINGERPRINT_VERSION};{view._name};".encode('utf-8'))
+
+    _hash_matrix(h, view._main_camera.matrix_world)
+    _hash_values(h, [view._fov, view._uncropped_fov, view._max_pan, view._max_tilt])
+    _hash_values(h, [int(view._uncropped_res_x), int(view._uncropped_res_y), view._env_res_x, view._env_res_y])
+    _hash_values(h, [scene.mft_global_settings.render_samples, scene.mft_global_settings.half_float_lighting,
+                     scene.mft_global_settings.preview_mip_levels])
+    for prop_name in ENCODE_PROFILE_PROPERTIES.values():
+        profile = getattr(scene.mft_global_settings, prop_name)
+        _hash_values(h, [profile.lossless, profile.distance, profile.effort])
+    _hash_values(h, list(view._env_camera_obj.location))
+
+    camera_data = view._main_camera.data
+    _hash_values(h, [camera_data.clip_start, camera_data.clip_end, camera_data.shift_x, camera_data.shift_y])
+
+    h.update(content_digest.encode('utf-8'))
+
+    return h.hexdigest()
+
+
+class FingerprintCache:
+    """Per-view fingerprints of the last export, stored next to the .mflevel."""
+
+    def __init__(self, export_root):
+        self._path = Path(export_root) / CACHE_FILE_NAME
+        self._fingerprints = {}
+
+        try:
+            data = json.loads(self._path.read_text())
+            if data.get("version") == FINGERPRINT_VERSION:
+                self._fingerprints = dict(data.get("views", {}))
+        except (OSError, ValueError, AttributeError):
+            self._fingerprints = {}
+
+    def is_up_to_date(self, view_name, fingerprint) -> bool:
+        """True if the view was last exported with the same inputs."""
+        return self._fingerprints.get(view_name) == fingerprint
+
+    def update(self, view_name, fingerprint):
+        self._fingerprints[view_name] = fingerprint
+
+    def invalidate(self, view_name):
+        self._fingerprints.pop(view_name, None)
+
+    def save(self):
+        data = {"version": FINGERPRINT_VERSION, "views": self._fingerprints}
+        self._path.write_text(json.dumps(data, indent=2, sort_keys=True))
@@ -0,0 +1,56 @@
+# Image passes of a view and how they are keyed, shared by the exporter and the
+# level readers. Nothing here depends on Blender, so .mflevel tooling can import
+# it (and level_reader) from a plain Python.
+
+# Image passes stored per view, in blob order.
+IMAGE_TYPES = ['DirectDiffuse', 'DirectSpecular', 'IndirectDiffuse', 'IndirectSpecular',
+               'Normal', 'Depth', 'Environment']
+IMAGE_CHANNELS = {
+    'DirectDiffuse': 3, 'DirectSpecular': 3,
+    'IndirectDiffuse': 3, 'IndirectSpecular': 3,
+    'Normal': 2, 'Depth': 1, 'Environment': 3
+}
+
+# Downscaled copies of a pass are keyed "<type>/<level>" next to the pass
+# itself, level 1 being half its resolution. serialize.serialize_level() nests
+# them in the pass entry's mips vector.
+MIP_SEPARATOR = '/'
+
+
+def mip_key(type_name, level) -> str:
+    return f"{type_name}{MIP_SEPARATOR}{level}"
+
+
+def split_image_key(key) -> tuple:
+    """(type_name, mip level) of an image key, level 0 for the full image."""
+    type_name, _, level = key.partition(MIP_SEPARATOR)
+    return type_name, int(level or 0)
+
+
+def mip_resolution(res_x, res_y, level) -> tuple:
+    """Resolution of a mip level, matching the box filter of mftools.convert_batch."""
+    for _ in range(level):
+        res_x, res_y = max(1, res_x // 2), max(1, res_y // 2)
+    return res_x, res_y
+
+
+def view_image_entries(view) -> dict:
+    """{image key: ImageEntry} of a FlatBuffer View, mips keyed by mip_key()."""
+    entries = {}
+    for type_name in IMAGE_TYPES:
+        entry = getattr(view, type_name)()
+        if entry is None:
+            continue
+        entries[type_name] = entry
+        for level in range(entry.MipsLength()):
+            entries[mip_key(type_name, level + 1)] = entry.Mips(level)
+    return entries
+
+
+def find_image_entry(view, key):
+    """The ImageEntry of a FlatBuffer View for an image key, or None."""
+    type_name, level = split_image_key(key)
+    entry = getattr(view, type_name)()
+    if entry is None or level == 0:
+        return entry
+    return entry.Mips(level - 1) if level <= entry.MipsLength() else None
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+# The journal is an append-only JSON lines file in the export directory. The
+# header line describes the file the export streams its images into (a new
+# .mflevel.partial or an existing level being patched), every following line
+# records one view whose images were all written there. If Blender crashes
+# before the level is finished, the next export can resume from it instead of
+# re-rendering those views. finish() removes it.
+JOURNAL_FILE_NAME = "mft_journal.jsonl"
+JOURNAL_VERSION = 3
+
+
+def journal_exists(export_root) -> bool:
+    return (Path(export_root) / JOURNAL_FILE_NAME).exists()
+
+
+def _range_digest(fd, offset, size) -> str:
+    h = hashlib.sha256()
+    os.lseek(fd, offset, os.SEEK_SET)
+    while size > 0:
+        chunk = os.read(fd, min(size, 1 << 20))
+        if not chunk:
+            break
+        h.update(chunk)
+        size -= len(chunk)
+    return h.hexdigest()
+
+
+class ExportJournal:
+    """Record of the views an export has streamed into its level, used to resume it.
+
+    With resume=False nothing is read or written until start(), so processes
+    that never write images (shard workers) leave an existing journal alone.
+    """
+
+    def __init__(self, export_root, resume=False):
+        self._export_root = Path(export_root)
+        self._path = self._export_root / JOURNAL_FILE_NAME
+        self._lock = threading.Lock()
+        self._started = False
+
+        # Image file of the interrupted export, as passed to start().
+        self.sink = None
+        self._entries = {}
+        if resume:
+            self.sink, self._entries = self._load()
+
+    def start(self, sink):
+        """Replace the journal with a new one for the given image file.
+
+        sink: JSON-serializable dict, must hold "file" (name relative to the
+        export directory) and "blob_start" (file offset of the image blob).
+        """
+        with self._lock:
+            with open(self._path, 'w') as f:
+                f.write(json.dumps({"version": JOURNAL_VERSION, "sink": sink}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._started = True
+            self.sink = sink
+            self._entries = {}
+
+    def move(self, sink):
+        """Point the journal at another image file holding the same blob, keeping the recorded views.
+
+        sink: as for start(). The journal is replaced atomically, a crash
+        leaves either the old or the new one.
+        """
+        with self._lock:
+            if not self._started:
+                return
+
+            temp_path = self._path.with_name(self._path.name + ".tmp")
+            with open(temp_path, 'w') as f:
+                f.write(json.dumps({"version": JOURNAL_VERSION, "sink": sink}) + "\n")
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._path)
+
+            self.sink = sink
+
+    def resume(self):
+        """Keep appending to the journal loaded for resuming."""
+        with self._lock:
+            self._started = self.sink is not None
+
+    def record_view(self, view_name, fingerprint, images):
+        """Append a finished view. Safe to call from conversion worker threads.
+
+        images: {type_name: (offset, size, res_x, res_y, channels, bits_per_sample, sha256)}
+        """
+        entry = {"view": view_name, "fingerprint": fingerprint,
+                 "images": {type_name: list(image) for type_name, image in images.items()}}
+
+        with self._lock:
+            if not self._started:
+                return
+
+            with open(self._path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._entries[view_name] = entry
+
+    def verified_views(self, fingerprints) -> dict:
+        """Views of the interrupted export that can be reused.
+
+        A view qualifies if its fingerprint is unchanged and every one of its
+        images still hashes to the journaled digest in the image file.
+        Returns {view_name: {type_name: (offset, size, res_x, res_y, channels, bits_per_sample, sha256)}}.
+        """
+        if self.sink is None:
+            return {}
+
+        try:
+            fd = os.open(self._export_root / self.sink["file"], os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except OSError:
+            return {}
+
+        verified = {}
+        try:
+            file_size = os.fstat(fd).st_size
+            blob_start = self.sink["blob_start"]
+            for view_name, entry in self._entries.items():
+                if fingerprints.get(view_name) != entry["fingerprint"]:
+                    continue
+                images = {type_name: tuple(image) for type_name, image in entry["images"].items()}
+                if all(blob_start + offset + size <= file_size and _range_digest(fd, blob_start + offset, size) == digest
+                       for offset, size, *_, digest in images.values()):
+                    verified[view_name] = images
+        finally:
+            os.close(fd)
+
+        return verified
+
+    def remove(self):
+        """Delete the journal this export loaded or started."""
+        with self._lock:
+            if (self._started or self.sink is not None) and self._path.exists():
+                os.remove(self._path)
+            self._started = False
+            self.sink = None
+            self._entries = {}
+
+    def _load(self) -> tuple:
+        entries = {}
+        try:
+            with open(self._path) as f:
+                header = json.loads(f.readline())
+                if header.get("version") != JOURNAL_VERSION:
+                    return None, {}
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn write from a crash, everything before it is valid
+                    entries[entry["view"]] = entry
+        except (OSError, ValueError, AttributeError, KeyError):
+            return None, {}
+
+        return header.get("sink"), entries
@@ -0,0 +1,303 @@
+import os
+import struct
+from pathlib import Path
+
+from . import image_types
+from .data import Level
+from .level_writer import LevelWriter, SIZE_PREFIX_BYTES, _open_flags, _write_all, copy_range
+
+# Patching replaces the images of some views without rewriting a multi-GB
+# .mflevel: new payloads are appended behind the existing blob and only the
+# FlatBuffer section at the start of the file is rewritten. The images they
+# replace stay in the blob as dead space until compact_level() rewrites the
+# file.
+
+# vtable slots of the ImageEntry fields (see level.fbs)
+_IMAGE_ENTRY_OFFSET_SLOT = 4
+_IMAGE_ENTRY_SIZE_SLOT = 6
+_IMAGE_ENTRY_RES_X_SLOT = 8
+_IMAGE_ENTRY_RES_Y_SLOT = 10
+_IMAGE_ENTRY_CHANNELS_SLOT = 12
+_IMAGE_ENTRY_BITS_PER_SAMPLE_SLOT = 14
+
+
+def read_flatbuffer(fd) -> bytearray:
+    """Read the FlatBuffer section (including any padding) of an open .mflevel."""
+    os.lseek(fd, 0, os.SEEK_SET)
+    prefix = os.read(fd, SIZE_PREFIX_BYTES)
+    if len(prefix) != SIZE_PREFIX_BYTES:
+        raise ValueError("File is too small to be a .mflevel")
+
+    flatbuffer_size = struct.unpack('<I', prefix)[0]
+    flatbuffer = bytearray()
+    while len(flatbuffer) < flatbuffer_size:
+        chunk = os.read(fd, flatbuffer_size - len(flatbuffer))
+        if not chunk:
+            raise ValueError("Truncated FlatBuffer section")
+        flatbuffer += chunk
+
+    if not Level.Level.LevelBufferHasIdentifier(flatbuffer, 0):
+        raise ValueError("Not a .mflevel file (missing MFLV identifier)")
+
+    return flatbuffer
+
+
+def _view_name(view) -> str:
+    return view.Name().decode('utf-8')
+
+
+def image_entries(flatbuffer) -> dict:
+    """{view_name: {type_name: (offset, size, res_x, res_y, channels, bits_per_sample)}} of a level's FlatBuffer.
+
+    Mip levels are included under image_types.mip_key(type_name, level).
+    """
+    level = Level.Level.GetRootAs(flatbuffer, 0)
+
+    entries = {}
+    for i in range(level.ViewsLength()):
+        view = level.Views(i)
+        entries[_view_name(view)] = {key: (entry.Offset(), entry.Size(), entry.ResX(), entry.ResY(), entry.Channels(),
+                                           entry.BitsPerSample())
+                                     for key, entry in image_types.view_image_entries(view).items()}
+
+    return entries
+
+
+def _set_field(entry, slot, fmt, value, default=0):
+    field = entry._tab.Offset(slot)
+    if field == 0:
+        # Written by an exporter that omitted default-valued fields.
+        if value == default:
+            return
+        raise ValueError("ImageEntry field is not stored in the file, re-export the level")
+    struct.pack_into(fmt, entry._tab.Bytes, entry._tab.Pos + field, value)
+
+
+def _set_image_entry(entry, offset, size, res_x, res_y, channels, bits_per_sample):
+    _set_field(entry, _IMAGE_ENTRY_OFFSET_SLOT, '<Q', offset)
+    _set_field(entry, _IMAGE_ENTRY_SIZE_SLOT, '<Q', size)
+    _set_field(entry, _IMAGE_ENTRY_RES_X_SLOT, '<H', res_x)
+    _set_field(entry, _IMAGE_ENTRY_RES_Y_SLOT, '<H', res_y)
+    _set_field(entry, _IMAGE_ENTRY_CHANNELS_SLOT, '<B', channels)
+    _set_field(entry, _IMAGE_ENTRY_BITS_PER_SAMPLE_SLOT, '<B', bits_per_sample, 32)
+
+
+def dead_bytes(level_file) -> int:
+    """Bytes of the image blob no image entry points at."""
+    fd = os.open(level_file, _open_flags(os.O_RDONLY))
+    try:
+        flatbuffer = read_flatbuffer(fd)
+        blob_size = os.fstat(fd).st_size - SIZE_PREFIX_BYTES - len(flatbuffer)
+    finally:
+        os.close(fd)
+
+    live = {(offset, size) for view_entries in image_entries(flatbuffer).values()
+            for offset, size, *_ in view_entries.values()}
+    return blob_size - sum(size for _, size in live)
+
+
+class LevelPatcher:
+    """Appends images to an existing .mflevel and rewrites its FlatBuffer section.
+
+    Mirrors the LevelWriter interface, so the exporter can use either. If the
+    new FlatBuffer does not fit in the existing section the file is rewritten.
+    To continue an interrupted patch, pass the file size before it started as
+    original_size and the blob size to keep as resume_blob_size.
+    """
+
+    def __init__(self, level_file, resume_blob_size=None, original_size=None):
+        self._level_file = Path(level_file)
+        self._fd = os.open(self._level_file, _open_flags(os.O_RDWR))
+        try:
+            self._flatbuffer = read_flatbuffer(self._fd)
+            self._original_size = original_size or os.fstat(self._fd).st_size
+            if resume_blob_size is not None:
+                # Resumed images may point into the original blob, which is always kept.
+                os.ftruncate(self._fd, max(self.blob_start + resume_blob_size, self._original_size))
+        except Exception:
+            os.close(self._fd)
+            raise
+
+        self._blob_size = os.fstat(self._fd).st_size - self.blob_start
+
+    @property
+    def file(self):
+        """File the blob is being written to."""
+        return self._level_file
+
+    @property
+    def original_size(self):
+        return self._original_size
+
+    @property
+    def flatbuffer(self):
+        """The current FlatBuffer section, including padding."""
+        return self._flatbuffer
+
+    @property
+    def blob_size(self):
+        return self._blob_size
+
+    @property
+    def blob_start(self):
+        return SIZE_PREFIX_BYTES + len(self._flatbuffer)
+
+    def image_entries(self) -> dict:
+        return image_entries(self._flatbuffer)
+
+    def add_file(self, path) -> tuple:
+        """Append a file to the image blob. Returns its (offset, size) within the blob."""
+        src_fd = os.open(path, _open_flags(os.O_RDONLY))
+        try:
+            size = os.fstat(src_fd).st_size
+            offset = self._blob_size
+            copy_range(src_fd, 0, self._fd, self.blob_start + offset, size)
+        finally:
+            os.close(src_fd)
+
+        self._blob_size += size
+        return offset, size
+
+    def add_bytes(self, data) -> tuple:
+        """Append an in-memory payload to the image blob. Returns its (offset, size) within the blob."""
+        offset = self._blob_size
+        os.lseek(self._fd, self.blob_start + offset, os.SEEK_SET)
+        _write_all(self._fd, data)
+
+        self._blob_size += len(data)
+        return offset, len(data)
+
+    def set_view_images(self, view_name, entries):
+        """Point a view's existing image entries at new (offset, size, res_x, res_y, channels, bits_per_sample) values.
+
+        Only touches the in-memory FlatBuffer; finish() writes it. The view
+        must already have an entry for every image type being replaced.
+        """
+        level = Level.Level.GetRootAs(self._flatbuffer, 0)
+        for i in range(level.ViewsLength()):
+            view = level.Views(i)
+            if _view_name(view) != view_name:
+                continue
+            for type_name, values in entries.items():
+                entry = image_types.find_image_entry(view, type_name)
+                if entry is None:
+                    raise ValueError(f"View {view_name} has no {type_name} image to replace")
+                _set_image_entry(entry, *values)
+            return
+
+        raise ValueError(f"Level has no view named {view_name}")
+
+    def finish(self, flatbuffer_bytes=None) -> Path:
+        """Make the appended images durable, then write the FlatBuffer section.
+
+        flatbuffer_bytes replaces the whole FlatBuffer, otherwise the one
+        modified by set_view_images() is written.
+        """
+        if flatbuffer_bytes is None:
+            flatbuffer_bytes = self._flatbuffer
+
+        section_size = len(self._flatbuffer)
+        if len(flatbuffer_bytes) > section_size:
+            return self._rewrite(flatbuffer_bytes)
+
+        # The header only points at the new images once they are on disk.
+        os.fsync(self._fd)
+        os.lseek(self._fd, SIZE_PREFIX_BYTES, os.SEEK_SET)
+        _write_all(self._fd, bytes(flatbuffer_bytes) + bytes(section_size - len(flatbuffer_bytes)))
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._fd = None
+
+        return self._level_file
+
+    def close(self):
+        """Stop appending but keep the appended images, so an export journaling them can be resumed.
+
+        The FlatBuffer section is untouched, the level reads as it was.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def abort(self):
+        """Drop the appended images and leave the level as it was."""
+        if self._fd is not None:
+            os.ftruncate(self._fd, self._original_size)
+            os.close(self._fd)
+            self._fd = None
+
+    def _rewrite(self, flatbuffer_bytes) -> Path:
+        writer = LevelWriter(self._level_file, len(flatbuffer_bytes))
+        try:
+            writer.add_range(self._fd, self.blob_start, self._blob_size)
+            os.close(self._fd)
+            self._fd = None
+            return writer.finish(flatbuffer_bytes)
+        except Exception:
+            writer.abort()
+            self.abort()
+            raise
+
+
+def patch_view_images(level_file, view_name, images) -> Path:
+    """Replace the images of one view in place.
+
+    images: {type_name: jxl_path} for the passes to replace. Resolution,
+    channel count and sample format are kept from the existing entries.
+    """
+    patcher = LevelPatcher(level_file)
+    try:
+        current = patcher.image_entries().get(view_name)
+        if current is None:
+            raise ValueError(f"Level has no view named {view_name}")
+
+        entries = {}
+        for type_name, path in images.items():
+            if type_name not in current:
+                raise ValueError(f"View {view_name} has no {type_name} image to replace")
+            offset, size = patcher.add_file(path)
+            entries[type_name] = (offset, size, *current[type_name][2:])
+
+        patcher.set_view_images(view_name, entries)
+        return patcher.finish()
+    except Exception:
+        patcher.abort()
+        raise
+
+
+def compact_level(level_file) -> tuple:
+    """Rewrite a level without the dead space left by patching.
+
+    Returns the file size before and after.
+    """
+    level_file = Path(level_file)
+    src_fd = os.open(level_file, _open_flags(os.O_RDONLY))
+    try:
+        flatbuffer = read_flatbuffer(src_fd)
+        old_size = os.fstat(src_fd).st_size
+        src_blob_start = SIZE_PREFIX_BYTES + len(flatbuffer)
+
+        # Copy the live ranges in blob order, so offsets only ever move down and
+        # an image at offset 0 stays there.
+        level = Level.Level.GetRootAs(flatbuffer, 0)
+        entries = []
+        for i in range(level.ViewsLength()):
+            entries.extend(image_types.view_image_entries(level.Views(i)).values())
+        entries.sort(key=lambda entry: entry.Offset())
+
+        writer = LevelWriter(level_file, len(flatbuffer))
+        try:
+            moved = {}
+            for entry in entries:
+                key = (entry.Offset(), entry.Size())
+                if key not in moved:
+                    moved[key], _ = writer.add_range(src_fd, src_blob_start + entry.Offset(), entry.Size())
+                _set_field(entry, _IMAGE_ENTRY_OFFSET_SLOT, '<Q', moved[key])
+        except Exception:
+            writer.abort()
+            raise
+    finally:
+        os.close(src_fd)
+
+    writer.finish(flatbuffer)
+    return old_size, os.path.getsize(level_file)
@@ -0,0 +1,232 @@
+import mmap
+import struct
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from . import image_types
+from .data import Level
+from .level_writer import SIZE_PREFIX_BYTES
+
+# Read-only access to a .mflevel for validation, stats and CI tooling. The file
+# is memory mapped and the FlatBuffer is parsed in place, so opening a level
+# costs a few page faults however large its image blob is, and image payloads
+# are memoryview slices of the mapping. Nothing here needs Blender: with the
+# flatbuffers wheel on sys.path, run
+#
+#   python -m export.level_reader <file.mflevel>
+#
+# from the add-on directory to print a level's stats.
+
+ImageInfo = namedtuple('ImageInfo', ['offset', 'size', 'res_x', 'res_y', 'channels', 'bits_per_sample'])
+
+
+class LevelView:
+    """One view of an open level. Fields are read from the mapping on access."""
+
+    def __init__(self, reader, index, view):
+        self._reader = reader
+        self._view = view
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self._view.Name().decode('utf-8')
+
+    @property
+    def resolution(self) -> tuple:
+        return self._view.ResX(), self._view.ResY()
+
+    @property
+    def adjacent_views(self) -> list:
+        return [self._view.AdjacentViews(i) for i in range(self._view.AdjacentViewsLength())]
+
+    @property
+    def fbs(self):
+        """The generated FlatBuffer View, for fields not wrapped here."""
+        return self._view
+
+    def images(self) -> dict:
+        """{image key: ImageInfo} of the view, mips keyed by image_types.mip_key()."""
+        return {key: _image_info(entry) for key, entry in image_types.view_image_entries(self._view).items()}
+
+    def image(self, key):
+        """The ImageInfo of an image key, or None if the view has no such image."""
+        entry = image_types.find_image_entry(self._view, key)
+        return _image_info(entry) if entry is not None else None
+
+    def image_data(self, key) -> memoryview:
+        """The encoded JXL payload of an image key, as a slice of the mapping."""
+        info = self.image(key)
+        if info is None:
+            raise KeyError(f"View {self.name} has no {key} image")
+        return self._reader.blob_range(info.offset, info.size)
+
+
+def _image_info(entry) -> ImageInfo:
+    return ImageInfo(entry.Offset(), entry.Size(), entry.ResX(), entry.ResY(), entry.Channels(), entry.BitsPerSample())
+
+
+class LevelReader:
+    """A .mflevel mapped read-only into memory.
+
+    Use it as a context manager, or call close(). Memoryviews returned by
+    image_data() keep the mapping alive: release them before closing, mmap
+    raises BufferError otherwise.
+    """
+
+    def __init__(self, level_file):
+        self._level_file = Path(level_file)
+        with open(self._level_file, 'rb') as f:
+            if f.seek(0, 2) < SIZE_PREFIX_BYTES:
+                raise ValueError("File is too small to be a .mflevel")
+            # The mapping stays valid after the file is closed.
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._buffer = memoryview(self._mmap)
+            flatbuffer_size = struct.unpack_from('<I', self._buffer, 0)[0]
+            self._blob_start = SIZE_PREFIX_BYTES + flatbuffer_size
+            if self._blob_start > len(self._buffer):
+                raise ValueError("Truncated FlatBuffer section")
+
+            self._flatbuffer = self._buffer[SIZE_PREFIX_BYTES:self._blob_start]
+            if not Level.Level.LevelBufferHasIdentifier(self._flatbuffer, 0):
+                raise ValueError("Not a .mflevel file (missing MFLV identifier)")
+            self._level = Level.Level.GetRootAs(self._flatbuffer, 0)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._level = None
+        for name in ('_flatbuffer', '_buffer'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+                setattr(self, name, None)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    @property
+    def file(self) -> Path:
+        return self._level_file
+
+    @property
+    def fbs(self):
+        """The generated FlatBuffer Level, for fields not wrapped here."""
+        return self._level
+
+    @property
+    def name(self) -> str:
+        name = self._level.Name()
+        return name.decode('utf-8') if name else ""
+
+    @property
+    def uuid(self) -> str:
+        uuid = self._level.Uuid()
+        return uuid.decode('utf-8') if uuid else ""
+
+    @property
+    def blob_start(self) -> int:
+        return self._blob_start
+
+    @property
+    def blob_size(self) -> int:
+        return len(self._buffer) - self._blob_start
+
+    @property
+    def num_navmesh_verts(self) -> int:
+        return self._level.NavmeshVertsLength()
+
+    @property
+    def num_navmesh_tris(self) -> int:
+        # Navmeshes past uint16 vertex indices are stored in navmesh_tris32 instead.
+        return self._level.NavmeshTrisLength() + self._level.NavmeshTris32Length()
+
+    @property
+    def num_navmesh_bvh_nodes(self) -> int:
+        """0 for levels exported before the navmesh BVH was baked in."""
+        return self._level.NavmeshBvhLength()
+
+    def __len__(self):
+        return self._level.ViewsLength()
+
+    def view(self, index) -> LevelView:
+        if not 0 <= index < len(self):
+            raise IndexError(f"Level has {len(self)} views, no view {index}")
+        return LevelView(self, index, self._level.Views(index))
+
+    def views(self):
+        """Iterate over the views, each parsed when it is reached."""
+        for i in range(len(self)):
+            yield self.view(i)
+
+    def find_view(self, name):
+        """The view called name, or None."""
+        return next((view for view in self.views() if view.name == name), None)
+
+    def blob_range(self, offset, size) -> memoryview:
+        """A range of the image blob as a slice of the mapping."""
+        if offset + size > self.blob_size:
+            raise ValueError(f"Image at {offset}+{size} lies past the end of the {self.blob_size} byte blob")
+        start = self._blob_start + offset
+        return self._buffer[start:start + size]
+
+
+def level_stats(reader) -> dict:
+    """Image sizes per type, shared and unused blob bytes and out of range entries of a level."""
+    bytes_per_type = {}
+    live = set()
+    out_of_range = []
+    for view in reader.views():
+        for key, info in view.images().items():
+            type_name, _ = image_types.split_image_key(key)
+            bytes_per_type[type_name] = bytes_per_type.get(type_name, 0) + info.size
+            live.add((info.offset, info.size))
+            if info.offset + info.size > reader.blob_size:
+                out_of_range.append(f"{view.name} {key}")
+
+    return {
+        "views": len(reader),
+        "navmesh_verts": reader.num_navmesh_verts,
+        "navmesh_tris": reader.num_navmesh_tris,
+        "navmesh_bvh_nodes": reader.num_navmesh_bvh_nodes,
+        "blob_size": reader.blob_size,
+        "image_bytes": bytes_per_type,
+        "shared_bytes": sum(bytes_per_type.values()) - sum(size for _, size in live),
+        "dead_bytes": reader.blob_size - sum(size for _, size in live),
+        "out_of_range": out_of_range,
+    }
+
+
+def main(argv) -> int:
+    if len(argv) != 1:
+        print("Usage: python -m export.level_reader <file.mflevel>", file=sys.stderr)
+        return 2
+
+    with LevelReader(argv[0]) as reader:
+        stats = level_stats(reader)
+        print(f"{reader.file.name}: {reader.name} ({reader.uuid})")
+
+    print(f"  views          {stats['views']}")
+    print(f"  navmesh        {stats['navmesh_verts']} verts, {stats['navmesh_tris']} tris, "
+          f"{stats['navmesh_bvh_nodes']} BVH nodes")
+    print(f"  image blob     {stats['blob_size']} bytes, {stats['shared_bytes']} shared, {stats['dead_bytes']} unused")
+    for type_name, size in stats['image_bytes'].items():
+        print(f"    {type_name:<18} {size:>14} bytes")
+    for entry in stats['out_of_range']:
+        print(f"  {entry} lies past the end of the image blob", file=sys.stderr)
+
+    return 1 if stats['out_of_range'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,195 @@
+import os
+import struct
+import sys
+from pathlib import Path
+
+# .mflevel layout:
+#   4-byte LE size prefix | FlatBuffer ("MFLV" identifier at bytes [8..11]) | image blob
+#
+# The FlatBuffer section may be followed by zero padding up to the size in the
+# prefix; readers locate the root table through the FlatBuffer's own root offset
+# and the image blob always starts at 4 + size prefix.
+
+SIZE_PREFIX_BYTES = 4
+
+_COPY_CHUNK_BYTES = 1 << 20
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def copy_range(src_fd, src_offset, dst_fd, dst_offset, count):
+    """Copy count bytes between two file descriptors without going through Python buffers.
+
+    Uses copy_file_range or sendfile where the platform provides them and falls
+    back to a chunked read/write loop otherwise (Windows, macOS, cross-device copies).
+    """
+    if count <= 0:
+        return
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while count > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, count, src_offset, dst_offset)
+                if copied == 0:
+                    break
+                src_offset += copied
+                dst_offset += copied
+                count -= copied
+        except OSError:
+            pass
+
+    # sendfile only accepts a regular file as the destination on Linux.
+    if count > 0 and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            os.lseek(dst_fd, dst_offset, os.SEEK_SET)
+            while count > 0:
+                copied = os.sendfile(dst_fd, src_fd, src_offset, count)
+                if copied == 0:
+                    break
+                src_offset += copied
+                dst_offset += copied
+                count -= copied
+        except OSError:
+            pass
+
+    while count > 0:
+        os.lseek(src_fd, src_offset, os.SEEK_SET)
+        chunk = os.read(src_fd, min(count, _COPY_CHUNK_BYTES))
+        if not chunk:
+            raise OSError(f"Unexpected end of file while copying {count} more bytes")
+        os.lseek(dst_fd, dst_offset, os.SEEK_SET)
+        _write_all(dst_fd, chunk)
+        src_offset += len(chunk)
+        dst_offset += len(chunk)
+        count -= len(chunk)
+
+
+def _open_flags(*flags):
+    result = getattr(os, 'O_BINARY', 0)
+    for flag in flags:
+        result |= flag
+    return result
+
+
+class LevelWriter:
+    """Streams a .mflevel file to disk without holding the image blob in memory.
+
+    Space for the size-prefixed FlatBuffer is reserved at the start of the file,
+    images are copied into the blob behind it as they are added, and finish()
+    fills in the header once the image offsets are known. Peak memory is bounded
+    by the FlatBuffer, not by the blob.
+
+    The file is written to "<output>.partial" and only moved over output_file
+    once finish() succeeds, so a cancelled export never clobbers a good level.
+    With resume_blob_size, the .partial file left by an interrupted export is
+    reopened and its first resume_blob_size blob bytes are kept.
+    """
+
+    def __init__(self, output_file, header_reserve, resume_blob_size=None):
+        self._output_file = Path(output_file)
+        self._partial_file = self._output_file.with_name(self._output_file.name + ".partial")
+        self._header_reserve = max(8, (int(header_reserve) + 7) & ~7)
+        self._blob_size = 0
+        if resume_blob_size is None:
+            self._fd = os.open(self._partial_file, _open_flags(os.O_RDWR, os.O_CREAT, os.O_TRUNC), 0o644)
+        else:
+            self._fd = os.open(self._partial_file, _open_flags(os.O_RDWR))
+            self._blob_size = resume_blob_size
+            os.ftruncate(self._fd, self.blob_start + resume_blob_size)
+
+    @property
+    def file(self):
+        """File the blob is being written to."""
+        return self._partial_file
+
+    @property
+    def blob_size(self):
+        return self._blob_size
+
+    @property
+    def blob_start(self):
+        return SIZE_PREFIX_BYTES + self._header_reserve
+
+    def add_file(self, path) -> tuple:
+        """Copy a file into the image blob. Returns its (offset, size) within the blob."""
+        src_fd = os.open(path, _open_flags(os.O_RDONLY))
+        try:
+            size = os.fstat(src_fd).st_size
+            offset = self._blob_size
+            copy_range(src_fd, 0, self._fd, self.blob_start + offset, size)
+        finally:
+            os.close(src_fd)
+
+        self._blob_size += size
+        return offset, size
+
+    def add_range(self, src_fd, src_offset, size) -> tuple:
+        """Copy a byte range of another open file into the image blob. Returns its (offset, size) within the blob."""
+        offset = self._blob_size
+        copy_range(src_fd, src_offset, self._fd, self.blob_start + offset, size)
+
+        self._blob_size += size
+        return offset, size
+
+    def add_bytes(self, data) -> tuple:
+        """Append an in-memory payload to the image blob. Returns its (offset, size) within the blob."""
+        offset = self._blob_size
+        os.lseek(self._fd, self.blob_start + offset, os.SEEK_SET)
+        _write_all(self._fd, data)
+
+        self._blob_size += len(data)
+        return offset, len(data)
+
+    def finish(self, flatbuffer_bytes) -> Path:
+        """Write the header, close the file and move it into place."""
+        if len(flatbuffer_bytes) <= self._header_reserve:
+            padding = bytes(self._header_reserve - len(flatbuffer_bytes))
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            _write_all(self._fd, struct.pack('<I', self._header_reserve))
+            _write_all(self._fd, flatbuffer_bytes)
+            _write_all(self._fd, padding)
+            os.close(self._fd)
+        else:
+            self._relocate(flatbuffer_bytes)
+
+        self._fd = None
+        os.replace(self._partial_file, self._output_file)
+        return self._output_file
+
+    def close(self):
+        """Close the partially written file and leave it on disk, so an export journaling it can be resumed."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def abort(self):
+        """Close and delete the partially written file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._partial_file.exists():
+            os.remove(self._partial_file)
+
+    def _relocate(self, flatbuffer_bytes):
+        # The reservation was too small: write the header into a fresh file and
+        # move the blob behind it with a kernel-side copy.
+        relocated_file = self._partial_file.with_name(self._partial_file.name + ".tmp")
+        dst_fd = os.open(relocated_file, _open_flags(os.O_RDWR, os.O_CREAT, os.O_TRUNC), 0o644)
+        try:
+            _write_all(dst_fd, struct.pack('<I', len(flatbuffer_bytes)))
+            _write_all(dst_fd, flatbuffer_bytes)
+            copy_range(self._fd, self.blob_start, dst_fd, SIZE_PREFIX_BYTES + len(flatbuffer_bytes), self._blob_size)
+        except Exception:
+            # E.g. out of disk space: abort() only knows about the .partial.
+            os.close(dst_fd)
+            os.remove(relocated_file)
+            raise
+        os.close(dst_fd)
+
+        os.close(self._fd)
+        os.replace(relocated_file, self._partial_file)
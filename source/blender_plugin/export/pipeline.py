@@ -0,0 +1,489 @@
+import bpy
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import render
+from . import save
+from . import image_types
+from . import serialize
+from . import level_patch
+from .conversion import ConversionQueue
+from .journal import ExportJournal, _range_digest
+from .fingerprint import FingerprintCache, scene_digest, view_fingerprint
+from .level_writer import LevelWriter, SIZE_PREFIX_BYTES, _open_flags
+from .level_patch import LevelPatcher
+
+from ..core.render_view import create_view_list, place_env_probes
+from ..core.composite import CompositeManager
+from ..core.navmesh import Navmesh
+from ..core import trace
+
+
+TRACE_FILE_NAME = "trace.json"
+
+
+def level_name_from_blend() -> str:
+    level_name = bpy.path.display_name_from_filepath(bpy.data.filepath)
+    if not level_name:
+        level_name = "new_level"
+    return level_name
+
+
+class ExportSession:
+    """State of one export run, shared by the interactive and headless exporters.
+
+    The callers own the render loop: they render every view returned by
+    next_view_index(), call view_rendered() once both of its renders are done
+    and finish() when no views are left.
+
+    Encoded images are streamed straight into the level file while rendering
+    continues: a new <level>.mflevel.partial, or the existing level when
+    unchanged views keep their images there (see level_patch). finish() writes
+    the FlatBuffer once every image offset is known.
+    """
+
+    def __init__(self, scene, export_directory=None, level_name=None):
+        settings = scene.mft_global_settings
+
+        self.scene = scene
+        self.export_root = Path(bpy.path.abspath(export_directory or settings.export_directory))
+        self.data_dir = self.export_root / "data"
+        self.level_file = self.export_root / ((level_name or level_name_from_blend()) + ".mflevel")
+
+        self.views = []
+        self.navmesh = None
+        self.shadow_lights = []
+        self.comp_manager = None
+        self.conversion_queue = None
+        self.warnings = []
+
+        self._fingerprint_cache = None
+        self._fingerprints = {}
+        self._journal = None
+        self._kept_views = set()
+        self._views_by_name = {}
+
+        # {view_name: {type_name: (offset, size, res_x, res_y, channels, bits_per_sample)}}
+        # of the level being replaced, and of the images streamed by this export.
+        self._existing_entries = {}
+        self._existing_blob_start = 0
+        self._image_entries = {}
+        self._image_digests = {}
+        # {sha256: (offset, size)} of the payloads in the blob, so identical
+        # images (coinciding env probes, blank passes) are stored once.
+        self._payloads = {}
+        # {size: offsets} of the images already in a level being patched whose
+        # digests are not in _payloads yet, see _hash_existing_payloads().
+        self._unhashed_payloads = {}
+        self._half_float_lighting = settings.half_float_lighting
+        self._mip_levels = settings.preview_mip_levels
+
+        self._sink = None
+        self._sink_lock = threading.Lock()
+        self._sink_closed = False
+        self._resume_blob_size = None
+
+        # Unused bytes left in the image blob by patching, see level_patch.compact_level().
+        self.dead_bytes = 0
+
+        # Bytes not written because an identical image was already in the blob.
+        self.deduplicated_bytes = 0
+
+        # Views reused from the journal of an interrupted export.
+        self.num_resumed = 0
+
+        # Slowest views of the last finish(), as a printable table.
+        self.slowest_views = ""
+
+    def validate(self):
+        """Return an error message if the scene cannot be exported, otherwise None."""
+        settings = self.scene.mft_global_settings
+
+        if not str(self.export_root):
+            return "Please specify an export path"
+
+        if not os.path.exists(self.export_root):
+            return f"Could not create directory: {self.export_root}"
+
+        if not settings.navmesh_object:
+            return "Please specify a target mesh object"
+
+        if len(self.scene.mft_cameras) == 0:
+            return "No cameras in the list"
+
+        if len(self._valid_cameras()) == 0:
+            return "No valid cameras in the list"
+
+        error = serialize.check_index_limits(len(settings.navmesh_object.data.vertices), len(self._valid_cameras()))
+        if error:
+            return error
+
+        return None
+
+    def prepare(self, incremental=True, resume=False, only_view=None) -> int:
+        """Build the view list, place env probes and check the fingerprint cache.
+
+        With resume, views the journal of an interrupted export lists as
+        finished are reused as well. With only_view, just that view is
+        rendered and every other view keeps its images in the existing level.
+        Returns the number of views that need rendering.
+        """
+        scene = self.scene
+        settings = scene.mft_global_settings
+
+        trace.start()
+        start_time = time.perf_counter()
+
+        self.views = create_view_list(self._valid_cameras(), str(self.export_root.resolve()), scene)
+        self.navmesh = Navmesh(settings.navmesh_object)
+        self.shadow_lights = list(scene.mft_shadow_lights)
+        self._views_by_name = {view._name: view for view in self.views}
+
+        # Place env probes before rendering, the probe render is taken from there.
+        with trace.span("place_env_probes", "navmesh", views=len(self.views)):
+            place_env_probes([(view._env_camera_obj, view._main_camera,
+                               self.navmesh.get_view_color_tris(view._camera_color)) for view in self.views])
+
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        self._read_existing_entries()
+        self._image_entries = {}
+        self._image_digests = {}
+        self._payloads = {}
+        self._unhashed_payloads = {}
+        self.deduplicated_bytes = 0
+
+        # Skip views whose inputs are unchanged since the last export and whose
+        # images are still in the level.
+        self._fingerprint_cache = FingerprintCache(self.export_root)
+        self._fingerprints = {}
+        with trace.span("fingerprint", "prepare"):
+            content_digest = scene_digest(scene)
+            for view in self.views:
+                fingerprint = view_fingerprint(view, scene, content_digest)
+                self._fingerprints[view._name] = fingerprint
+                view._cached = (incremental and settings.incremental_export and
+                                self._fingerprint_cache.is_up_to_date(view._name, fingerprint) and
+                                self._has_existing_images(view._name))
+
+        self._journal = ExportJournal(self.export_root, resume)
+        self._resume_blob_size = None
+        self.num_resumed = 0
+        if resume:
+            with trace.span("check journal", "prepare"):
+                resumed = self._journal.verified_views(self._fingerprints)
+            if resumed:
+                self._journal.resume()
+                self._resume_blob_size = max(offset + size for images in resumed.values()
+                                             for offset, size, *_ in images.values())
+                for view in self.views:
+                    if not view._cached and view._name in resumed:
+                        images = resumed[view._name]
+                        self._image_entries[view._name] = {type_name: image[:-1] for type_name, image in images.items()}
+                        self._image_digests[view._name] = {type_name: image[-1] for type_name, image in images.items()}
+                        for offset, size, *_, digest in images.values():
+                            self._payloads[digest] = (offset, size)
+                        view._cached = True
+                        self.num_resumed += 1
+
+        self._kept_views = set()
+        if only_view is not None:
+            for view in self.views:
+                if view._name == only_view:
+                    view._cached = False
+                elif not view._cached and self._has_existing_images(view._name):
+                    view._cached = True
+                    self._kept_views.add(view._name)
+
+        self.conversion_queue = ConversionQueue(settings.conversion_workers,
+                                                on_image_encoded=self._image_encoded,
+                                                on_view_converted=self._view_converted,
+                                                profiles=save.encode_profiles(settings),
+                                                mip_levels=self._mip_levels)
+        trace.add_span("prepare", start_time, time.perf_counter(), "prepare", views=len(self.views))
+
+        return sum(1 for view in self.views if not view._cached)
+
+    def setup_render_scene(self, context, render_scene, cpu_threads=0):
+        self.comp_manager = CompositeManager(render_scene, self._half_float_lighting)
+
+        # Override render settings
+        render.set_renderer_params(context, render_scene, cpu_threads)
+
+    def next_view_index(self, index) -> int:
+        """First index at or after index whose view needs rendering."""
+        while index < len(self.views) and self.views[index]._cached:
+            index += 1
+        return index
+
+    def view_rendered(self, view):
+        """Queue the conversion of a view whose main and probe renders are done."""
+        # Encode each pass on the worker pool while the next view renders.
+        self.conversion_queue.submit_view(view._name, view._render_output_path)
+
+    def finish(self) -> Path:
+        """Wait for conversions, update the fingerprint cache and write the .mflevel.
+
+        Unless every view is up to date (e.g. the export was cancelled), the
+        journal is kept so Resume Export continues from the level. The
+        recorded spans are written to trace.json next to the .mflevel.
+        """
+        failed_images = set()
+        if self.conversion_queue:
+            with trace.span("wait for conversions", "convert", pending=self.conversion_queue.depth):
+                self.conversion_queue.shutdown(wait=True)
+            self.warnings.extend(self.conversion_queue.errors)
+            failed_images = self.conversion_queue.failed_images
+            self.conversion_queue = None
+
+        complete = self._update_fingerprint_cache(failed_images)
+
+        try:
+            with trace.span("write level", "pack"):
+                output_file = self._write_level()
+
+            if complete:
+                # Nothing left to resume.
+                self._journal.remove()
+            else:
+                # The level now holds every journaled image, resuming patches it.
+                self._journal.move({"kind": "patch", "original_size": os.path.getsize(output_file),
+                                    "file": output_file.name, "blob_start": self._blob_start(output_file)})
+            self._journal = None
+
+            return output_file
+        finally:
+            self._write_trace()
+
+    def abort(self, discard=False):
+        """Drop queued conversions without packing a level.
+
+        The images streamed so far and the journal listing them are kept, so
+        the export can be resumed. With discard, both are deleted.
+        """
+        if self.conversion_queue:
+            self.conversion_queue.shutdown(wait=False)
+            self.conversion_queue = None
+
+        with self._sink_lock:
+            # A batch still converting must not open a new sink over the kept one.
+            self._sink_closed = True
+            if self._sink:
+                if discard:
+                    self._sink.abort()
+                else:
+                    self._sink.close()
+                self._sink = None
+
+        if self._journal:
+            if discard:
+                self._journal.remove()
+            self._journal = None
+
+        trace.stop()
+
+    def _valid_cameras(self):
+        return [item for item in self.scene.mft_cameras if item.camera]
+
+    def _read_existing_entries(self):
+        self._existing_entries = {}
+        self._existing_blob_start = 0
+        if not self.level_file.exists():
+            return
+
+        try:
+            fd = os.open(self.level_file, _open_flags(os.O_RDONLY))
+            try:
+                flatbuffer = level_patch.read_flatbuffer(fd)
+            finally:
+                os.close(fd)
+            self._existing_entries = level_patch.image_entries(flatbuffer)
+            self._existing_blob_start = SIZE_PREFIX_BYTES + len(flatbuffer)
+        except (OSError, ValueError) as e:
+            print(f"Not reusing images from {self.level_file}: {e}")
+
+    def _blob_start(self, level_file) -> int:
+        fd = os.open(level_file, _open_flags(os.O_RDONLY))
+        try:
+            return SIZE_PREFIX_BYTES + len(level_patch.read_flatbuffer(fd))
+        finally:
+            os.close(fd)
+
+    def _has_existing_images(self, view_name) -> bool:
+        return set(image_types.IMAGE_TYPES) <= set(self._existing_entries.get(view_name, {}))
+
+    def _open_sink(self):
+        """The LevelWriter or LevelPatcher images are streamed into. Call with _sink_lock held."""
+        if self._sink is not None:
+            return self._sink
+        if self._sink_closed:
+            raise RuntimeError("The export was aborted")
+
+        sink_info = self._journal.sink if self._resume_blob_size is not None else None
+        if sink_info and sink_info["kind"] == "patch":
+            self._sink = LevelPatcher(self.level_file, self._resume_blob_size, sink_info["original_size"])
+        elif sink_info:
+            self._sink = LevelWriter(self.level_file, sink_info["header_reserve"], self._resume_blob_size)
+        elif any(view._cached and view._name in self._existing_entries for view in self.views):
+            # Unchanged views keep their images: append behind them.
+            self._sink = LevelPatcher(self.level_file)
+        else:
+            header_reserve = serialize.estimate_level_size(self.navmesh, self.views, self.shadow_lights, self._mip_levels)
+            self._sink = LevelWriter(self.level_file, header_reserve)
+
+        if not sink_info:
+            if isinstance(self._sink, LevelPatcher):
+                sink_info = {"kind": "patch", "original_size": self._sink.original_size}
+            else:
+                sink_info = {"kind": "new", "header_reserve": self._sink.blob_start - SIZE_PREFIX_BYTES}
+            sink_info.update({"file": self._sink.file.name, "blob_start": self._sink.blob_start})
+            self._journal.start(sink_info)
+
+        if isinstance(self._sink, LevelPatcher):
+            # The level's images stay where they are, so new payloads can point at them too.
+            for entries in self._existing_entries.values():
+                for offset, size, *_ in entries.values():
+                    self._unhashed_payloads.setdefault(size, set()).add(offset)
+
+        return self._sink
+
+    def _hash_existing_payloads(self, size):
+        """Add the digests of the patched level's images of a size to _payloads. Call with _sink_lock held.
+
+        Hashing them all up front would read every image of the level, so
+        images are only read once a new payload of the same size comes in.
+        """
+        offsets = self._unhashed_payloads.pop(size, None)
+        if not offsets:
+            return
+
+        fd = os.open(self.level_file, _open_flags(os.O_RDONLY))
+        try:
+            for offset in sorted(offsets):
+                digest = _range_digest(fd, self._sink.blob_start + offset, size)
+                self._payloads.setdefault(digest, (offset, size))
+        finally:
+            os.close(fd)
+
+    def _image_encoded(self, view_name, type_name, data, bits_per_sample):
+        # Called from a conversion worker with the encoded JXL payload and the sample width it was encoded at.
+        digest = hashlib.sha256(data).hexdigest()
+
+        # type_name is an image key, mips come in as image_types.mip_key(type, level).
+        image_type, mip_level = image_types.split_image_key(type_name)
+        view = self._views_by_name[view_name]
+        res_x = view._env_res_x if image_type == 'Environment' else int(view._uncropped_res_x)
+        res_y = view._env_res_y if image_type == 'Environment' else int(view._uncropped_res_y)
+        res_x, res_y = image_types.mip_resolution(res_x, res_y, mip_level)
+
+        with self._sink_lock, trace.span("pack image", "pack", view=view_name, image=type_name):
+            sink = self._open_sink()
+            self._hash_existing_payloads(len(data))
+            if digest in self._payloads:
+                offset, size = self._payloads[digest]
+                self.deduplicated_bytes += size
+            else:
+                offset, size = sink.add_bytes(data)
+                self._payloads[digest] = (offset, size)
+            self._image_entries.setdefault(view_name, {})[type_name] = (
+                offset, size, res_x, res_y, image_types.IMAGE_CHANNELS[image_type], bits_per_sample)
+            self._image_digests.setdefault(view_name, {})[type_name] = digest
+
+    def _view_converted(self, view_name, ok):
+        # Called from a conversion worker once all passes of a view are written.
+        if not ok or not self._journal:
+            return
+
+        with self._sink_lock:
+            images = {type_name: (*entry, self._image_digests[view_name][type_name])
+                      for type_name, entry in self._image_entries.get(view_name, {}).items()}
+        self._journal.record_view(view_name, self._fingerprints[view_name], images)
+
+    def _update_fingerprint_cache(self, failed_images) -> bool:
+        """Update the cache from this export. Returns True if every view is up to date."""
+        if not self._fingerprint_cache:
+            return False
+
+        complete = True
+        for view in self.views:
+            if view._name in self._kept_views:
+                # Skipped on request, its images may be stale.
+                continue
+
+            images = self._image_entries.get(view._name, {})
+            converted = (set(image_types.IMAGE_TYPES) <= set(images) and
+                         not any((view._name, type_name) in failed_images for type_name in images))
+            if view._cached or converted:
+                self._fingerprint_cache.update(view._name, self._fingerprints[view._name])
+            else:
+                self._fingerprint_cache.invalidate(view._name)
+                complete = False
+
+        self._fingerprint_cache.save()
+        self._fingerprint_cache = None
+
+        return complete
+
+    def _write_trace(self):
+        events = trace.stop()
+        if not events:
+            return
+
+        trace.write_trace(self.export_root / TRACE_FILE_NAME, events)
+        self.slowest_views = trace.slowest_views_table(events)
+        if self.slowest_views:
+            print(f"Slowest views:\n{self.slowest_views}")
+
+    def _write_level(self) -> Path:
+        with self._sink_lock:
+            sink = self._open_sink()
+
+        image_entries = {}
+        copied = {}
+        existing_fd = None
+        try:
+            for view in self.views:
+                if view._name in self._image_entries:
+                    image_entries[view._name] = self._image_entries[view._name]
+                elif isinstance(sink, LevelPatcher):
+                    # Views without new images keep the ones already in the level.
+                    image_entries[view._name] = self._existing_entries.get(view._name, {})
+                else:
+                    # Writing a new file: copy them over from the old level,
+                    # images shared between entries only once.
+                    entries = {}
+                    for type_name, (offset, size, *rest) in self._existing_entries.get(view._name, {}).items():
+                        if (offset, size) not in copied:
+                            if existing_fd is None:
+                                existing_fd = os.open(self.level_file, _open_flags(os.O_RDONLY))
+                            with trace.span("copy image", "pack", view=view._name, image=type_name):
+                                copied[offset, size], _ = sink.add_range(existing_fd, self._existing_blob_start + offset, size)
+                        entries[type_name] = (copied[offset, size], size, *rest)
+                    image_entries[view._name] = entries
+
+            if existing_fd is not None:
+                # The old level is about to be replaced.
+                os.close(existing_fd)
+                existing_fd = None
+
+            # Serialize the FlatBuffer with image offsets embedded.
+            flatbuffer_bytes = serialize.serialize_level(self.navmesh, self.views, image_entries, self.shadow_lights)
+
+            live_ranges = {entry[:2] for entries in image_entries.values() for entry in entries.values()}
+            self.dead_bytes = sink.blob_size - sum(size for _, size in live_ranges)
+            if self.deduplicated_bytes:
+                print(f"Stored identical images once, saving {self.deduplicated_bytes / (1 << 20):.1f} MB")
+
+            return sink.finish(flatbuffer_bytes)
+        except Exception:
+            # Keep the images for resuming, the journal still lists them.
+            sink.close()
+            raise
+        finally:
+            self._sink = None
+            if existing_fd is not None:
+                os.close(existing_fd)
@@ -1,6 +1,6 @@
 import bpy
 
-def set_renderer_params(context, scene):
+def set_renderer_params(context, scene, cpu_threads=0):
     scene.render.filepath = "//tmp/render_temp"
 
     scene.render.image_settings.file_format = "OPEN_EXR"
@@ -18,6 +18,13 @@ def set_renderer_params(context, scene):
 
     scene.render.use_persistent_data = True
 
+    # Sharded export workers share the machine: CPU only, fixed thread count
+    if cpu_threads > 0:
+        scene.cycles.device = "CPU"
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = cpu_threads
+        return
+
     # Enable GPU acceleration
     scene.cycles.device = "GPU"
     context.preferences.addons["cycles"].preferences.get_devices()
@@ -3,6 +3,8 @@ from pathlib import Path
 import os
 
 from .. import mftools
+from ..core import data_models
+from .image_types import IMAGE_CHANNELS
 
 def export_obj(mesh_object, output_path) -> bool:
     if mesh_object.type == "MESH":
@@ -26,15 +28,41 @@ def export_obj(mesh_object, output_path) -> bool:
 
     return False
 
-def convert_all_exr_to_jxl(prefix, input_dir, output_dir):
+def list_exr_passes(input_dir) -> list:
+    """List the (type_name, exr_path) pairs for every EXR pass rendered into input_dir."""
+    passes = []
     for filename in os.listdir(input_dir):
         filepath = Path(input_dir) / filename
         if filepath.is_file() and ".exr" in filename:
-            output_file = prefix + "_" + filename.replace("1.exr", ".jxl")
-            output_file_path = Path(output_dir) / output_file
-
-            # TODO: exr_to_jxl may hit jxl assert if compiled in debug
-            mftools.exr_to_jxl(
-                str(filepath.resolve()),
-                str(output_file_path.resolve()),
-            )
\ No newline at end of file
+            passes.append((filename.replace("1.exr", ""), filepath))
+
+    return passes
+
+def encode_profiles(settings) -> dict:
+    """{type_name: mftools.EncodeProfile} from the per-pass encode settings of the export."""
+    profiles = {}
+    for type_name, prop_name in data_models.ENCODE_PROFILE_PROPERTIES.items():
+        profile = getattr(settings, prop_name)
+        profiles[type_name] = mftools.EncodeProfile(lossless=profile.lossless,
+                                                    distance=profile.distance,
+                                                    effort=profile.effort)
+
+    return profiles
+
+def profile_for(profiles, type_name):
+    """The encode profile of an image type, or the mftools default if profiles has none."""
+    if profiles and type_name in profiles:
+        return profiles[type_name]
+    return mftools.EncodeProfile()
+
+def encode_exr_batch(passes, threads=0, profiles=None, mip_levels=0) -> list:
+    """Encode EXR passes as JXL in memory on mftools' native thread pool.
+
+    passes: (type_name, exr_path) pairs as returned by list_exr_passes(), each
+    encoded with the channel count of its image type and its profile, followed
+    by mip_levels downscaled copies.
+    Returns one result dict per pass, see mftools.convert_batch.
+    """
+    return mftools.convert_batch([(str(Path(path).resolve()), None, profile_for(profiles, type_name),
+                                   IMAGE_CHANNELS.get(type_name, 0), mip_levels)
+                                  for type_name, path in passes], threads)
@@ -1,32 +1,66 @@
 import flatbuffers
-import bmesh
+import numpy as np
+import time
 import uuid as uuid_module
 
 from . data import Vec3
 from . data import Mat4
 from . data import View
 from . data import Level
-from  .data import Triangle
 from  .data import ImageEntry
 from  .data import ShadowLight
 from  .data import LightType
 
 from ..core import render_view
 from ..core import navmesh as navmesh_module
-from ..core.color import CAMERA_COLOR_ATTR, color_to_comparable
+from ..core import trace
+from ..core.color import color_to_comparable
 
+from . import bvh
+from .image_types import split_image_key
+
+
+def _make_image_entry(builder, offset, size, res_x, res_y, channels, bits_per_sample, mips=None):
+    """Build a FlatBuffer ImageEntry table and return its offset.
+
+    mips: optional list of already built ImageEntry offsets, largest first.
+    """
+    if mips:
+        ImageEntry.StartMipsVector(builder, len(mips))
+        for mip in reversed(mips):
+            builder.PrependUOffsetTRelative(mip)
+        mips = builder.EndVector()
 
-def _make_image_entry(builder, offset, size, res_x, res_y, channels):
-    """Build a FlatBuffer ImageEntry table and return its offset."""
     ImageEntry.Start(builder)
     ImageEntry.AddOffset(builder, offset)
     ImageEntry.AddSize(builder, size)
     ImageEntry.AddResX(builder, res_x)
     ImageEntry.AddResY(builder, res_y)
     ImageEntry.AddChannels(builder, channels)
+    ImageEntry.AddBitsPerSample(builder, bits_per_sample)
+    if mips:
+        ImageEntry.AddMips(builder, mips)
     return ImageEntry.End(builder)
 
 
+def _make_view_image_entries(builder, entries) -> dict:
+    """Build the ImageEntry tables of one view, {type_name: offset}, mips nested in their pass."""
+    mips = {}
+    for key, entry in entries.items():
+        type_name, level = split_image_key(key)
+        if level:
+            mips.setdefault(type_name, {})[level] = entry
+
+    tables = {}
+    for key, entry in entries.items():
+        type_name, level = split_image_key(key)
+        if level:
+            continue
+        mip_tables = [_make_image_entry(builder, *mip) for _, mip in sorted(mips.get(type_name, {}).items())]
+        tables[type_name] = _make_image_entry(builder, *entry, mips=mip_tables)
+    return tables
+
+
 _BLENDER_LIGHT_TYPE_MAP = {
     'POINT': LightType.LightType.Omni,
     'SUN':   LightType.LightType.Directional,
@@ -34,13 +68,78 @@ _BLENDER_LIGHT_TYPE_MAP = {
 }
 
 
+# Triangle stores vertex and view indices as uint16. Navmeshes with more
+# vertices are written as Triangle32, whose vertex indices are uint32.
+MAX_UINT16_INDEX = 0xFFFF
+MAX_UINT32_INDEX = 0xFFFFFFFF
+
+
+def uses_wide_indices(num_verts) -> bool:
+    """Whether a navmesh with num_verts vertices needs Triangle32 instead of Triangle."""
+    return num_verts - 1 > MAX_UINT16_INDEX
+
+
+def check_index_limits(num_verts, num_views):
+    """Return an error message if the level format cannot index the navmesh or views, otherwise None."""
+    if num_views - 1 > MAX_UINT16_INDEX:
+        return f"A level holds at most {MAX_UINT16_INDEX + 1} views, the scene has {num_views}"
+    if num_verts - 1 > MAX_UINT32_INDEX:
+        return f"The navmesh has {num_verts} vertices, more than a level can index"
+    return None
+
+
+# NumPy layouts of the level.fbs structs written in bulk, see bvh.NODE_DTYPE for BvhNode.
+VEC3_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+TRIANGLE_DTYPE = np.dtype([('vert1', '<u2'), ('vert2', '<u2'), ('vert3', '<u2'),
+                           ('view_id', '<u2'), ('material_id', '<u2')])
+TRIANGLE32_DTYPE = np.dtype([('vert1', '<u4'), ('vert2', '<u4'), ('vert3', '<u4'),
+                             ('view_id', '<u2'), ('material_id', '<u2')])
+
+
+def _create_struct_vector(builder, structs):
+    """Write a NumPy structured array as a vector of FlatBuffer structs with the same layout, in one copy.
+
+    builder.CreateNumpyVector() only takes arrays of scalars. The vector is
+    aligned to 4 bytes, enough for every struct in level.fbs.
+    """
+    payload = structs.tobytes()
+    builder.StartVector(structs.dtype.itemsize, len(structs), 4)
+    builder.head -= len(payload)
+    builder.Bytes[builder.head:builder.head + len(payload)] = payload
+    return builder.EndVector()
+
+
+def estimate_level_size(navmesh, views, shadow_lights=None, mip_levels=0) -> int:
+    """Upper-bound estimate of the serialize_level output size in bytes.
+
+    Used to reserve the FlatBuffer section at the start of a .mflevel before the
+    image blob is streamed in behind it. Overshooting only costs zero padding;
+    undershooting makes LevelWriter relocate the blob.
+    """
+    mesh = navmesh.object.data
+    num_views = len(views)
+
+    size = 1024
+    size += 12 * len(mesh.vertices) + 16
+    size += (16 if uses_wide_indices(len(mesh.vertices)) else 10) * len(mesh.loop_triangles) + 16
+    # BVH nodes, at most two per leaf of bvh.LEAF_SIZE triangles
+    size += bvh.NODE_DTYPE.itemsize * 2 * (len(mesh.loop_triangles) // bvh.LEAF_SIZE + 1) + 16
+    size += 128 * len(shadow_lights or [])
+    for view in views:
+        # View table + Mat4 + name + adjacency list + 7 ImageEntry tables and their mips
+        size += 256 + len(view._name.encode('utf-8')) + 2 * num_views + 7 * 64 * (1 + mip_levels)
+
+    return int(size * 1.25)
+
+
 def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> bytearray:
     """Serialize level data to a FlatBuffer bytearray.
 
-    image_entries: optional dict  {view_name: {type_name: (offset, size, res_x, res_y, channels)}}
+    image_entries: optional dict  {view_name: {type_name: (offset, size, res_x, res_y, channels, bits_per_sample)}}
         where type_name is one of 'DirectDiffuse', 'DirectSpecular', 'IndirectDiffuse',
         'IndirectSpecular', 'Normal', 'Depth', 'Environment'
         and offset/size are byte positions within the .mflevel image blob.
+        Mip levels are keyed by image_types.mip_key(type_name, level).
 
     shadow_lights: optional list of MFT_ShadowLight property-group items whose
         .light field points to a Blender light object.
@@ -48,19 +147,26 @@ def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> b
     if navmesh is None or views is None:
         return None
 
+    error = check_index_limits(len(navmesh.object.data.vertices), len(views))
+    if error:
+        raise ValueError(error)
+
+    start_time = time.perf_counter()
+
     # Create a mapping from camera colors to view indices
     color_to_index = {}
     for view_obj in views:
         color_key = color_to_comparable(view_obj._camera_color)
         color_to_index[color_key] = view_obj._camera_index
 
-    # Find adjacent views and set env probe locations
+    # Find adjacent views, for all views in one pass over the navmesh
+    with trace.span("view_adjacency", "navmesh", views=len(views)):
+        adjacency = navmesh.view_adjacency(color_to_index)
     for view_obj in views:
-        view_obj._adjacent_views = navmesh.find_adjacent_views(view_obj._camera_color, color_to_index)
-        tris = navmesh.get_view_color_tris(view_obj._camera_color)
-        view_obj.set_env_probe_location(tris)
+        view_obj._adjacent_views = adjacency.get(color_to_index[color_to_comparable(view_obj._camera_color)], [])
 
     builder = flatbuffers.Builder(4096)
+    views_start_time = time.perf_counter()
 
     serialized_views = list()
     for view in views:
@@ -69,10 +175,13 @@ def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> b
 
         # Build ImageEntry tables before View.Start (FlatBuffers requires
         # nested table offsets to be created before the parent table starts).
+        # Default-valued fields are stored too, so a level can be patched in
+        # place (see level_patch) even where an image sits at offset 0.
         img_entries = {}
         if image_entries and view._name in image_entries:
-            for type_name, (offset, size, res_x, res_y, channels) in image_entries[view._name].items():
-                img_entries[type_name] = _make_image_entry(builder, offset, size, res_x, res_y, channels)
+            builder.ForceDefaults(True)
+            img_entries = _make_view_image_entries(builder, image_entries[view._name])
+            builder.ForceDefaults(False)
 
         View.StartAdjacentViewsVector(builder, len(view._adjacent_views))
         for adj_view in view._adjacent_views:
@@ -125,52 +234,31 @@ def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> b
     for serialized_view in reversed(serialized_views):
         builder.PrependUOffsetTRelative(serialized_view)
     serialized_views = builder.EndVector()
+    navmesh_start_time = time.perf_counter()
+    trace.add_span("serialize views", views_start_time, navmesh_start_time, "serialize")
 
-    Level.StartNavmeshVertsVector(
-        builder, len(navmesh.object.data.vertices)
-    )
-    for vert in reversed(navmesh.object.data.vertices):
-        Vec3.CreateVec3(builder, vert.co.x, vert.co.y, vert.co.z)
-    navmesh_verts = builder.EndVector()
-
-    # Get face colors from the navmesh using bmesh.
-    # CameraColor is a CORNER-domain color attribute; read via loops layer.
-    bm = bmesh.new()
-    bm.from_mesh(navmesh.object.data)
-    color_layer = bm.loops.layers.float_color.get(CAMERA_COLOR_ATTR)
-
-    # Build a mapping from polygon index to view index
-    polygon_to_view = {}
-    if color_layer:
-        for face in bm.faces:
-            # All loops on a face share the same colour; read the first one.
-            first_loop_color = next(iter(face.loops))[color_layer]
-            face_color = color_to_comparable(first_loop_color)
-            if face_color in color_to_index:
-                polygon_to_view[face.index] = color_to_index[face_color]
-            else:
-                # Default to 0 if no color match found
-                polygon_to_view[face.index] = 0
-
-    bm.free()
-
-    Level.StartNavmeshTrisVector(
-        builder, len(navmesh.object.data.loop_triangles)
-    )
-
-    for tri in reversed(navmesh.object.data.loop_triangles):
-        # Get view index from polygon color mapping
-        view_index = polygon_to_view.get(tri.polygon_index, 0)
-
-        Triangle.CreateTriangle(
-            builder,
-            tri.vertices[0],
-            tri.vertices[1],
-            tri.vertices[2],
-            view_index,
-            0,
-        )
-    navmesh_tris = builder.EndVector()
+    index = navmesh.index
+    vertices = np.zeros(len(index.vertices), dtype=VEC3_DTYPE)
+    vertices['x'], vertices['y'], vertices['z'] = index.vertices.T
+    navmesh_verts = _create_struct_vector(builder, vertices)
+
+    # Triangles are written in BVH order, the leaves refer to ranges of them.
+    with trace.span("build navmesh bvh", "navmesh", tris=len(index.triangles)):
+        bvh_order, bvh_nodes = bvh.build_bvh(index.triangles)
+
+    # View index of every face from the navmesh index, faces matching no camera default to view 0.
+    face_views = index.face_view_ids(color_to_index).clip(min=0)
+
+    # Past uint16 vertex indices the triangles go to navmesh_tris32, navmesh_tris stays empty.
+    wide_indices = uses_wide_indices(len(index.vertices))
+    tris = np.zeros(len(bvh_order), dtype=TRIANGLE32_DTYPE if wide_indices else TRIANGLE_DTYPE)
+    tris['vert1'], tris['vert2'], tris['vert3'] = index.tri_vertices[bvh_order].T
+    tris['view_id'] = face_views[index.tri_faces[bvh_order]]
+    navmesh_tris = _create_struct_vector(builder, tris[:0] if wide_indices else tris)
+    navmesh_tris32 = _create_struct_vector(builder, tris) if wide_indices else None
+    navmesh_bvh = _create_struct_vector(builder, bvh_nodes)
+    trace.add_span("serialize navmesh", navmesh_start_time, time.perf_counter(), "serialize",
+                   verts=len(index.vertices), tris=len(index.triangles))
 
     level_name = builder.CreateString(navmesh.object.name)
     level_uuid = builder.CreateString(str(uuid_module.uuid4()))
@@ -210,6 +298,9 @@ def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> b
     Level.Start(builder)
     Level.AddNavmeshVerts(builder, navmesh_verts)
     Level.AddNavmeshTris(builder, navmesh_tris)
+    Level.AddNavmeshBvh(builder, navmesh_bvh)
+    if navmesh_tris32 is not None:
+        Level.AddNavmeshTris32(builder, navmesh_tris32)
     Level.AddViews(builder, serialized_views)
     Level.AddName(builder, level_name)
     Level.AddTargetResX(builder, 1920)
@@ -219,5 +310,6 @@ def serialize_level(navmesh, views, image_entries=None, shadow_lights=None) -> b
     level = Level.End(builder)
 
     builder.Finish(level, file_identifier=b'MFLV')
+    trace.add_span("serialize_level", start_time, time.perf_counter(), "serialize")
 
     return builder.Output()
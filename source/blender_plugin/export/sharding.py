@@ -0,0 +1,106 @@
+import bpy
+
+import json
+import os
+import subprocess
+from pathlib import Path
+
+# Sharded exports split the views that need rendering across several local
+# Blender processes. The parent writes a manifest, each worker renders its
+# shard into the usual renders/<camera> folders and drops a .done marker, and
+# a separate merge step converts everything and packs the .mflevel.
+
+SHARD_DIR_NAME = "shards"
+MANIFEST_FILE_NAME = "manifest.json"
+
+BATCH_SCRIPT = Path(__file__).resolve().parent.parent / "batch_export.py"
+
+
+def shard_dir(session) -> Path:
+    return session.data_dir / SHARD_DIR_NAME
+
+
+def write_manifest(session, num_shards) -> dict:
+    """Assign every view that needs rendering to a shard and write the manifest.
+
+    Views are dealt out round-robin so each shard gets a mix of cheap and
+    expensive cameras.
+    """
+    to_render = [index for index, view in enumerate(session.views) if not view._cached]
+    num_shards = max(1, min(num_shards, len(to_render)))
+
+    manifest = {
+        "blend_file": bpy.data.filepath,
+        "export_directory": str(session.export_root),
+        "views": [{"index": index, "name": view._name, "render": not view._cached}
+                  for index, view in enumerate(session.views)],
+        "shards": [to_render[shard::num_shards] for shard in range(num_shards)] if to_render else [],
+    }
+
+    directory = shard_dir(session)
+    os.makedirs(directory, exist_ok=True)
+    for marker in directory.glob("*.done"):
+        os.remove(marker)
+
+    (directory / MANIFEST_FILE_NAME).write_text(json.dumps(manifest, indent=2))
+
+    return manifest
+
+
+def read_manifest(session) -> dict:
+    return json.loads((shard_dir(session) / MANIFEST_FILE_NAME).read_text())
+
+
+def mark_shard_done(session, shard):
+    (shard_dir(session) / f"shard_{shard}.done").touch()
+
+
+def missing_shards(session, manifest) -> list:
+    directory = shard_dir(session)
+    return [shard for shard in range(len(manifest["shards"]))
+            if not (directory / f"shard_{shard}.done").exists()]
+
+
+def launch_workers(session, manifest) -> list:
+    """Start one background Blender per shard. Returns the Popen handles.
+
+    Workers render on the CPU and split the cores between them; several
+    CPU-only Cycles instances scale better than one instance on big machines.
+    """
+    num_shards = len(manifest["shards"])
+    threads = max(1, (os.cpu_count() or 1) // max(1, num_shards))
+    directory = shard_dir(session)
+
+    workers = []
+    for shard in range(num_shards):
+        command = [
+            bpy.app.binary_path, "-b", "--python", str(BATCH_SCRIPT), "--",
+            manifest["blend_file"], manifest["export_directory"],
+            "--shard", str(shard),
+            "--threads", str(threads),
+        ]
+        log = open(directory / f"shard_{shard}.log", 'w')
+        workers.append(subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT))
+        log.close()
+
+    return workers
+
+
+def queue_shard_conversions(session, manifest) -> str:
+    """Queue conversion of every view the shards rendered.
+
+    Returns an error message if a shard did not finish, otherwise None.
+    """
+    missing = missing_shards(session, manifest)
+    if missing:
+        return f"Shards did not finish: {', '.join(str(shard) for shard in missing)}"
+
+    names = {entry["index"]: entry["name"] for entry in manifest["views"]}
+    for shard in manifest["shards"]:
+        for index in shard:
+            view = session.views[index]
+            if view._name != names[index]:
+                return f"View {index} is {view._name} but the manifest expects {names[index]}"
+            session.view_rendered(view)
+
+    return None
@@ -0,0 +1,95 @@
+"""Tests of the navmesh BVH build, runnable without Blender:
+
+    python -m unittest discover -s source/blender_plugin/export -p "test_*.py"
+"""
+
+import importlib.util
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Loaded by path, importing the add-on package would need bpy.
+_spec = importlib.util.spec_from_file_location("bvh", Path(__file__).with_name("bvh.py"))
+bvh = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bvh)
+
+
+def random_tris(num_tris, seed=0):
+    """Small triangles scattered over a 100 x 100 floor with some height variation."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform((0.0, 0.0, 0.0), (100.0, 100.0, 5.0), size=(num_tris, 1, 3))
+    return (centers + rng.uniform(-1.0, 1.0, size=(num_tris, 3, 3))).astype(np.float32)
+
+
+class BuildBvhTest(unittest.TestCase):
+    def check_bvh(self, tris, leaf_size=bvh.LEAF_SIZE):
+        order, nodes = bvh.build_bvh(tris, leaf_size)
+        num_tris = len(tris)
+        self.assertEqual(nodes.dtype, bvh.NODE_DTYPE)
+
+        # Every triangle is in the order exactly once.
+        np.testing.assert_array_equal(np.sort(order), np.arange(num_tris))
+
+        # Leaves tile the ordered triangles without gaps or overlaps.
+        leaves = np.flatnonzero(nodes['count'])
+        leaves = leaves[np.argsort(nodes['first'][leaves])]
+        firsts = nodes['first'][leaves].astype(np.int64)
+        counts = nodes['count'][leaves].astype(np.int64)
+        self.assertTrue((counts <= leaf_size).all())
+        np.testing.assert_array_equal(firsts, np.concatenate([[0], np.cumsum(counts)[:-1]]))
+        self.assertEqual(counts.sum(), num_tris)
+
+        # Leaf bounds hold their triangles.
+        ordered = tris[order]
+        for first, count, box_min, box_max in zip(firsts, counts, nodes['box_min'][leaves], nodes['box_max'][leaves]):
+            leaf_tris = ordered[first:first + count].reshape(-1, 3)
+            np.testing.assert_array_equal(leaf_tris.min(axis=0), box_min)
+            np.testing.assert_array_equal(leaf_tris.max(axis=0), box_max)
+
+        # Walking from the root reaches every node once, children nested in their parent.
+        visits = np.zeros(len(nodes), dtype=np.int64)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            visits[node] += 1
+            if nodes['count'][node] == 0:
+                children = [int(nodes['first'][node]), int(nodes['first'][node]) + 1]
+                self.assertTrue(all(node < child < len(nodes) for child in children))
+                for child in children:
+                    self.assertTrue((nodes['box_min'][child] >= nodes['box_min'][node]).all())
+                    self.assertTrue((nodes['box_max'][child] <= nodes['box_max'][node]).all())
+                stack.extend(children)
+        np.testing.assert_array_equal(visits, 1)
+
+        return order, nodes
+
+    def test_empty(self):
+        order, nodes = bvh.build_bvh(np.empty((0, 3, 3), dtype=np.float32))
+        self.assertEqual(len(order), 0)
+        self.assertEqual(len(nodes), 0)
+
+    def test_single_leaf(self):
+        for num_tris in (1, bvh.LEAF_SIZE):
+            _, nodes = self.check_bvh(random_tris(num_tris))
+            self.assertEqual(len(nodes), 1)
+
+    def test_random_triangles(self):
+        for num_tris in (bvh.LEAF_SIZE + 1, 100, 1000, 4321):
+            with self.subTest(num_tris=num_tris):
+                self.check_bvh(random_tris(num_tris, seed=num_tris))
+
+    def test_leaf_sizes(self):
+        for leaf_size in (1, 3, 16):
+            with self.subTest(leaf_size=leaf_size):
+                self.check_bvh(random_tris(500), leaf_size)
+
+    def test_flat_and_coincident_triangles(self):
+        flat = random_tris(200)
+        flat[..., 2] = 0.0
+        self.check_bvh(flat)
+        self.check_bvh(np.ones((50, 3, 3), dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
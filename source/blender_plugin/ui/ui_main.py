@@ -3,6 +3,7 @@ from bpy.types import Panel, UIList
 
 from ..core import data_models
 from ..core.color import CAMERA_COLOR_ATTR
+from ..export.journal import journal_exists
 
 LIGHT_TYPE_ICONS = {
     'POINT': 'LIGHT_POINT',
@@ -82,6 +83,10 @@ class MFT_PT_MainPanel(Panel):
                 box.label(text=f"{camera_item.camera.name} View Properties")
                 box.prop(camera_item, "max_pan")
                 box.prop(camera_item, "max_tilt")
+
+                if not scene.mft_global_settings.is_rendering:
+                    box.operator("mft.export", text="Re-export Camera",
+                                 icon='FILE_REFRESH').view_name = camera_item.camera.name
             else:
                 box.label(text="No camera selected")
 
@@ -128,6 +133,23 @@ class MFT_PT_MainPanel(Panel):
         box.prop(scene.mft_global_settings, "render_width")
         box.prop(scene.mft_global_settings, "render_height")
         box.prop(scene.mft_global_settings, "render_samples")
+        box.prop(scene.mft_global_settings, "half_float_lighting")
+        box.prop(scene.mft_global_settings, "preview_mip_levels")
+        box.prop(scene.mft_global_settings, "conversion_workers")
+        box.prop(scene.mft_global_settings, "incremental_export")
+        box.prop(scene.mft_global_settings, "shard_count")
+
+        box = layout.box()
+        box.label(text="Encode Profiles:")
+        for type_name, prop_name in data_models.ENCODE_PROFILE_PROPERTIES.items():
+            profile = getattr(scene.mft_global_settings, prop_name)
+            row = box.row(align=True)
+            row.label(text=type_name)
+            row.prop(profile, "lossless", text="", icon='LOCKED' if profile.lossless else 'UNLOCKED')
+            sub = row.row(align=True)
+            sub.active = not profile.lossless
+            sub.prop(profile, "distance", text="")
+            row.prop(profile, "effort", text="")
 
         box = layout.box()
         box.label(text="Export Path:")
@@ -139,9 +161,16 @@ class MFT_PT_MainPanel(Panel):
             progress_ratio = (min(scene.mft_global_settings.current_view, scene.mft_global_settings.total_views - 1)) / scene.mft_global_settings.total_views
 
             col.progress(text="Rendering...", factor=progress_ratio)
+            if scene.mft_global_settings.conversion_queue_depth > 0:
+                col.label(text=f"Converting {scene.mft_global_settings.conversion_queue_depth} passes", icon='FILE_IMAGE')
             col.operator("mft.cancel", icon='CANCEL')
         else:
-            col.operator("mft.export", icon='RENDER_STILL')
+            row = col.row(align=True)
+            row.operator("mft.export", icon='RENDER_STILL')
+            row.operator("mft.export_sharded", icon='RENDER_ANIMATION')
+            if journal_exists(bpy.path.abspath(scene.mft_global_settings.export_directory)):
+                col.operator("mft.export", text="Resume Export", icon='RECOVER_LAST').resume = True
+            col.operator("mft.compact_level", icon='PACKAGE')
 
 
 def register_properties():
@@ -99,6 +99,7 @@ static int cmd_inspect( const char* path )
     printf( "UUID:          %s\n", fbs->uuid() ? fbs->uuid()->c_str() : "(none)" );
     printf( "Views:         %d\n", num_views );
     printf( "Navmesh tris:  %d\n", mft::get_navmesh_num_tris( level ) );
+    printf( "Navmesh BVH:   %u nodes\n", fbs->navmesh_bvh() ? fbs->navmesh_bvh()->size() : 0u );
 
     if( num_views == 0 )
         return 0;
@@ -139,10 +140,10 @@ static int cmd_inspect( const char* path )
             }
 
             const size_t compressed_bytes = static_cast<size_t>( entry->size() );
-            const size_t pixel_bytes      = static_cast<size_t>( entry->res_x() ) * entry->res_y() * entry->channels() * sizeof( float );
+            const size_t pixel_bytes      = static_cast<size_t>( entry->res_x() ) * entry->res_y() * entry->channels() * entry->bits_per_sample() / 8;
 
             std::vector<char> compressed( compressed_bytes );
-            std::vector<float> pixels( static_cast<size_t>( entry->res_x() ) * entry->res_y() * entry->channels() );
+            std::vector<char> pixels( pixel_bytes );
 
             if( !mft::read_image_data( level, i, IMAGE_TYPES[t], compressed.data(), compressed_bytes ) )
             {
@@ -150,9 +151,10 @@ static int cmd_inspect( const char* path )
                 continue;
             }
 
-            bool ok = mft::jxl::decode_jxl( compressed.data(), compressed_bytes, pixels.data(), pixel_bytes );
-            printf( "    %-20s  %5ux%-5u  ch=%u  %s\n",
-                    IMAGE_TYPE_NAMES[t], entry->res_x(), entry->res_y(), entry->channels(),
+            bool ok = mft::jxl::decode_jxl( compressed.data(), compressed_bytes, pixels.data(), pixel_bytes, entry->bits_per_sample() );
+            const unsigned num_mips = entry->mips() ? entry->mips()->size() : 0;
+            printf( "    %-20s  %5ux%-5u  ch=%u  %2ubit  mips=%u  %s\n",
+                    IMAGE_TYPE_NAMES[t], entry->res_x(), entry->res_y(), entry->channels(), entry->bits_per_sample(), num_mips,
                     ok ? "ok" : "DECODE FAILED" );
         }
     }
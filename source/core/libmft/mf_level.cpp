@@ -2,7 +2,9 @@
 
 #include "io.h"
 
+#include <algorithm>
 #include <cassert>
+#include <cmath>
 #include <fstream>
 #include <limits>
 #include <queue>
@@ -98,43 +100,209 @@ namespace mft
         return true;
     }
 
+    // Deep enough for any BVH the exporter builds, it halves the triangles per level.
+    static constexpr int kMaxBvhDepth = 64;
+
+    static bool has_bvh( const data::Level* fbs )
+    {
+        return fbs->navmesh_bvh() && fbs->navmesh_bvh()->size() > 0;
+    }
+
+    static float distance_sq_to_box( const data::BvhNode& node, const data::Vec3& point )
+    {
+        const float dx = std::max( { node.box_min().x() - point.x(), 0.0f, point.x() - node.box_max().x() } );
+        const float dy = std::max( { node.box_min().y() - point.y(), 0.0f, point.y() - node.box_max().y() } );
+        const float dz = std::max( { node.box_min().z() - point.z(), 0.0f, point.z() - node.box_max().z() } );
+        return dx * dx + dy * dy + dz * dz;
+    }
+
+    // A navmesh triangle from navmesh_tris, or navmesh_tris32 in levels whose navmesh exceeds uint16 vertex indices.
+    struct NavmeshTri
+    {
+        uint32_t vert1, vert2, vert3;
+        uint16_t view_id;
+    };
+
+    static uint32_t num_navmesh_tris( const data::Level* fbs )
+    {
+        if( fbs->navmesh_tris32() && fbs->navmesh_tris32()->size() > 0 )
+            return fbs->navmesh_tris32()->size();
+        return fbs->navmesh_tris() ? fbs->navmesh_tris()->size() : 0;
+    }
+
+    static NavmeshTri navmesh_tri( const data::Level* fbs, uint32_t tri_index )
+    {
+        if( fbs->navmesh_tris32() && fbs->navmesh_tris32()->size() > 0 )
+        {
+            const auto* tri = fbs->navmesh_tris32()->Get( tri_index );
+            return { tri->vert1(), tri->vert2(), tri->vert3(), tri->view_id() };
+        }
+        const auto* tri = fbs->navmesh_tris()->Get( tri_index );
+        return { tri->vert1(), tri->vert2(), tri->vert3(), tri->view_id() };
+    }
+
+    static float distance_sq_to_triangle( const data::Level* fbs, uint32_t tri_index, const data::Vec3& point )
+    {
+        const NavmeshTri tri = navmesh_tri( fbs, tri_index );
+        const auto* verts    = fbs->navmesh_verts();
+        data::Vec3 diff      = sub( point, closesPointOnTriangle( *verts->Get( tri.vert1 ), *verts->Get( tri.vert2 ), *verts->Get( tri.vert3 ), point ) );
+        return dot( diff, diff );
+    }
+
+    // Height of a triangle at x, y, or false if x, y lies outside its projection onto the XY plane.
+    static bool triangle_height( const data::Level* fbs, uint32_t tri_index, float x, float y, float& out_height )
+    {
+        const NavmeshTri tri = navmesh_tri( fbs, tri_index );
+        const auto* verts    = fbs->navmesh_verts();
+        const auto& a        = *verts->Get( tri.vert1 );
+        const auto& b        = *verts->Get( tri.vert2 );
+        const auto& c        = *verts->Get( tri.vert3 );
+
+        const float det = ( b.x() - a.x() ) * ( c.y() - a.y() ) - ( c.x() - a.x() ) * ( b.y() - a.y() );
+        if( std::abs( det ) < 1e-12f ) // Vertical or degenerate
+            return false;
+
+        const float u = ( ( x - a.x() ) * ( c.y() - a.y() ) - ( c.x() - a.x() ) * ( y - a.y() ) ) / det;
+        const float v = ( ( b.x() - a.x() ) * ( y - a.y() ) - ( x - a.x() ) * ( b.y() - a.y() ) ) / det;
+        if( u < 0.0f || v < 0.0f || u + v > 1.0f )
+            return false;
+
+        out_height = a.z() + u * ( b.z() - a.z() ) + v * ( c.z() - a.z() );
+        return true;
+    }
+
     int get_view_id_from_position( const Level& level, float x, float y, float z )
     {
-        const auto* fbs   = level.fbs();
-        const auto* verts = fbs->navmesh_verts();
+        const auto* fbs         = level.fbs();
+        const uint32_t num_tris = num_navmesh_tris( fbs );
         data::Vec3 point( x, y, z );
 
         float min_distance = std::numeric_limits<float>::max();
         int id             = 0;
 
-        for( auto tri = fbs->navmesh_tris()->begin(); tri != fbs->navmesh_tris()->end(); ++tri )
+        auto test_triangle = [&]( uint32_t tri_index )
         {
-            data::Vec3 closest = closesPointOnTriangle( *verts->Get( tri->vert1() ), *verts->Get( tri->vert2() ), *verts->Get( tri->vert3() ), point );
-            float dist         = length( sub( point, closest ) );
+            float dist = distance_sq_to_triangle( fbs, tri_index, point );
             if( dist < min_distance )
             {
                 min_distance = dist;
-                id           = tri->view_id();
+                id           = navmesh_tri( fbs, tri_index ).view_id;
+            }
+        };
+
+        // Levels exported before the BVH existed are scanned triangle by triangle.
+        if( !has_bvh( fbs ) )
+        {
+            for( uint32_t i = 0; i < num_tris; ++i )
+                test_triangle( i );
+            return id;
+        }
+
+        // Branch and bound, nearer child first, skipping boxes farther than the closest triangle so far.
+        const auto* bvh = fbs->navmesh_bvh();
+        uint32_t stack[kMaxBvhDepth * 2];
+        int stack_size      = 0;
+        stack[stack_size++] = 0;
+
+        while( stack_size > 0 )
+        {
+            const auto* node = bvh->Get( stack[--stack_size] );
+            if( distance_sq_to_box( *node, point ) >= min_distance )
+                continue;
+
+            if( node->count() > 0 )
+            {
+                const uint32_t end = std::min( node->first() + node->count(), num_tris );
+                for( uint32_t i = node->first(); i < end; ++i )
+                    test_triangle( i );
+                continue;
             }
+
+            if( node->first() + 1 >= bvh->size() || stack_size + 2 > kMaxBvhDepth * 2 )
+                continue;
+
+            uint32_t near_child = node->first(), far_child = node->first() + 1;
+            if( distance_sq_to_box( *bvh->Get( far_child ), point ) < distance_sq_to_box( *bvh->Get( near_child ), point ) )
+                std::swap( near_child, far_child );
+            stack[stack_size++] = far_child;
+            stack[stack_size++] = near_child;
         }
 
         return id;
     }
 
+    bool get_navmesh_height( const Level& level, float x, float y, float z, float& out_height )
+    {
+        const auto* fbs         = level.fbs();
+        const uint32_t num_tris = num_navmesh_tris( fbs );
+
+        float min_offset = std::numeric_limits<float>::max();
+        bool found       = false;
+
+        auto test_triangle = [&]( uint32_t tri_index )
+        {
+            float height;
+            if( triangle_height( fbs, tri_index, x, y, height ) && std::abs( height - z ) < min_offset )
+            {
+                min_offset = std::abs( height - z );
+                out_height = height;
+                found      = true;
+            }
+        };
+
+        if( !has_bvh( fbs ) )
+        {
+            for( uint32_t i = 0; i < num_tris; ++i )
+                test_triangle( i );
+            return found;
+        }
+
+        // Only boxes above or below x, y are entered, and only while their height range can beat the best surface.
+        const auto* bvh = fbs->navmesh_bvh();
+        uint32_t stack[kMaxBvhDepth * 2];
+        int stack_size      = 0;
+        stack[stack_size++] = 0;
+
+        while( stack_size > 0 )
+        {
+            const auto* node = bvh->Get( stack[--stack_size] );
+            if( x < node->box_min().x() || x > node->box_max().x() || y < node->box_min().y() || y > node->box_max().y() )
+                continue;
+            if( std::max( { node->box_min().z() - z, 0.0f, z - node->box_max().z() } ) >= min_offset )
+                continue;
+
+            if( node->count() > 0 )
+            {
+                const uint32_t end = std::min( node->first() + node->count(), num_tris );
+                for( uint32_t i = node->first(); i < end; ++i )
+                    test_triangle( i );
+                continue;
+            }
+
+            if( node->first() + 1 >= bvh->size() || stack_size + 2 > kMaxBvhDepth * 2 )
+                continue;
+
+            stack[stack_size++] = node->first() + 1;
+            stack[stack_size++] = node->first();
+        }
+
+        return found;
+    }
+
     int get_navmesh_num_tris( const Level& level )
     {
-        return static_cast<int>( level.fbs()->navmesh_tris()->size() );
+        return static_cast<int>( num_navmesh_tris( level.fbs() ) );
     }
 
     std::array<float, 9> get_navmesh_tri_verts( const Level& level, int tri_index )
     {
-        const auto* fbs   = level.fbs();
-        const auto* tri   = fbs->navmesh_tris()->Get( tri_index );
-        const auto* verts = fbs->navmesh_verts();
-        assert( tri_index >= 0 && tri_index < (int)fbs->navmesh_tris()->size() );
-        return { verts->Get( tri->vert1() )->x(), verts->Get( tri->vert1() )->y(), verts->Get( tri->vert1() )->z(),
-                 verts->Get( tri->vert2() )->x(), verts->Get( tri->vert2() )->y(), verts->Get( tri->vert2() )->z(),
-                 verts->Get( tri->vert3() )->x(), verts->Get( tri->vert3() )->y(), verts->Get( tri->vert3() )->z() };
+        const auto* fbs = level.fbs();
+        assert( tri_index >= 0 && tri_index < (int)num_navmesh_tris( fbs ) );
+        const NavmeshTri tri = navmesh_tri( fbs, tri_index );
+        const auto* verts    = fbs->navmesh_verts();
+        return { verts->Get( tri.vert1 )->x(), verts->Get( tri.vert1 )->y(), verts->Get( tri.vert1 )->z(),
+                 verts->Get( tri.vert2 )->x(), verts->Get( tri.vert2 )->y(), verts->Get( tri.vert2 )->z(),
+                 verts->Get( tri.vert3 )->x(), verts->Get( tri.vert3 )->y(), verts->Get( tri.vert3 )->z() };
     }
 
 } // namespace mft
@@ -46,8 +46,11 @@ namespace mft
     // Opens a fresh file stream per call — safe to call from multiple threads simultaneously.
     bool read_image_data( const Level& level, int view_index, ImageType type, void* buf, size_t buf_size );
 
-    // Navmesh queries
+    // Navmesh queries. Levels with a baked navmesh_bvh answer them in logarithmic time,
+    // older levels fall back to testing every triangle.
     int get_view_id_from_position( const Level& level, float x, float y, float z );
+    // Height of the navmesh surface at x, y closest to z. Returns false if no triangle lies above or below x, y.
+    bool get_navmesh_height( const Level& level, float x, float y, float z, float& out_height );
     int get_navmesh_num_tris( const Level& level );
     std::array<float, 9> get_navmesh_tri_verts( const Level& level, int tri_index );
 
@@ -8,10 +8,17 @@
 #include <ImfFrameBuffer.h>
 #include <ImfInputFile.h>
 #include <ImfRgbaFile.h>
+#include <half.h>
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
+#include <algorithm>
+#include <atomic>
+#include <cmath>
+#include <chrono>
+#include <memory>
 #include <sstream>
 #include <string>
+#include <thread>
 #include <vector>
 
 namespace mft
@@ -43,63 +50,165 @@ namespace mft
         return true;
     }
 
-    bool exr_to_jxl( const std::string& input_file, const std::string& output_file )
+    // Reads a 1, 2 or 3 channel EXR into interleaved pixels. Half-float EXRs are
+    // kept as half floats (bits_per_sample 16), anything else is read as floats
+    // (bits_per_sample 32). With max_channels only the first channels (in RGB or
+    // XYZ order) are read, e.g. 2 for octahedral normals written as RGB. Runs
+    // without the GIL.
+    bool read_exr( const std::string& input_file, std::vector<char>& pixels, int& width, int& height, int& num_channels, int& bits_per_sample,
+                   int max_channels = 0 )
     {
         Imf::InputFile file( input_file.c_str() );
 
         Imath::Box2i dw = file.header().dataWindow();
-        int width       = dw.max.x - dw.min.x + 1;
-        int height      = dw.max.y - dw.min.y + 1;
+        width           = dw.max.x - dw.min.x + 1;
+        height          = dw.max.y - dw.min.y + 1;
 
-        // Check if this is a BW (single channel) EXR
+        // EXR channel lists are sorted by name, put colour and vector channels back in order.
         const Imf::ChannelList& channels = file.header().channels();
-        int num_channels                 = 0;
-        std::string channel_name;
+        bool all_half                    = true;
+        std::vector<std::string> channel_names;
         for( Imf::ChannelList::ConstIterator i = channels.begin(); i != channels.end(); ++i )
         {
-            channel_name = i.name();
-            num_channels++;
+            channel_names.push_back( i.name() );
+            all_half = all_half && i.channel().type == Imf::HALF;
         }
 
-        std::vector<float> pixels;
-
-        if( num_channels == 1 )
+        for( const std::vector<std::string>& order : { std::vector<std::string>{ "R", "G", "B" }, std::vector<std::string>{ "X", "Y", "Z" } } )
         {
-            pixels.reserve( width * height );
+            std::vector<std::string> ordered;
+            for( const std::string& name : order )
+            {
+                if( channels.findChannel( name ) )
+                {
+                    ordered.push_back( name );
+                }
+            }
+            if( ordered.size() >= 2 && ordered.size() == std::min<size_t>( channel_names.size(), 3 ) )
+            {
+                channel_names = ordered;
+                break;
+            }
+        }
 
-            Imf::FrameBuffer frameBuffer;
-            frameBuffer.insert( channel_name.c_str(),
-                                Imf::Slice( Imf::FLOAT, (char*)pixels.data() - dw.min.x * sizeof( float ) - dw.min.y * width * sizeof( float ), sizeof( float ),
-                                            width * sizeof( float ) ) );
+        if( max_channels > 0 && channel_names.size() > static_cast<size_t>( max_channels ) )
+        {
+            channel_names.resize( max_channels );
+        }
 
-            file.setFrameBuffer( frameBuffer );
-            file.readPixels( dw.min.y, dw.max.y );
+        num_channels = static_cast<int>( channel_names.size() );
+        if( num_channels < 1 || num_channels > 3 )
+        {
+            return false;
         }
-        else if( num_channels == 3 )
+
+        const Imf::PixelType pixel_type = all_half ? Imf::HALF : Imf::FLOAT;
+        bits_per_sample                 = all_half ? 16 : 32;
+        const size_t sample_bytes       = bits_per_sample / 8;
+        const size_t x_stride           = sample_bytes * num_channels;
+        const size_t y_stride           = x_stride * width;
+
+        pixels.resize( y_stride * height );
+        char* origin = pixels.data() - dw.min.x * x_stride - dw.min.y * y_stride;
+
+        Imf::FrameBuffer frameBuffer;
+        for( size_t c = 0; c < channel_names.size(); c++ )
         {
-            pixels.reserve( width * height * 3 );
+            frameBuffer.insert( channel_names[c].c_str(), Imf::Slice( pixel_type, origin + c * sample_bytes, x_stride, y_stride ) );
+        }
 
-            Imf::FrameBuffer frameBuffer;
-            frameBuffer.insert( "R", Imf::Slice( Imf::FLOAT, (char*)pixels.data() - dw.min.x * 3 * sizeof( float ) - dw.min.y * width * 3 * sizeof( float ),
-                                                 3 * sizeof( float ), width * 3 * sizeof( float ) ) );
-            frameBuffer.insert( "G",
-                                Imf::Slice( Imf::FLOAT, (char*)( pixels.data() + 1 ) - dw.min.x * 3 * sizeof( float ) - dw.min.y * width * 3 * sizeof( float ),
-                                            3 * sizeof( float ), width * 3 * sizeof( float ) ) );
-            frameBuffer.insert( "B",
-                                Imf::Slice( Imf::FLOAT, (char*)( pixels.data() + 2 ) - dw.min.x * 3 * sizeof( float ) - dw.min.y * width * 3 * sizeof( float ),
-                                            3 * sizeof( float ), width * 3 * sizeof( float ) ) );
+        file.setFrameBuffer( frameBuffer );
+        file.readPixels( dw.min.y, dw.max.y );
 
-            file.setFrameBuffer( frameBuffer );
-            file.readPixels( dw.min.y, dw.max.y );
+        return true;
+    }
+
+    float sample_to_float( const std::vector<char>& pixels, size_t index, int bits_per_sample )
+    {
+        if( bits_per_sample == 16 )
+        {
+            return static_cast<float>( reinterpret_cast<const Imath::half*>( pixels.data() )[index] );
+        }
+        return reinterpret_cast<const float*>( pixels.data() )[index];
+    }
+
+    void store_sample( std::vector<char>& pixels, size_t index, int bits_per_sample, float value )
+    {
+        if( bits_per_sample == 16 )
+        {
+            reinterpret_cast<Imath::half*>( pixels.data() )[index] = Imath::half( value );
         }
         else
+        {
+            reinterpret_cast<float*>( pixels.data() )[index] = value;
+        }
+    }
+
+    // Halves an image with a 2x2 box filter, the next level of a mip chain. An
+    // odd last row or column is folded into the one before it.
+    std::vector<char> downsample( const std::vector<char>& pixels, int width, int height, int channels, int bits_per_sample, int& out_width,
+                                  int& out_height )
+    {
+        out_width  = std::max( 1, width / 2 );
+        out_height = std::max( 1, height / 2 );
+
+        std::vector<char> out( static_cast<size_t>( out_width ) * out_height * channels * bits_per_sample / 8 );
+        for( int y = 0; y < out_height; y++ )
+        {
+            const int y0 = std::min( y * 2, height - 1 );
+            const int y1 = y == out_height - 1 ? height - 1 : y0 + 1;
+            for( int x = 0; x < out_width; x++ )
+            {
+                const int x0 = std::min( x * 2, width - 1 );
+                const int x1 = x == out_width - 1 ? width - 1 : x0 + 1;
+                for( int c = 0; c < channels; c++ )
+                {
+                    float sum   = 0.0f;
+                    int samples = 0;
+                    for( int sy = y0; sy <= y1; sy++ )
+                    {
+                        for( int sx = x0; sx <= x1; sx++ )
+                        {
+                            sum += sample_to_float( pixels, ( static_cast<size_t>( sy ) * width + sx ) * channels + c, bits_per_sample );
+                            samples++;
+                        }
+                    }
+                    store_sample( out, ( static_cast<size_t>( y ) * out_width + x ) * channels + c, bits_per_sample, sum / samples );
+                }
+            }
+        }
+
+        return out;
+    }
+
+    // Hands an encoded payload to Python as a uint8 array owning it, without a copy.
+    py::array_t<uint8_t> payload_array( std::vector<char>&& payload )
+    {
+        auto* buffer = new std::vector<char>( std::move( payload ) );
+        py::capsule owner( buffer, []( void* p ) { delete static_cast<std::vector<char>*>( p ); } );
+        return py::array_t<uint8_t>( static_cast<py::ssize_t>( buffer->size() ), reinterpret_cast<const uint8_t*>( buffer->data() ), owner );
+    }
+
+    // Reads a 1 or 3 channel EXR and encodes it as JXL. Runs without the GIL.
+    bool encode_exr( const std::string& input_file, std::vector<char>& compressed, size_t jxl_threads = 0, const jxl::EncodeSettings& settings = {},
+                     int channels = 0 )
+    {
+        std::vector<char> pixels;
+        int width, height, num_channels, bits_per_sample;
+
+        if( !read_exr( input_file, pixels, width, height, num_channels, bits_per_sample, channels ) )
         {
             return false;
         }
 
+        return jxl::encode_oneshot( width, height, num_channels, pixels.data(), compressed, jxl_threads, settings, bits_per_sample );
+    }
+
+    bool exr_to_jxl( const std::string& input_file, const std::string& output_file, const jxl::EncodeSettings& settings, int channels )
+    {
         std::vector<char> compressed;
 
-        if( !jxl::encode_oneshot( width, height, num_channels, pixels.data(), compressed ) )
+        if( !encode_exr( input_file, compressed, 0, settings, channels ) )
         {
             return false;
         }
@@ -112,6 +221,422 @@ namespace mft
         return true;
     }
 
+    // Returns the encoded JXL as a uint8 array that owns the encoder output, so
+    // the payload is handed to Python without a copy. Returns None on failure.
+    py::object exr_to_jxl_bytes( const std::string& input_file, const jxl::EncodeSettings& settings, int channels )
+    {
+        auto compressed = std::make_unique<std::vector<char>>();
+        bool encoded;
+
+        {
+            py::gil_scoped_release release;
+            encoded = encode_exr( input_file, *compressed, 0, settings, channels );
+        }
+
+        if( !encoded )
+        {
+            return py::none();
+        }
+
+        return payload_array( std::move( *compressed ) );
+    }
+
+    struct ConvertJob
+    {
+        std::string input_file;
+        std::string output_file; // Empty: return the payload instead of writing it
+        jxl::EncodeSettings settings;
+        int channels   = 0; // 0: every channel of the EXR
+        int mip_levels = 0; // Downscaled copies to encode after the full image, each half the size of the last
+
+        std::vector<char> compressed;
+        std::vector<std::vector<char>> mips;
+        int bits_per_sample = 0;
+        bool ok             = false;
+        std::string error;
+
+        // Seconds since the start of the batch
+        int worker          = -1;
+        double read_start   = 0.0;
+        double encode_start = 0.0;
+        double encode_end   = 0.0;
+        double end          = 0.0;
+    };
+
+    // Converts EXR files to JXL on a native thread pool. Each job is a path to
+    // an EXR (payload returned in memory) or an (exr, jxl) pair of paths (payload
+    // written to the jxl path, or returned if it is None), optionally followed
+    // by the EncodeProfile to use, the number of channels to keep and the number
+    // of mip levels to encode. Mip payloads are always returned in memory.
+    py::list convert_batch( const py::list& jobs, size_t threads, size_t jxl_threads )
+    {
+        std::vector<ConvertJob> batch( jobs.size() );
+        for( size_t i = 0; i < jobs.size(); i++ )
+        {
+            py::handle job = jobs[i];
+            if( py::isinstance<py::str>( job ) )
+            {
+                batch[i].input_file = job.cast<std::string>();
+            }
+            else
+            {
+                py::sequence pair    = job.cast<py::sequence>();
+                batch[i].input_file  = pair[0].cast<std::string>();
+                batch[i].output_file = pair[1].is_none() ? std::string() : pair[1].cast<std::string>();
+                if( pair.size() > 2 )
+                {
+                    batch[i].settings = pair[2].cast<jxl::EncodeSettings>();
+                }
+                if( pair.size() > 3 )
+                {
+                    batch[i].channels = pair[3].cast<int>();
+                }
+                if( pair.size() > 4 )
+                {
+                    batch[i].mip_levels = pair[4].cast<int>();
+                }
+            }
+        }
+
+        {
+            py::gil_scoped_release release;
+
+            const size_t hardware_threads = std::max<size_t>( 1, std::thread::hardware_concurrency() );
+            if( threads == 0 )
+            {
+                threads = hardware_threads;
+            }
+            threads = std::max<size_t>( 1, std::min( threads, batch.size() ) );
+
+            // Split the cores between the images converted at the same time.
+            if( jxl_threads == 0 )
+            {
+                jxl_threads = std::max<size_t>( 1, hardware_threads / threads );
+            }
+
+            const auto batch_start = std::chrono::steady_clock::now();
+            auto seconds           = [&]() { return std::chrono::duration<double>( std::chrono::steady_clock::now() - batch_start ).count(); };
+
+            std::atomic<size_t> next_job{ 0 };
+            auto work = [&]( int worker )
+            {
+                for( size_t i = next_job++; i < batch.size(); i = next_job++ )
+                {
+                    ConvertJob& job = batch[i];
+                    job.worker      = worker;
+                    job.read_start  = seconds();
+
+                    try
+                    {
+                        std::vector<char> pixels;
+                        int width, height, num_channels;
+
+                        if( !read_exr( job.input_file, pixels, width, height, num_channels, job.bits_per_sample, job.channels ) )
+                        {
+                            job.error = "Unsupported number of channels";
+                        }
+                        else
+                        {
+                            job.encode_start = seconds();
+                            if( !jxl::encode_oneshot( width, height, num_channels, pixels.data(), job.compressed, jxl_threads, job.settings,
+                                                         job.bits_per_sample ) )
+                            {
+                                job.error = "JXL encoding failed";
+                            }
+                            else
+                            {
+                                std::vector<char> level = std::move( pixels );
+                                int level_width = width, level_height = height;
+                                for( int mip = 0; mip < job.mip_levels && job.error.empty(); mip++ )
+                                {
+                                    level = downsample( level, level_width, level_height, num_channels, job.bits_per_sample, level_width, level_height );
+                                    job.mips.emplace_back();
+                                    if( !jxl::encode_oneshot( level_width, level_height, num_channels, level.data(), job.mips.back(), jxl_threads,
+                                                              job.settings, job.bits_per_sample ) )
+                                    {
+                                        job.error = "JXL encoding of mip " + std::to_string( mip + 1 ) + " failed";
+                                    }
+                                }
+
+                                job.encode_end = seconds();
+                                if( job.error.empty() && !job.output_file.empty() && !write_binary( job.output_file, job.compressed ) )
+                                {
+                                    job.error = "Could not write " + job.output_file;
+                                }
+                                job.ok = job.error.empty();
+                            }
+                        }
+                    }
+                    catch( const std::exception& e )
+                    {
+                        job.error = e.what();
+                    }
+
+                    job.end = seconds();
+                }
+            };
+
+            std::vector<std::thread> pool;
+            for( size_t worker = 1; worker < threads; worker++ )
+            {
+                pool.emplace_back( work, static_cast<int>( worker ) );
+            }
+            work( 0 );
+            for( std::thread& thread : pool )
+            {
+                thread.join();
+            }
+        }
+
+        py::list results;
+        for( ConvertJob& job : batch )
+        {
+            py::dict result;
+            result["ok"]              = job.ok;
+            result["error"]           = job.error;
+            result["size"]            = job.compressed.size();
+            result["bits_per_sample"] = job.bits_per_sample;
+            result["worker"]          = job.worker;
+            result["read_start"]      = job.read_start;
+            result["encode_start"]    = job.encode_start;
+            result["encode_end"]      = job.encode_end;
+            result["end"]             = job.end;
+
+            if( job.ok && job.output_file.empty() )
+            {
+                result["data"] = payload_array( std::move( job.compressed ) );
+            }
+            else
+            {
+                result["data"] = py::none();
+            }
+
+            py::list mips;
+            if( job.ok )
+            {
+                for( std::vector<char>& mip : job.mips )
+                {
+                    mips.append( payload_array( std::move( mip ) ) );
+                }
+            }
+            result["mips"] = mips;
+
+            results.append( result );
+        }
+
+        return results;
+    }
+
+    // Encodes an EXR with the given settings and decodes it again, repeats times,
+    // to compare encode profiles. Timings are the fastest of the repeats.
+    py::dict benchmark_jxl( const std::string& input_file, const jxl::EncodeSettings& settings, int repeats, int channels )
+    {
+        std::vector<char> pixels;
+        int width = 0, height = 0, num_channels = 0, bits_per_sample = 0;
+        std::vector<char> compressed;
+        std::vector<char> decoded;
+        double encode_seconds = 0.0, decode_seconds = 0.0, max_error = 0.0;
+        bool ok;
+
+        {
+            py::gil_scoped_release release;
+
+            ok = read_exr( input_file, pixels, width, height, num_channels, bits_per_sample, channels );
+            decoded.resize( pixels.size() );
+
+            using clock = std::chrono::steady_clock;
+            for( int i = 0; ok && i < std::max( 1, repeats ); i++ )
+            {
+                const auto encode_start = clock::now();
+                compressed.clear();
+                ok = jxl::encode_oneshot( width, height, num_channels, pixels.data(), compressed, 0, settings, bits_per_sample );
+                const auto decode_start = clock::now();
+                ok = ok && jxl::decode_jxl( compressed.data(), compressed.size(), decoded.data(), decoded.size(), bits_per_sample );
+                const auto decode_end = clock::now();
+
+                const double encode = std::chrono::duration<double>( decode_start - encode_start ).count();
+                const double decode = std::chrono::duration<double>( decode_end - decode_start ).count();
+                encode_seconds      = i == 0 ? encode : std::min( encode_seconds, encode );
+                decode_seconds      = i == 0 ? decode : std::min( decode_seconds, decode );
+            }
+
+            const size_t num_samples = static_cast<size_t>( width ) * height * num_channels;
+            for( size_t i = 0; ok && i < num_samples; i++ )
+            {
+                const float error = sample_to_float( decoded, i, bits_per_sample ) - sample_to_float( pixels, i, bits_per_sample );
+                max_error         = std::max( max_error, static_cast<double>( std::abs( error ) ) );
+            }
+        }
+
+        py::dict result;
+        result["ok"]              = ok;
+        result["width"]           = width;
+        result["height"]          = height;
+        result["channels"]        = num_channels;
+        result["bits_per_sample"] = bits_per_sample;
+        result["raw_size"]        = pixels.size();
+        result["size"]            = compressed.size();
+        result["encode_seconds"]  = encode_seconds;
+        result["decode_seconds"]  = decode_seconds;
+        result["max_error"]       = max_error;
+        return result;
+    }
+
+    // Contiguous bytes of a buffer-protocol object, e.g. a memoryview of a mapped .mflevel.
+    py::buffer_info request_bytes( const py::buffer& buffer )
+    {
+        py::buffer_info info = buffer.request();
+        if( info.ndim > 1 || ( info.ndim == 1 && info.strides[0] != info.itemsize ) )
+        {
+            throw py::value_error( "Expected a contiguous bytes-like object" );
+        }
+        return info;
+    }
+
+    using FloatImage = py::array_t<float, py::array::c_style>;
+
+    // out if it can hold the decoded image, or a new array if out is None.
+    FloatImage output_image( const py::object& out, const jxl::ImageInfo& info )
+    {
+        const std::vector<py::ssize_t> shape{ info.height, info.width, info.channels };
+        if( out.is_none() )
+        {
+            return FloatImage( shape );
+        }
+
+        if( !FloatImage::check_( out ) )
+        {
+            throw py::type_error( "out must be a C-contiguous float32 array" );
+        }
+        auto image = py::reinterpret_borrow<FloatImage>( out );
+        if( !image.writeable() )
+        {
+            throw py::value_error( "out is read-only" );
+        }
+        if( image.ndim() != 3 || image.shape( 0 ) != shape[0] || image.shape( 1 ) != shape[1] || image.shape( 2 ) != shape[2] )
+        {
+            throw py::value_error( "out must have shape (" + std::to_string( info.height ) + ", " + std::to_string( info.width ) + ", " +
+                                   std::to_string( info.channels ) + ")" );
+        }
+        return image;
+    }
+
+    FloatImage decode_jxl_array( const py::buffer& buffer, const py::object& out )
+    {
+        const py::buffer_info input = request_bytes( buffer );
+        const size_t input_bytes    = static_cast<size_t>( input.size * input.itemsize );
+
+        jxl::ImageInfo info;
+        bool ok;
+        {
+            py::gil_scoped_release release;
+            ok = jxl::read_info( input.ptr, input_bytes, info );
+        }
+        if( !ok )
+        {
+            throw py::value_error( "Not a JXL image" );
+        }
+
+        FloatImage image = output_image( out, info );
+        void* pixels     = image.mutable_data();
+        {
+            py::gil_scoped_release release;
+            ok = jxl::decode_jxl( input.ptr, input_bytes, pixels, static_cast<size_t>( image.nbytes() ) );
+        }
+        if( !ok )
+        {
+            throw py::value_error( "JXL decoding failed" );
+        }
+
+        return image;
+    }
+
+    // Decodes many JXL payloads on a native thread pool. Payloads that fail to
+    // decode give None, invalid arguments raise before anything is decoded.
+    py::list decode_jxl_batch( const py::sequence& buffers, const py::object& outs, size_t threads )
+    {
+        const size_t count = buffers.size();
+        if( !outs.is_none() && py::len( outs ) != count )
+        {
+            throw py::value_error( "outs must have one array per buffer" );
+        }
+
+        std::vector<py::buffer_info> inputs;
+        inputs.reserve( count );
+        for( size_t i = 0; i < count; i++ )
+        {
+            inputs.push_back( request_bytes( buffers[i].cast<py::buffer>() ) );
+        }
+
+        std::vector<jxl::ImageInfo> infos( count );
+        std::vector<char> ok( count, 0 );
+        {
+            py::gil_scoped_release release;
+            for( size_t i = 0; i < count; i++ )
+            {
+                ok[i] = jxl::read_info( inputs[i].ptr, static_cast<size_t>( inputs[i].size * inputs[i].itemsize ), infos[i] );
+            }
+        }
+
+        std::vector<FloatImage> images( count );
+        std::vector<void*> pixels( count, nullptr );
+        std::vector<size_t> pixel_bytes( count, 0 );
+        for( size_t i = 0; i < count; i++ )
+        {
+            if( ok[i] )
+            {
+                images[i]      = output_image( outs.is_none() ? py::none() : py::object( outs[py::int_( i )] ), infos[i] );
+                pixels[i]      = images[i].mutable_data();
+                pixel_bytes[i] = static_cast<size_t>( images[i].nbytes() );
+            }
+        }
+
+        {
+            py::gil_scoped_release release;
+
+            const size_t hardware_threads = std::max<size_t>( 1, std::thread::hardware_concurrency() );
+            if( threads == 0 )
+            {
+                threads = hardware_threads;
+            }
+            threads = std::max<size_t>( 1, std::min( threads, count ) );
+
+            // Split the cores between the images decoded at the same time.
+            const size_t jxl_threads = std::max<size_t>( 1, hardware_threads / threads );
+
+            std::atomic<size_t> next_image{ 0 };
+            auto work = [&]()
+            {
+                for( size_t i = next_image++; i < count; i = next_image++ )
+                {
+                    if( ok[i] )
+                    {
+                        ok[i] = jxl::decode_jxl( inputs[i].ptr, static_cast<size_t>( inputs[i].size * inputs[i].itemsize ), pixels[i],
+                                                 pixel_bytes[i], 32, jxl_threads );
+                    }
+                }
+            };
+
+            std::vector<std::thread> pool;
+            for( size_t worker = 1; worker < threads; worker++ )
+            {
+                pool.emplace_back( work );
+            }
+            work();
+            for( std::thread& thread : pool )
+            {
+                thread.join();
+            }
+        }
+
+        py::list results;
+        for( size_t i = 0; i < count; i++ )
+        {
+            results.append( ok[i] ? py::object( images[i] ) : py::none() );
+        }
+        return results;
+    }
+
 #define STRINGIFY( x ) #x
 #define MACRO_STRINGIFY( x ) STRINGIFY( x )
 
@@ -127,18 +652,108 @@ namespace mft
             :toctree: _generate
 
             save_jxl
+            exr_to_jxl
+            exr_to_jxl_bytes
+            convert_batch
+            benchmark_jxl
+            decode_jxl
+            decode_jxl_batch
+            EncodeProfile
         )pbdoc";
 
+        py::class_<jxl::EncodeSettings>( m, "EncodeProfile", R"pbdoc(
+            JXL encoder settings of one image type
+
+            lossless keeps the exact float values, otherwise distance sets the
+            allowed error (1.0 = visually lossless). effort trades encode time
+            for size, 1 (fastest) to 9 (smallest).
+        )pbdoc" )
+            .def( py::init(
+                      []( bool lossless, float distance, int effort )
+                      {
+                          return jxl::EncodeSettings{ lossless, distance, effort };
+                      } ),
+                  py::arg( "lossless" ) = false, py::arg( "distance" ) = 1.0f, py::arg( "effort" ) = 7 )
+            .def_readwrite( "lossless", &jxl::EncodeSettings::lossless )
+            .def_readwrite( "distance", &jxl::EncodeSettings::distance )
+            .def_readwrite( "effort", &jxl::EncodeSettings::effort )
+            .def( "__repr__",
+                  []( const jxl::EncodeSettings& settings )
+                  {
+                      std::ostringstream repr;
+                      repr << "EncodeProfile(lossless=" << ( settings.lossless ? "True" : "False" ) << ", distance=" << settings.distance
+                           << ", effort=" << settings.effort << ")";
+                      return repr.str();
+                  } );
+
         m.def( "save_jxl", &save_jxl, pybind11::call_guard<pybind11::gil_scoped_release>(), R"pbdoc(
             Save np array to jxl
 
             saves a an np array as a jxl image
         )pbdoc" );
 
-        m.def( "exr_to_jxl", &exr_to_jxl, pybind11::call_guard<pybind11::gil_scoped_release>(), R"pbdoc(
+        m.def( "exr_to_jxl", &exr_to_jxl, py::arg( "input_file" ), py::arg( "output_file" ), py::arg( "profile" ) = jxl::EncodeSettings(),
+               py::arg( "channels" ) = 0, pybind11::call_guard<pybind11::gil_scoped_release>(), R"pbdoc(
             Convert EXR to JXL
 
-            Converts an OpenEXR file to JPEG XL format
+            Converts an OpenEXR file to JPEG XL format, keeping only the first
+            channels channels if given (e.g. 2 for octahedral normals)
+        )pbdoc" );
+
+        m.def( "exr_to_jxl_bytes", &exr_to_jxl_bytes, py::arg( "input_file" ), py::arg( "profile" ) = jxl::EncodeSettings(), py::arg( "channels" ) = 0,
+               R"pbdoc(
+            Convert EXR to JXL in memory
+
+            Encodes an OpenEXR file as JPEG XL and returns the payload as a uint8
+            array (buffer protocol, no copy), or None if the EXR is not supported.
+            The GIL is released while reading and encoding.
+        )pbdoc" );
+
+        m.def( "convert_batch", &convert_batch, py::arg( "jobs" ), py::arg( "threads" ) = 0, py::arg( "jxl_threads" ) = 0, R"pbdoc(
+            Convert EXRs to JXL on a native thread pool
+
+            Each job is an EXR path, whose payload is returned in memory, or an
+            (exr, jxl) pair of paths; a jxl path of None also returns the payload.
+            An EncodeProfile, the number of channels to keep and the number of
+            mip levels can follow as third, fourth and fifth elements; each mip
+            level halves the previous one with a box filter.
+            threads images are converted at once (0 = one per core), each with a
+            libjxl parallel runner of jxl_threads threads (0 = split the cores
+            between them). Half-float EXRs are encoded as half floats. Returns one
+            dict per job with ok, error, size, bits_per_sample, data, mips (the
+            mip payloads, largest first), the worker index and
+            read_start/encode_start/encode_end/end times in seconds since the
+            start of the batch.
+        )pbdoc" );
+
+        m.def( "benchmark_jxl", &benchmark_jxl, py::arg( "input_file" ), py::arg( "profile" ) = jxl::EncodeSettings(), py::arg( "repeats" ) = 3,
+               py::arg( "channels" ) = 0, R"pbdoc(
+            Measure an encode profile on an EXR
+
+            Encodes and decodes the EXR repeats times and returns a dict with
+            ok, width, height, channels, bits_per_sample, raw_size, size, the fastest
+            encode_seconds and decode_seconds, and the max_error of the decoded
+            pixels.
+        )pbdoc" );
+
+        m.def( "decode_jxl", &decode_jxl_array, py::arg( "buffer" ), py::arg( "out" ) = py::none(), R"pbdoc(
+            Decode a JXL payload into a float32 array
+
+            buffer is any contiguous bytes-like object, e.g. a memoryview slice
+            of a mapped .mflevel. Returns an array of shape (height, width,
+            channels); half-float images are widened to float32. If out is given
+            it must be a writable C-contiguous float32 array of that shape and is
+            filled and returned instead of allocating. The GIL is released while
+            decoding. Raises ValueError if the payload cannot be decoded.
+        )pbdoc" );
+
+        m.def( "decode_jxl_batch", &decode_jxl_batch, py::arg( "buffers" ), py::arg( "outs" ) = py::none(), py::arg( "threads" ) = 0,
+               R"pbdoc(
+            Decode many JXL payloads on a native thread pool
+
+            Decodes every buffer like decode_jxl, threads at once (0 = one per
+            core), into the matching array of outs if given. Returns a list with
+            one array per buffer, or None where a payload could not be decoded.
         )pbdoc" );
 
 #ifdef VERSION_INFO
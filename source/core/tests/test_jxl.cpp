@@ -35,6 +35,20 @@ TEST( JxlEncode, UniformImageCompressesWell )
     EXPECT_LT( compressed.size(), W * H * sizeof( float ) );
 }
 
+TEST( JxlEncode, ThreadCountDoesNotChangeOutput )
+{
+    // The parallel runner only schedules work, the codestream must be identical
+    constexpr uint32_t W = 64, H = 64;
+    std::vector<float> pixels( W * H * 3 );
+    for( size_t i = 0; i < pixels.size(); ++i )
+        pixels[i] = static_cast<float>( i % 97 ) / 97.0f;
+
+    std::vector<char> single, multi;
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 3, pixels.data(), single, 1 ) );
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 3, pixels.data(), multi, 4 ) );
+    EXPECT_EQ( single, multi );
+}
+
 // ---- decode ----------------------------------------------------------------
 
 TEST( JxlDecode, InvalidDataReturnsFalse )
@@ -45,6 +59,27 @@ TEST( JxlDecode, InvalidDataReturnsFalse )
                                         out.data(), out.size() * sizeof( float ) ) );
 }
 
+TEST( JxlDecode, ReadInfo )
+{
+    constexpr uint32_t W = 12, H = 5;
+    std::vector<float> pixels( W * H * 2, 0.5f );
+    std::vector<char>  compressed;
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 2, pixels.data(), compressed ) );
+
+    mft::jxl::ImageInfo info;
+    ASSERT_TRUE( mft::jxl::read_info( compressed.data(), compressed.size(), info ) );
+    EXPECT_EQ( info.width, W );
+    EXPECT_EQ( info.height, H );
+    EXPECT_EQ( info.channels, 2u );
+}
+
+TEST( JxlDecode, ReadInfoInvalidDataReturnsFalse )
+{
+    std::vector<char>   garbage = { 'J', 'U', 'N', 'K', 0, 0, 0, 0 };
+    mft::jxl::ImageInfo info;
+    EXPECT_FALSE( mft::jxl::read_info( garbage.data(), garbage.size(), info ) );
+}
+
 // ---- round-trip ------------------------------------------------------------
 
 TEST( JxlRoundTrip, SingleChannel )
@@ -81,3 +116,66 @@ TEST( JxlRoundTrip, ThreeChannel )
     for( size_t i = 0; i < decoded.size(); ++i )
         EXPECT_NEAR( decoded[i], original[i], 1e-2f ) << "mismatch at component " << i;
 }
+
+TEST( JxlRoundTrip, LosslessIsExact )
+{
+    constexpr uint32_t W = 16, H = 16;
+    std::vector<float> original( W * H );
+    for( size_t i = 0; i < original.size(); ++i )
+        original[i] = 1.0f / static_cast<float>( i + 1 ) + 123.456f * static_cast<float>( i % 7 );
+
+    mft::jxl::EncodeSettings settings;
+    settings.lossless = true;
+
+    std::vector<char> compressed;
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 1, original.data(), compressed, 0, settings ) );
+
+    std::vector<float> decoded( W * H );
+    ASSERT_TRUE( mft::jxl::decode_jxl( compressed.data(), compressed.size(),
+                                        decoded.data(), decoded.size() * sizeof( float ) ) );
+
+    for( size_t i = 0; i < decoded.size(); ++i )
+        EXPECT_EQ( decoded[i], original[i] ) << "mismatch at pixel " << i;
+}
+
+TEST( JxlRoundTrip, HalfFloatLossless )
+{
+    constexpr uint32_t W = 8, H = 8;
+    // Half-float bit patterns: 0.0, 0.5, 1.0, 2.0 and 65504 (largest finite half)
+    const uint16_t values[] = { 0x0000, 0x3800, 0x3C00, 0x4000, 0x7BFF };
+    std::vector<uint16_t> original( W * H * 3 );
+    for( size_t i = 0; i < original.size(); ++i )
+        original[i] = values[i % 5];
+
+    mft::jxl::EncodeSettings settings;
+    settings.lossless = true;
+
+    std::vector<char> compressed;
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 3, original.data(), compressed, 0, settings, 16 ) );
+
+    std::vector<uint16_t> decoded( W * H * 3 );
+    ASSERT_TRUE( mft::jxl::decode_jxl( compressed.data(), compressed.size(),
+                                        decoded.data(), decoded.size() * sizeof( uint16_t ), 16 ) );
+
+    for( size_t i = 0; i < decoded.size(); ++i )
+        EXPECT_EQ( decoded[i], original[i] ) << "mismatch at component " << i;
+}
+
+TEST( JxlRoundTrip, TwoChannel )
+{
+    constexpr uint32_t W = 8, H = 8;
+    // Octahedral normals only carry two meaningful channels
+    std::vector<float> original( W * H * 2 );
+    for( size_t i = 0; i < original.size(); ++i )
+        original[i] = ( i % 2 == 0 ) ? 0.25f : 0.75f;
+
+    std::vector<char> compressed;
+    ASSERT_TRUE( mft::jxl::encode_oneshot( W, H, 2, original.data(), compressed ) );
+
+    std::vector<float> decoded( W * H * 2 );
+    ASSERT_TRUE( mft::jxl::decode_jxl( compressed.data(), compressed.size(),
+                                        decoded.data(), decoded.size() * sizeof( float ) ) );
+
+    for( size_t i = 0; i < decoded.size(); ++i )
+        EXPECT_NEAR( decoded[i], original[i], 1e-2f ) << "mismatch at component " << i;
+}
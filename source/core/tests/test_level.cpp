@@ -0,0 +1,124 @@
+#include <gtest/gtest.h>
+
+#include <vector>
+
+#include "mf_level.h"
+
+using namespace mft;
+
+// Two unit quads, one per view: view 1 at height 0 over x in [0, 1], view 2 at
+// height 1 over x in [2, 3]. with_bvh adds a root over one leaf per quad,
+// wide_indices stores the triangles in navmesh_tris32.
+static Level make_level( bool with_bvh, bool wide_indices = false )
+{
+    flatbuffers::FlatBufferBuilder builder;
+
+    std::vector<data::Vec3> verts = {
+        { 0, 0, 0 }, { 1, 0, 0 }, { 1, 1, 0 }, { 0, 1, 0 },
+        { 2, 0, 1 }, { 3, 0, 1 }, { 3, 1, 1 }, { 2, 1, 1 },
+    };
+    std::vector<data::Triangle> tris = {
+        { 0, 1, 2, 1, 0 },
+        { 0, 2, 3, 1, 0 },
+        { 4, 5, 6, 2, 0 },
+        { 4, 6, 7, 2, 0 },
+    };
+    std::vector<data::BvhNode> bvh = {
+        { data::Vec3( 0, 0, 0 ), data::Vec3( 3, 1, 1 ), 1, 0 },
+        { data::Vec3( 0, 0, 0 ), data::Vec3( 1, 1, 0 ), 0, 2 },
+        { data::Vec3( 2, 0, 1 ), data::Vec3( 3, 1, 1 ), 2, 2 },
+    };
+
+    std::vector<data::Triangle32> tris32;
+    for( const auto& tri : tris )
+        tris32.emplace_back( tri.vert1(), tri.vert2(), tri.vert3(), tri.view_id(), tri.material_id() );
+
+    auto navmesh_verts  = builder.CreateVectorOfStructs( verts );
+    auto navmesh_tris   = builder.CreateVectorOfStructs( wide_indices ? std::vector<data::Triangle>() : tris );
+    auto navmesh_tris32 = builder.CreateVectorOfStructs( wide_indices ? tris32 : std::vector<data::Triangle32>() );
+    flatbuffers::Offset<flatbuffers::Vector<const data::BvhNode*>> navmesh_bvh;
+    if( with_bvh )
+        navmesh_bvh = builder.CreateVectorOfStructs( bvh );
+
+    data::LevelBuilder level_builder( builder );
+    level_builder.add_navmesh_verts( navmesh_verts );
+    level_builder.add_navmesh_tris( navmesh_tris );
+    level_builder.add_navmesh_bvh( navmesh_bvh );
+    level_builder.add_navmesh_tris32( navmesh_tris32 );
+    builder.Finish( level_builder.Finish(), data::LevelIdentifier() );
+
+    Level level;
+    const char* buffer = reinterpret_cast<const char*>( builder.GetBufferPointer() );
+    level.flatbuffer_data.assign( buffer, buffer + builder.GetSize() );
+    return level;
+}
+
+// ---- get_view_id_from_position ---------------------------------------------
+
+TEST( NavmeshQuery, ViewIdOnTriangle )
+{
+    Level level = make_level( true );
+    EXPECT_EQ( get_view_id_from_position( level, 0.5f, 0.5f, 0.0f ), 1 );
+    EXPECT_EQ( get_view_id_from_position( level, 2.5f, 0.5f, 1.0f ), 2 );
+}
+
+TEST( NavmeshQuery, ViewIdWithBvhMatchesScan )
+{
+    Level with_bvh    = make_level( true );
+    Level without_bvh = make_level( false );
+
+    // Heights chosen so that no sample is equally far from both quads.
+    for( float x = -1.0f; x <= 4.0f; x += 0.25f )
+    {
+        for( float z = -0.9f; z <= 2.0f; z += 0.6f )
+        {
+            EXPECT_EQ( get_view_id_from_position( with_bvh, x, 0.5f, z ), get_view_id_from_position( without_bvh, x, 0.5f, z ) )
+                << "at x=" << x << " z=" << z;
+        }
+    }
+}
+
+// ---- get_navmesh_height ----------------------------------------------------
+
+TEST( NavmeshQuery, HeightUnderPoint )
+{
+    for( bool with_bvh : { true, false } )
+    {
+        Level level = make_level( with_bvh );
+        float height{};
+        ASSERT_TRUE( get_navmesh_height( level, 0.25f, 0.75f, 5.0f, height ) );
+        EXPECT_FLOAT_EQ( height, 0.0f );
+        ASSERT_TRUE( get_navmesh_height( level, 2.5f, 0.5f, -5.0f, height ) );
+        EXPECT_FLOAT_EQ( height, 1.0f );
+    }
+}
+
+TEST( NavmeshQuery, HeightOutsideNavmeshReturnsFalse )
+{
+    for( bool with_bvh : { true, false } )
+    {
+        Level level = make_level( with_bvh );
+        float height{};
+        EXPECT_FALSE( get_navmesh_height( level, 1.5f, 0.5f, 0.0f, height ) );
+        EXPECT_FALSE( get_navmesh_height( level, 0.5f, 2.0f, 0.0f, height ) );
+    }
+}
+
+// ---- navmesh_tris32 --------------------------------------------------------
+
+TEST( NavmeshQuery, WideIndicesMatchCompact )
+{
+    Level compact = make_level( true );
+    Level wide    = make_level( true, true );
+
+    ASSERT_EQ( get_navmesh_num_tris( wide ), 4 );
+    for( int i = 0; i < get_navmesh_num_tris( wide ); ++i )
+        EXPECT_EQ( get_navmesh_tri_verts( wide, i ), get_navmesh_tri_verts( compact, i ) );
+
+    EXPECT_EQ( get_view_id_from_position( wide, 0.5f, 0.5f, 0.0f ), 1 );
+    EXPECT_EQ( get_view_id_from_position( wide, 2.5f, 0.5f, 1.0f ), 2 );
+
+    float height{};
+    ASSERT_TRUE( get_navmesh_height( wide, 2.5f, 0.5f, 0.0f, height ) );
+    EXPECT_FLOAT_EQ( height, 1.0f );
+}
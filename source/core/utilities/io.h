@@ -19,6 +19,10 @@ namespace mft
     //   [4..N+3]  FlatBuffer bytes — "MFLV" file_identifier at bytes [8..11]
     //   [N+4..]   Image blob (JXL files concatenated; offsets stored in FlatBuffer)
     //
+    // The FlatBuffer section may end in zero padding: the exporter reserves it
+    // before streaming the blob and fills it in last. Readers only rely on the
+    // size prefix to find the blob and on the root offset to find the Level.
+    //
     // Schema evolution is handled by FlatBuffers vtables: fields absent in an
     // older file simply return their default values (null / 0) in new readers.
     // -------------------------------------------------------------------------
@@ -11,10 +11,11 @@
 namespace mft::jxl
 {
 
-    bool encode_oneshot( uint32_t xsize, uint32_t ysize, uint32_t channels, const void* pixels, std::vector<char>& compressed )
+    bool encode_oneshot( uint32_t xsize, uint32_t ysize, uint32_t channels, const void* pixels, std::vector<char>& compressed, size_t num_threads,
+                         const EncodeSettings& settings, uint32_t bits_per_sample )
     {
         auto enc    = JxlEncoderMake( nullptr );
-        auto runner = JxlThreadParallelRunnerMake( nullptr, JxlThreadParallelRunnerDefaultNumWorkerThreads() );
+        auto runner = JxlThreadParallelRunnerMake( nullptr, num_threads > 0 ? num_threads : JxlThreadParallelRunnerDefaultNumWorkerThreads() );
 
         if( JXL_ENC_SUCCESS != JxlEncoderSetParallelRunner( enc.get(), JxlThreadParallelRunner, runner.get() ) )
         {
@@ -22,18 +23,28 @@ namespace mft::jxl
             return false;
         }
 
-        assert( channels == 1 || channels == 3 );
+        assert( channels >= 1 && channels <= 3 );
+        assert( bits_per_sample == 16 || bits_per_sample == 32 );
 
-        JxlPixelFormat pixelFormat = { channels, JXL_TYPE_FLOAT, JXL_NATIVE_ENDIAN, 0 };
+        const bool half            = bits_per_sample == 16;
+        JxlPixelFormat pixelFormat = { channels, half ? JXL_TYPE_FLOAT16 : JXL_TYPE_FLOAT, JXL_NATIVE_ENDIAN, 0 };
 
         JxlBasicInfo basicInfo;
         JxlEncoderInitBasicInfo( &basicInfo );
         basicInfo.xsize                    = xsize;
         basicInfo.ysize                    = ysize;
-        basicInfo.bits_per_sample          = 32;
-        basicInfo.exponent_bits_per_sample = 8;
-        basicInfo.uses_original_profile    = JXL_FALSE;
-        basicInfo.num_color_channels       = channels;
+        basicInfo.bits_per_sample          = half ? 16 : 32;
+        basicInfo.exponent_bits_per_sample = half ? 5 : 8;
+        basicInfo.uses_original_profile    = settings.lossless ? JXL_TRUE : JXL_FALSE;
+        basicInfo.num_color_channels       = channels == 3 ? 3 : 1;
+        if( channels == 2 )
+        {
+            // The second channel is stored as alpha, the only extra channel loaders decode by default.
+            basicInfo.num_extra_channels  = 1;
+            basicInfo.alpha_bits          = basicInfo.bits_per_sample;
+            basicInfo.alpha_exponent_bits = basicInfo.exponent_bits_per_sample;
+            basicInfo.alpha_premultiplied = JXL_FALSE;
+        }
         if( JXL_ENC_SUCCESS != JxlEncoderSetBasicInfo( enc.get(), &basicInfo ) )
         {
             fprintf( stderr, "JxlEncoderSetBasicInfo failed\n" );
@@ -50,7 +61,37 @@ namespace mft::jxl
 
         JxlEncoderFrameSettings* frameSettings = JxlEncoderFrameSettingsCreate( enc.get(), nullptr );
 
-        if( JXL_ENC_SUCCESS != JxlEncoderAddImageFrame( frameSettings, &pixelFormat, pixels, sizeof( float ) * xsize * ysize * channels ) )
+        if( JXL_ENC_SUCCESS != JxlEncoderFrameSettingsSetOption( frameSettings, JXL_ENC_FRAME_SETTING_EFFORT, settings.effort ) )
+        {
+            fprintf( stderr, "JxlEncoderFrameSettingsSetOption effort %d failed\n", settings.effort );
+            return false;
+        }
+
+        if( settings.lossless )
+        {
+            if( JXL_ENC_SUCCESS != JxlEncoderSetFrameLossless( frameSettings, JXL_TRUE ) )
+            {
+                fprintf( stderr, "JxlEncoderSetFrameLossless failed\n" );
+                return false;
+            }
+        }
+        else
+        {
+            if( JXL_ENC_SUCCESS != JxlEncoderSetFrameDistance( frameSettings, settings.distance ) )
+            {
+                fprintf( stderr, "JxlEncoderSetFrameDistance %f failed\n", settings.distance );
+                return false;
+            }
+
+            // Alpha is lossless by default, give the second channel the same error budget as the first.
+            if( channels == 2 && JXL_ENC_SUCCESS != JxlEncoderSetExtraChannelDistance( frameSettings, 0, settings.distance ) )
+            {
+                fprintf( stderr, "JxlEncoderSetExtraChannelDistance %f failed\n", settings.distance );
+                return false;
+            }
+        }
+
+        if( JXL_ENC_SUCCESS != JxlEncoderAddImageFrame( frameSettings, &pixelFormat, pixels, static_cast<size_t>( bits_per_sample / 8 ) * xsize * ysize * channels ) )
         {
             fprintf( stderr, "JxlEncoderAddImageFrame failed\n" );
             return false;
@@ -84,7 +125,8 @@ namespace mft::jxl
         return true;
     }
 
-    bool decode_jxl( const void* compressed, size_t compressed_size, void* out_pixels, size_t out_pixel_bytes )
+    bool decode_jxl( const void* compressed, size_t compressed_size, void* out_pixels, size_t out_pixel_bytes, uint32_t bits_per_sample,
+                     size_t num_threads )
     {
         auto runner = JxlResizableParallelRunnerMake( nullptr );
         auto dec    = JxlDecoderMake( nullptr );
@@ -126,7 +168,8 @@ namespace mft::jxl
                     fprintf( stderr, "JxlDecoderGetBasicInfo failed\n" );
                     return false;
                 }
-                JxlResizableParallelRunnerSetThreads( runner.get(), JxlResizableParallelRunnerSuggestThreads( info.xsize, info.ysize ) );
+                JxlResizableParallelRunnerSetThreads( runner.get(), num_threads > 0 ? num_threads
+                                                                                    : JxlResizableParallelRunnerSuggestThreads( info.xsize, info.ysize ) );
             }
             else if( status == JXL_DEC_COLOR_ENCODING )
             {
@@ -145,7 +188,8 @@ namespace mft::jxl
             }
             else if( status == JXL_DEC_NEED_IMAGE_OUT_BUFFER )
             {
-                JxlPixelFormat format = { info.num_color_channels, JXL_TYPE_FLOAT, JXL_NATIVE_ENDIAN, 0 };
+                const uint32_t num_channels = info.num_color_channels + ( info.alpha_bits > 0 ? 1 : 0 );
+                JxlPixelFormat format       = { num_channels, bits_per_sample == 16 ? JXL_TYPE_FLOAT16 : JXL_TYPE_FLOAT, JXL_NATIVE_ENDIAN, 0 };
                 if( JXL_DEC_SUCCESS != JxlDecoderSetImageOutBuffer( dec.get(), &format, out_pixels, out_pixel_bytes ) )
                 {
                     fprintf( stderr, "JxlDecoderSetImageOutBuffer failed\n" );
@@ -168,4 +212,35 @@ namespace mft::jxl
         }
     }
 
+    bool read_info( const void* compressed, size_t compressed_size, ImageInfo& info )
+    {
+        auto dec = JxlDecoderMake( nullptr );
+
+        if( JXL_DEC_SUCCESS != JxlDecoderSubscribeEvents( dec.get(), JXL_DEC_BASIC_INFO ) )
+        {
+            fprintf( stderr, "JxlDecoderSubscribeEvents failed\n" );
+            return false;
+        }
+
+        JxlDecoderSetInput( dec.get(), static_cast<const uint8_t*>( compressed ), compressed_size );
+        JxlDecoderCloseInput( dec.get() );
+
+        if( JXL_DEC_BASIC_INFO != JxlDecoderProcessInput( dec.get() ) )
+        {
+            return false;
+        }
+
+        JxlBasicInfo basic_info;
+        if( JXL_DEC_SUCCESS != JxlDecoderGetBasicInfo( dec.get(), &basic_info ) )
+        {
+            fprintf( stderr, "JxlDecoderGetBasicInfo failed\n" );
+            return false;
+        }
+
+        info.width    = basic_info.xsize;
+        info.height   = basic_info.ysize;
+        info.channels = basic_info.num_color_channels + ( basic_info.alpha_bits > 0 ? 1 : 0 );
+        return true;
+    }
+
 } // namespace mft::jxl
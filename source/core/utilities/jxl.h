@@ -7,12 +7,36 @@
 namespace mft::jxl
 {
 
-    bool encode_oneshot( uint32_t xsize, uint32_t ysize, uint32_t channels, const void* pixels, std::vector<char>& compressed );
+    struct EncodeSettings
+    {
+        bool lossless  = false;
+        float distance = 1.0f; // Butteraugli distance of lossy encoding, 0.0 to 25.0 (1.0 = visually lossless)
+        int effort     = 7;    // 1 (fastest) to 9 (smallest)
+    };
+
+    struct ImageInfo
+    {
+        uint32_t width    = 0;
+        uint32_t height   = 0;
+        uint32_t channels = 0; // Color channels plus alpha, as decode_jxl() writes them
+    };
+
+    // num_threads sets the size of libjxl's parallel runner, 0 uses its default (one per core).
+    // pixels are 32-bit floats, or half floats if bits_per_sample is 16. channels is 1 (gray),
+    // 2 (stored as gray + alpha, e.g. octahedral normals) or 3 (RGB).
+    bool encode_oneshot( uint32_t xsize, uint32_t ysize, uint32_t channels, const void* pixels, std::vector<char>& compressed,
+                         size_t num_threads = 0, const EncodeSettings& settings = {}, uint32_t bits_per_sample = 32 );
 
     // Decode a JXL image into a caller-provided buffer.
     // out_pixels must point to at least out_pixel_bytes bytes of writable memory.
-    // Size should be: width * height * channels * sizeof(float)
-    // where width/height/channels can be read from the Level flatbuffer (View::res_x/res_y).
-    bool decode_jxl( const void* compressed, size_t compressed_size, void* out_pixels, size_t out_pixel_bytes );
+    // Size should be: width * height * channels * bits_per_sample / 8
+    // where width/height/channels/bits_per_sample can be read from the Level flatbuffer (ImageEntry).
+    // bits_per_sample 32 decodes to floats, 16 to half floats. num_threads sets the size of
+    // libjxl's parallel runner, 0 picks one suited to the image size.
+    bool decode_jxl( const void* compressed, size_t compressed_size, void* out_pixels, size_t out_pixel_bytes, uint32_t bits_per_sample = 32,
+                     size_t num_threads = 0 );
+
+    // Read the size and channel count of a JXL image without decoding its pixels.
+    bool read_info( const void* compressed, size_t compressed_size, ImageInfo& info );
 
 } // namespace mft::jxl
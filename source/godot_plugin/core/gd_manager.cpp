@@ -135,16 +135,19 @@ bool MFManager::load_from( int view_id )
     return true;
 }
 
-static godot::Image::Format channels_to_format( uint8_t channels )
+static godot::Image::Format entry_format( const mft::data::ImageEntry* entry )
 {
-    switch( channels )
+    const bool half = entry->bits_per_sample() == 16;
+    switch( entry->channels() )
     {
     case 1:
-        return godot::Image::FORMAT_RF;
+        return half ? godot::Image::FORMAT_RH : godot::Image::FORMAT_RF;
+    case 2:
+        return half ? godot::Image::FORMAT_RGH : godot::Image::FORMAT_RGF;
     case 3:
-        return godot::Image::FORMAT_RGBF;
+        return half ? godot::Image::FORMAT_RGBH : godot::Image::FORMAT_RGBF;
     default:
-        return godot::Image::FORMAT_RGBF;
+        return half ? godot::Image::FORMAT_RGBH : godot::Image::FORMAT_RGBF;
     }
 }
 
@@ -166,13 +169,13 @@ void MFManager::begin_load_view( int view_index )
 
     // Allocate Images on the main thread; the worker writes into their raw buffers.
     auto cache               = std::make_unique<ViewCache>();
-    cache->direct_diffuse    = godot::Image::create( dd->res_x(), dd->res_y(), false, channels_to_format( dd->channels() ) );
-    cache->direct_specular   = godot::Image::create( ds->res_x(), ds->res_y(), false, channels_to_format( ds->channels() ) );
-    cache->indirect_diffuse  = godot::Image::create( id->res_x(), id->res_y(), false, channels_to_format( id->channels() ) );
-    cache->indirect_specular = godot::Image::create( is->res_x(), is->res_y(), false, channels_to_format( is->channels() ) );
-    cache->normal            = godot::Image::create( nm->res_x(), nm->res_y(), false, channels_to_format( nm->channels() ) );
-    cache->depth             = godot::Image::create( dep->res_x(), dep->res_y(), false, channels_to_format( dep->channels() ) );
-    cache->env               = godot::Image::create( env->res_x(), env->res_y(), false, channels_to_format( env->channels() ) );
+    cache->direct_diffuse    = godot::Image::create( dd->res_x(), dd->res_y(), false, entry_format( dd ) );
+    cache->direct_specular   = godot::Image::create( ds->res_x(), ds->res_y(), false, entry_format( ds ) );
+    cache->indirect_diffuse  = godot::Image::create( id->res_x(), id->res_y(), false, entry_format( id ) );
+    cache->indirect_specular = godot::Image::create( is->res_x(), is->res_y(), false, entry_format( is ) );
+    cache->normal            = godot::Image::create( nm->res_x(), nm->res_y(), false, entry_format( nm ) );
+    cache->depth             = godot::Image::create( dep->res_x(), dep->res_y(), false, entry_format( dep ) );
+    cache->env               = godot::Image::create( env->res_x(), env->res_y(), false, entry_format( env ) );
 
     // Pre-extract all file offsets and pixel sizes before dispatching — avoids any
     // cross-thread access to the flatbuffer or the Level struct.
@@ -184,23 +187,23 @@ void MFManager::begin_load_view( int view_index )
         size_t compressed_size;
         void* out_buf;
         size_t pixel_bytes;
+        uint32_t bits_per_sample;
+    };
+
+    auto image_load = [blob]( const mft::data::ImageEntry* entry, const godot::Ref<godot::Image>& image ) -> ImageLoad
+    {
+        return { blob + static_cast<size_t>( entry->offset() ), static_cast<size_t>( entry->size() ), const_cast<uint8_t*>( image->get_data().ptr() ),
+                 static_cast<size_t>( entry->res_x() ) * entry->res_y() * entry->channels() * entry->bits_per_sample() / 8, entry->bits_per_sample() };
     };
 
     const std::vector<ImageLoad> loads = {
-        { blob + static_cast<size_t>( dd->offset() ), static_cast<size_t>( dd->size() ), const_cast<uint8_t*>( cache->direct_diffuse->get_data().ptr() ),
-          static_cast<size_t>( dd->res_x() ) * dd->res_y() * dd->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( ds->offset() ), static_cast<size_t>( ds->size() ), const_cast<uint8_t*>( cache->direct_specular->get_data().ptr() ),
-          static_cast<size_t>( ds->res_x() ) * ds->res_y() * ds->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( id->offset() ), static_cast<size_t>( id->size() ), const_cast<uint8_t*>( cache->indirect_diffuse->get_data().ptr() ),
-          static_cast<size_t>( id->res_x() ) * id->res_y() * id->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( is->offset() ), static_cast<size_t>( is->size() ), const_cast<uint8_t*>( cache->indirect_specular->get_data().ptr() ),
-          static_cast<size_t>( is->res_x() ) * is->res_y() * is->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( nm->offset() ), static_cast<size_t>( nm->size() ), const_cast<uint8_t*>( cache->normal->get_data().ptr() ),
-          static_cast<size_t>( nm->res_x() ) * nm->res_y() * nm->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( dep->offset() ), static_cast<size_t>( dep->size() ), const_cast<uint8_t*>( cache->depth->get_data().ptr() ),
-          static_cast<size_t>( dep->res_x() ) * dep->res_y() * dep->channels() * sizeof( float ) },
-        { blob + static_cast<size_t>( env->offset() ), static_cast<size_t>( env->size() ), const_cast<uint8_t*>( cache->env->get_data().ptr() ),
-          static_cast<size_t>( env->res_x() ) * env->res_y() * env->channels() * sizeof( float ) },
+        image_load( dd, cache->direct_diffuse ),
+        image_load( ds, cache->direct_specular ),
+        image_load( id, cache->indirect_diffuse ),
+        image_load( is, cache->indirect_specular ),
+        image_load( nm, cache->normal ),
+        image_load( dep, cache->depth ),
+        image_load( env, cache->env ),
     };
 
     m_view_cache[view_index] = std::move( cache );
@@ -226,7 +229,7 @@ void MFManager::begin_load_view( int view_index )
                 {
                     break;
                 }
-                if( !mft::jxl::decode_jxl( compressed.data(), img.compressed_size, img.out_buf, img.pixel_bytes ) )
+                if( !mft::jxl::decode_jxl( compressed.data(), img.compressed_size, img.out_buf, img.pixel_bytes, img.bits_per_sample ) )
                 {
                     break;
                 }